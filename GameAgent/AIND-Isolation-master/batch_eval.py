@@ -0,0 +1,164 @@
+"""This file contains heuristic evaluation functions that score a batch of
+`isolation.Board` positions at once with NumPy, e.g., all children of a node
+at the search horizon (see the `batch_score` argument of `CustomPlayer`).
+
+The boards are encoded as an array of blank cells with one row per board,
+and every feature is computed for the whole batch with a few array
+operations on the knight-move adjacency matrix of the board size:
+
+    - mobility: the number of legal moves of a player
+    - reach: the number of blank cells a player can reach in one or two moves
+    - centrality: the negated squared distance of a player from the center
+
+Batch score functions take a list of boards and a player and return one
+score per board, matching the equivalent scalar score function.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from isolation.isolation import MOVE_RULES, move_table
+
+Features = namedtuple("Features", ["own_moves", "opp_moves", "own_reach", "opp_reach",
+                                   "own_center", "opp_center", "active"])
+
+# Adjacency matrices and center distances shared by every batch of the same
+# board size and move rule; see `_tables()`
+_TABLES = {}
+
+
+def _tables(width, height, rule="knight"):
+    """
+    Return the boolean adjacency matrix (cells + 1, cells) of a board size
+    and move rule, whose last row stands for a player that has not moved yet
+    (and may move to any cell), and the centrality of every cell (with 0 in
+    the last slot). Sliding rules are not supported, since their moves
+    depend on the blocked cells.
+    """
+    key = (width, height, rule)
+    if key not in _TABLES:
+        if MOVE_RULES[rule][1]:
+            raise ValueError("Batch evaluation does not support the sliding move rule "
+                             "{!r}.".format(rule))
+        cells = width * height
+        _, masks = move_table(width, height, rule)
+        adjacency = np.ones((cells + 1, cells), dtype=bool)
+        for idx, mask in enumerate(masks):
+            adjacency[idx] = [(mask >> cell) & 1 for cell in range(cells)]
+        rows, cols = np.divmod(np.arange(cells), width)
+        center = -((rows - (height - 1) / 2.) ** 2 + (cols - (width - 1) / 2.) ** 2)
+        _TABLES[key] = (adjacency, np.append(center, 0.))
+    return _TABLES[key]
+
+
+def encode(games, player):
+    """
+    Encode a batch of boards of the same size as arrays.
+
+    Parameters
+    ----------
+    games : list<`isolation.Board`>
+        The positions to encode.
+
+    player : hashable
+        One of the objects registered by the games as a valid player.
+
+    Returns
+    -------
+    (numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray)
+        A boolean array (len(games), cells) of the blank cells, the cell
+        indices of `player` and of its opponent (cells if a player has not
+        moved yet), and a boolean array that is True where `player` holds
+        the initiative.
+    """
+    width, height = games[0].width, games[0].height
+    cells = width * height
+    size = (cells + 7) // 8
+    state = b"".join(game.__board_state__.to_bytes(size, "little") for game in games)
+    blocked = np.unpackbits(np.frombuffer(state, dtype=np.uint8).reshape(len(games), size),
+                            axis=1, bitorder="little")[:, :cells]
+
+    def index(location):
+        return cells if location is None else location[0] * width + location[1]
+
+    own = np.array([index(game.get_player_location(player)) for game in games])
+    opp = np.array([index(game.get_player_location(game.get_opponent(player)))
+                    for game in games])
+    active = np.array([game.active_player == player for game in games])
+    return blocked == 0, own, opp, active
+
+
+def features(games, player):
+    """
+    Compute the mobility, reach and centrality of both players in a batch of
+    boards of the same size.
+
+    Parameters
+    ----------
+    games : list<`isolation.Board`>
+        The positions to evaluate.
+
+    player : hashable
+        The player whose point of view the "own" features describe.
+
+    Returns
+    -------
+    `Features`
+        Arrays with one entry per board.
+    """
+    adjacency, center = _tables(games[0].width, games[0].height, games[0].move_rule)
+    blank, own, opp, active = encode(games, player)
+
+    own_first = adjacency[own] & blank
+    opp_first = adjacency[opp] & blank
+    # a cell is reachable in two moves if it is adjacent to any blank cell
+    # reachable in one move
+    step = adjacency[:-1].astype(np.uint8)
+    own_second = (own_first.astype(np.uint8) @ step > 0) & blank
+    opp_second = (opp_first.astype(np.uint8) @ step > 0) & blank
+
+    return Features(own_moves=own_first.sum(axis=1),
+                    opp_moves=opp_first.sum(axis=1),
+                    own_reach=(own_first | own_second).sum(axis=1),
+                    opp_reach=(opp_first | opp_second).sum(axis=1),
+                    own_center=center[own],
+                    opp_center=center[opp],
+                    active=active)
+
+
+def _terminal(f, scores):
+    """Replace the scores of finished games with -inf (lost) or inf (won)."""
+    scores = scores.astype(float)
+    scores[f.active & (f.own_moves == 0)] = float("-inf")
+    scores[~f.active & (f.opp_moves == 0)] = float("inf")
+    return scores
+
+
+def batch_open_move_score(games, player):
+    """Batch version of `sample_players.open_move_score()`."""
+    f = features(games, player)
+    return _terminal(f, f.own_moves).tolist()
+
+
+def batch_improved_score(games, player):
+    """Batch version of `sample_players.improved_score()`."""
+    f = features(games, player)
+    return _terminal(f, f.own_moves - f.opp_moves).tolist()
+
+
+def batch_custom_score(games, player):
+    """Batch version of `game_agent.custom_score()`."""
+    f = features(games, player)
+    return (f.own_moves - f.opp_moves).astype(float).tolist()
+
+
+def batch_reach_score(games, player):
+    """
+    Score positions by the difference in the number of cells each player can
+    reach within two moves, breaking ties by mobility and centrality.
+    """
+    f = features(games, player)
+    scores = (f.own_reach - f.opp_reach) + 0.5 * (f.own_moves - f.opp_moves) + \
+        0.01 * (f.own_center - f.opp_center)
+    return _terminal(f, scores).tolist()
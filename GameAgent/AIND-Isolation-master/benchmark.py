@@ -0,0 +1,195 @@
+"""This file contains a repeatable benchmark of the Isolation engine and the
+search agents.
+
+Every benchmark runs on the same seeded positions: for each board size, a
+random game is played to the opening, middle and late phases (measured as
+the fraction of the board that is blocked). The suite reports
+
+    - ops/sec of the `isolation.Board` primitives (copy, forecast_move,
+      get_legal_moves, count_legal_moves, utility, apply_move + undo_move)
+    - nodes/sec and the depth reached by each agent in a fixed time per
+      move (playouts and tree depth for the MCTS agent)
+
+and saves the results as JSON so that runs can be compared, e.g.:
+
+    python benchmark.py --output before.json
+    python benchmark.py --output after.json --compare before.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import timeit
+
+from collections import OrderedDict
+
+from isolation import Board
+from game_agent import CustomPlayer
+from mcts import MCTSPlayer
+from sample_players import improved_score
+
+SIZES = ((7, 7), (9, 9), (15, 15))
+
+# Fraction of the cells blocked at each game phase
+PHASES = (("opening", 0.1), ("middle", 0.35), ("late", 0.6))
+
+SEED = 20170101
+
+
+def make_position(width, height, blocked, seed=SEED):
+    """
+    Play random moves from the empty board until at least a fraction
+    `blocked` of the cells is blocked, restarting with the next seed if a
+    game ends first, so each (size, phase) always gets the same position.
+    The players are the strings "player1" and "player2".
+    """
+    target = int(blocked * width * height)
+    while True:
+        rng = random.Random(seed)
+        game = Board("player1", "player2", width, height)
+        while game.move_count < target:
+            moves = game.get_legal_moves()
+            if not moves:
+                break
+            game.apply_move(rng.choice(moves))
+        if game.move_count >= target and game.get_legal_moves():
+            return game
+        seed += 1
+
+
+def positions(sizes=SIZES):
+    """Return the benchmark positions as (name, board) pairs."""
+    return [("{}x{}/{}".format(w, h, phase), make_position(w, h, blocked))
+            for w, h in sizes for phase, blocked in PHASES]
+
+
+def _apply_undo(game):
+    game.apply_move(game.get_legal_moves()[0])
+    game.undo_move()
+
+
+PRIMITIVES = OrderedDict([
+    ("copy", lambda game: game.copy()),
+    ("forecast_move", lambda game: game.forecast_move(game.get_legal_moves()[0])),
+    ("get_legal_moves", lambda game: game.get_legal_moves()),
+    ("count_legal_moves", lambda game: game.count_legal_moves()),
+    ("utility", lambda game: game.utility(game.active_player)),
+    ("apply_undo", _apply_undo),
+])
+
+
+def time_primitive(fn, game, min_time=0.2):
+    """Return the number of calls of fn(game) per second, measured over at
+    least `min_time` seconds (best of three runs)."""
+    timer = timeit.Timer(lambda: fn(game))
+    number, elapsed = 1, timer.timeit(1)
+    while elapsed < min_time:
+        number *= 2
+        elapsed = timer.timeit(number)
+    best = min([elapsed] + timer.repeat(2, number))
+    return number / best
+
+
+def bench_primitives(boards, min_time=0.2):
+    """Return {primitive: {position: ops/sec}}."""
+    return OrderedDict(
+        (name, OrderedDict((label, time_primitive(fn, game, min_time)) for label, game in boards))
+        for name, fn in PRIMITIVES.items())
+
+
+def agents():
+    """Return the benchmarked agents as (name, factory) pairs."""
+    return [
+        ("ID_Plain", lambda: CustomPlayer(score_fn=improved_score, method='alphabeta',
+                                          trace=True)),
+        ("ID_Improved", lambda: CustomPlayer(score_fn=improved_score, method='alphabeta',
+                                             tt_size=2 ** 16, move_ordering=True, trace=True)),
+        ("MCTS", lambda: MCTSPlayer(trace=True, seed=SEED)),
+    ]
+
+
+def bench_agents(boards, time_limit=150.):
+    """
+    Search every position with every agent for `time_limit` milliseconds
+    and return {agent: {position: {"nodes_per_second", "depth", "nodes"}}}.
+    """
+    results = OrderedDict()
+    for name, factory in agents():
+        results[name] = OrderedDict()
+        for label, game in boards:
+            # replay the position with the agent as the player to move
+            player = factory()
+            players = (player, "opponent") if game.move_count % 2 == 0 else ("opponent", player)
+            board = Board(players[0], players[1], game.width, game.height)
+            for move in game.get_applied_moves():
+                board.apply_move(move)
+            start = timeit.default_timer()
+            time_left = lambda: time_limit - 1000 * (timeit.default_timer() - start)
+            player.get_move(board, board.get_legal_moves(), time_left)
+            record = player.search_log[-1]
+            results[name][label] = OrderedDict([
+                ("nodes_per_second", record.nodes_per_second),
+                ("depth", record.depth),
+                ("nodes", record.nodes)])
+    return results
+
+
+def run(sizes=SIZES, min_time=0.2, time_limit=150.):
+    """Run the whole suite and return the results as a dictionary."""
+    boards = positions(sizes)
+    return OrderedDict([
+        ("python", platform.python_version()),
+        ("platform", platform.platform()),
+        ("primitives", bench_primitives(boards, min_time)),
+        ("agents", bench_agents(boards, time_limit)),
+    ])
+
+
+def _rows(results):
+    """Flatten results into (section, name, position, metric, value) rows."""
+    for name, by_position in results["primitives"].items():
+        for label, value in by_position.items():
+            yield "primitives", name, label, "ops/s", value
+    for name, by_position in results["agents"].items():
+        for label, values in by_position.items():
+            for metric in ("nodes_per_second", "depth"):
+                yield "agents", name, label, metric, values[metric]
+
+
+def print_report(results, baseline=None):
+    """Print the results, with the ratio to a baseline run if given."""
+    old = {}
+    if baseline is not None:
+        old = {row[:4]: row[4] for row in _rows(baseline)}
+    print("{:<20}{:<16}{:<18}{:>14}{:>9}".format("", "Position", "Metric", "Value",
+                                                  "Ratio" if old else ""))
+    for row in _rows(results):
+        ratio = ""
+        if old.get(row[:4]):
+            ratio = "{:.2f}".format(row[4] / old[row[:4]])
+        print("{:<20}{:<16}{:<18}{:>14.1f}{:>9}".format(row[1], row[2], row[3], row[4], ratio))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Isolation engine and agents.")
+    parser.add_argument("--output", default=None, help="JSON file to save the results to")
+    parser.add_argument("--compare", default=None, help="JSON results of a previous run")
+    parser.add_argument("--sizes", type=int, nargs="+", default=None, metavar="N",
+                        help="square board sizes to benchmark (default: 7 9 15)")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="minimum seconds spent timing each primitive")
+    parser.add_argument("--time-limit", type=float, default=150.,
+                        help="milliseconds per agent search")
+    args = parser.parse_args()
+
+    sizes = tuple((n, n) for n in args.sizes) if args.sizes else SIZES
+    results = run(sizes, args.min_time, args.time_limit)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+    print_report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
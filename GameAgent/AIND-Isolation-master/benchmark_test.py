@@ -0,0 +1,34 @@
+"""
+This file contains test cases for the benchmark harness in benchmark.py.
+"""
+import json
+import unittest
+
+import benchmark
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_positions(self):
+        """ Test that the benchmark positions are fixed and playable """
+        first = [(label, game.to_string()) for label, game in benchmark.positions(((5, 5), (9, 9)))]
+        second = [(label, game.to_string()) for label, game in benchmark.positions(((5, 5), (9, 9)))]
+        self.assertEqual(first, second)
+        for label, game in benchmark.positions(((5, 5),)):
+            self.assertTrue(game.get_legal_moves(), label)
+
+    def test_run(self):
+        """ Test that a short run reports every primitive and agent """
+        results = benchmark.run(((5, 5),), min_time=0.001, time_limit=30.)
+        results = json.loads(json.dumps(results))
+        self.assertEqual(list(results["primitives"]), list(benchmark.PRIMITIVES))
+        self.assertEqual(list(results["agents"]), [name for name, _ in benchmark.agents()])
+        for by_position in results["primitives"].values():
+            self.assertEqual(len(by_position), len(benchmark.PHASES))
+            self.assertTrue(all(value > 0 for value in by_position.values()))
+        for by_position in results["agents"].values():
+            self.assertTrue(all(values["nodes"] > 0 for values in by_position.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
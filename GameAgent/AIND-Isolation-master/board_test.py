@@ -0,0 +1,223 @@
+"""
+This file contains test cases for the `isolation.Board` game engine. They
+check that the board state transitions (apply, undo, copy and forecast) keep
+the documented public behavior of the original list-of-lists implementation.
+"""
+import random
+import unittest
+
+import isolation
+
+
+class BoardTest(unittest.TestCase):
+
+    def setUp(self):
+        self.player1 = "Player1"
+        self.player2 = "Player2"
+        self.game = isolation.Board(self.player1, self.player2)
+
+    def play_random(self, game, num_moves, seed=0):
+        """Apply up to `num_moves` random legal moves to the game."""
+        rng = random.Random(seed)
+        for _ in range(num_moves):
+            moves = game.get_legal_moves()
+            if not moves:
+                break
+            game.apply_move(rng.choice(moves))
+
+    def test_apply_move(self):
+        """ Test that moves block cells and swap the initiative """
+        self.game.apply_move((2, 3))
+        self.game.apply_move((0, 5))
+        self.assertEqual(self.game.get_player_location(self.player1), (2, 3))
+        self.assertEqual(self.game.get_player_location(self.player2), (0, 5))
+        self.assertEqual(self.game.active_player, self.player1)
+        self.assertFalse(self.game.move_is_legal((2, 3)))
+        self.assertNotIn((0, 5), self.game.get_blank_spaces())
+        self.assertEqual(len(self.game.get_blank_spaces()), 47)
+        self.assertEqual(sorted(self.game.get_legal_moves()),
+                         [(0, 2), (0, 4), (1, 1), (1, 5),
+                          (3, 1), (3, 5), (4, 2), (4, 4)])
+
+    def test_undo_move(self):
+        """ Test that undo_move restores every observable part of the state """
+        self.play_random(self.game, 6)
+        before = (self.game.to_string(), self.game.move_count,
+                  self.game.active_player, self.game.get_legal_moves(),
+                  self.game.get_player_location(self.player1),
+                  self.game.get_player_location(self.player2))
+
+        move = self.game.get_legal_moves()[0]
+        self.game.apply_move(move)
+        self.assertEqual(self.game.undo_move(), move)
+
+        after = (self.game.to_string(), self.game.move_count,
+                 self.game.active_player, self.game.get_legal_moves(),
+                 self.game.get_player_location(self.player1),
+                 self.game.get_player_location(self.player2))
+        self.assertEqual(before, after)
+
+    def test_undo_to_start(self):
+        """ Test that a game can be unwound back to the empty board """
+        self.play_random(self.game, 10)
+        while self.game.move_count:
+            self.game.undo_move()
+        self.assertEqual(len(self.game.get_blank_spaces()), 49)
+        self.assertIsNone(self.game.get_player_location(self.player1))
+        self.assertIsNone(self.game.get_player_location(self.player2))
+        self.assertRaises(RuntimeError, self.game.undo_move)
+
+    def test_applied_moves(self):
+        """ Test that the applied moves are reported from the first move """
+        self.play_random(self.game, 8)
+        moves = self.game.get_applied_moves()
+        self.assertEqual(len(moves), 8)
+        move = self.game.get_legal_moves()[0]
+        child = self.game.forecast_move(move)
+        self.assertEqual(child.get_applied_moves(), moves + [move])
+        self.assertEqual(self.game.get_applied_moves(), moves)
+
+        replay = isolation.Board(self.player1, self.player2)
+        for m in moves:
+            replay.apply_move(m)
+        self.assertEqual(replay.to_string(), self.game.to_string())
+
+    def test_forecast_is_independent(self):
+        """ Test that forecast boards do not share mutable state """
+        self.play_random(self.game, 4)
+        snapshot = self.game.to_string()
+        move = self.game.get_legal_moves()[0]
+
+        child = self.game.forecast_move(move)
+        self.assertEqual(self.game.to_string(), snapshot)
+        self.assertNotEqual(child.to_string(), snapshot)
+
+        child.undo_move()
+        self.assertEqual(child.to_string(), snapshot)
+        self.game.undo_move()
+        self.assertNotEqual(child.to_string(), self.game.to_string())
+
+    def test_move_table_shared(self):
+        """ Test that boards of the same size share one adjacency table """
+        other = isolation.Board(self.player1, self.player2)
+        self.assertIs(isolation.isolation.move_table(7, 7),
+                      isolation.isolation.move_table(7, 7))
+        self.assertIs(self.game.copy().__move_table__, other.__move_table__)
+
+    def test_count_legal_moves(self):
+        """ Test that move counts agree with the generated move lists """
+        self.assertEqual(self.game.count_legal_moves(), (49, 49))
+        for seed in range(5):
+            game = isolation.Board(self.player1, self.player2, 9, 6)
+            self.play_random(game, 12, seed)
+            for player in (self.player1, self.player2):
+                opponent = game.get_opponent(player)
+                self.assertEqual(game.count_legal_moves(player),
+                                 (len(game.get_legal_moves(player)),
+                                  len(game.get_legal_moves(opponent))))
+
+    def test_zobrist_key(self):
+        """ Test that Zobrist keys identify positions, not move orders """
+        self.game.apply_move((2, 3))
+        self.game.apply_move((4, 4))
+        start = self.game.zobrist_key
+
+        a, b = self.game.copy(), self.game.copy()
+        for move in [(1, 1), (3, 6), (3, 2), (1, 5), (2, 4), (0, 3)]:
+            a.apply_move(move)
+        for move in [(1, 5), (3, 2), (3, 6), (1, 1), (2, 4), (0, 3)]:
+            b.apply_move(move)
+        self.assertEqual(a.to_string(), b.to_string())
+        self.assertEqual(a.zobrist_key, b.zobrist_key)
+        self.assertNotEqual(a.zobrist_key, start)
+        self.assertNotEqual(a.zobrist_key, a.forecast_move((0, 2)).zobrist_key)
+
+        self.play_random(self.game, 8)
+        self.assertNotEqual(self.game.zobrist_key, start)
+        for _ in range(8):
+            self.game.undo_move()
+        self.assertEqual(self.game.zobrist_key, start)
+
+    def test_canonical_form(self):
+        """ Test that symmetric positions share a canonical form """
+        table = isolation.isolation.symmetry_table(7, 7)
+        self.assertEqual(len(table), 8)
+        self.assertEqual(len(isolation.isolation.symmetry_table(9, 6)), 4)
+
+        self.play_random(self.game, 7)
+        history = []
+        game = self.game.copy()
+        while game.move_count:
+            history.append(game.undo_move())
+        history.reverse()
+        key, t = self.game.canonical_form()
+
+        for perm, _ in table:
+            image = isolation.Board(self.player1, self.player2)
+            for move in history:
+                image.apply_move(divmod(perm[move[0] * 7 + move[1]], 7))
+            image_key, image_t = image.canonical_form()
+            self.assertEqual(image_key, key)
+
+            # legal moves agree once translated to the canonical orientation
+            self.assertEqual(sorted(self.game.transform_move(m, t)
+                                    for m in self.game.get_legal_moves()),
+                             sorted(image.transform_move(m, image_t)
+                                    for m in image.get_legal_moves()))
+            for move in image.get_legal_moves():
+                canonical = image.transform_move(move, image_t)
+                self.assertEqual(image.transform_move(canonical, image_t, inverse=True), move)
+
+        self.game.apply_move(self.game.get_legal_moves()[0])
+        self.assertNotEqual(self.game.canonical_form()[0], key)
+
+    def test_move_rules(self):
+        """ Test the king and queen rules against a direct scan of the grid """
+        def expected(game, rule):
+            row, col = game.get_player_location(game.active_player)
+            moves = []
+            for dr, dc in isolation.isolation.KING_DIRECTIONS:
+                r, c = row + dr, col + dc
+                while 0 <= r < game.height and 0 <= c < game.width and \
+                        (r, c) in blanks:
+                    moves.append((r, c))
+                    if rule == "king":
+                        break
+                    r, c = r + dr, c + dc
+            return sorted(moves)
+
+        for rule in ("king", "queen"):
+            for seed in range(5):
+                game = isolation.Board(self.player1, self.player2, 8, 5, move_rule=rule)
+                self.assertEqual(game.get_legal_moves(), game.get_blank_spaces())
+                self.play_random(game, 10, seed)
+                if game.is_winner(self.player1) or game.is_winner(self.player2):
+                    continue
+                blanks = set(game.get_blank_spaces())
+                self.assertEqual(sorted(game.get_legal_moves()), expected(game, rule))
+                for player in (self.player1, self.player2):
+                    opponent = game.get_opponent(player)
+                    self.assertEqual(game.count_legal_moves(player),
+                                     (len(game.get_legal_moves(player)),
+                                      len(game.get_legal_moves(opponent))))
+                self.assertEqual(game.copy().get_legal_moves(), game.get_legal_moves())
+
+        with self.assertRaises(ValueError):
+            isolation.Board(self.player1, self.player2, move_rule="bishop")
+        king = isolation.Board(self.player1, self.player2, move_rule="king")
+        self.assertNotEqual(king.canonical_form()[0], self.game.canonical_form()[0])
+
+    def test_large_board(self):
+        """ Test that large boards keep the blank cell order and move counts """
+        game = isolation.Board(self.player1, self.player2, 21, 17)
+        self.assertEqual(game.get_blank_spaces(),
+                         [(i, j) for j in range(21) for i in range(17)])
+        self.play_random(game, 40)
+        blanks = game.get_blank_spaces()
+        self.assertEqual(len(blanks), 21 * 17 - game.move_count)
+        self.assertTrue(all(game.move_is_legal(m) for m in game.get_legal_moves()))
+        self.assertEqual(len(game.get_legal_moves()), game.count_legal_moves()[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,230 @@
+"""This file contains an exact endgame solver for Isolation.
+
+Once the cells reachable by the two players no longer overlap, the players
+cannot interfere with each other: each one simply walks the longest path
+available in its own region, and the player to move wins if and only if its
+longest path is strictly longer than the opponent's. Finding the longest
+path is exponential in the worst case, so the solver works within a node
+budget and gives up (returning None) when the regions are still too large.
+The solver handles the jumping move rules (knight, king) of `isolation.Board`;
+it always gives up on boards with a sliding rule (queen).
+"""
+
+from isolation.isolation import MOVE_RULES, move_table
+
+# Default maximum number of path extensions explored for each player by
+# `solve()`; about 25 ms of search when the budget is exhausted
+NODE_BUDGET = 4000
+
+# Number of cells a region must lose after exceeding the budget before
+# `Solver` tries it again
+RETRY_CELLS = 4
+
+
+class BudgetExceeded(Exception):
+    """Raised when the longest path search exceeds its node budget."""
+    pass
+
+
+def _popcount(bits):
+    return bin(bits).count("1")
+
+
+def reachable(game, location):
+    """
+    Return a bitboard of the blank cells reachable from `location` through
+    any sequence of moves over blank cells (not including `location`).
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The game state.
+
+    location : (int, int)
+        The starting cell, e.g., the location of a player.
+
+    Returns
+    -------
+    int
+        A bitmask with bit (row * width + col) set for every reachable cell.
+    """
+    _, masks = move_table(game.width, game.height, game.move_rule)
+    blank = ~game.__board_state__
+    region = 0
+    frontier = masks[location[0] * game.width + location[1]] & blank
+    while frontier:
+        region |= frontier
+        expanded = 0
+        while frontier:
+            bit = frontier & -frontier
+            expanded |= masks[bit.bit_length() - 1]
+            frontier ^= bit
+        frontier = expanded & blank & ~region
+    return region
+
+
+def is_partitioned(game):
+    """
+    Test whether the players have been separated into regions that cannot
+    interact, i.e., no blank cell is reachable by both players.
+    """
+    locations = [game.get_player_location(p) for p in (game.active_player, game.inactive_player)]
+    if None in locations:
+        return False
+    return not reachable(game, locations[0]) & reachable(game, locations[1])
+
+
+def longest_path(game, location, budget=NODE_BUDGET):
+    """
+    Find the longest sequence of moves available from `location` on the
+    blank cells of the board, ignoring the other player.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The game state.
+
+    location : (int, int)
+        The starting cell.
+
+    budget : int (optional)
+        The maximum number of path extensions to explore.
+
+    Returns
+    -------
+    (int, (int, int))
+        The length of the longest path and its first move ((-1, -1) if no
+        move is available).
+
+    Raises
+    ------
+    BudgetExceeded
+        If the search needs more than `budget` path extensions.
+    """
+    width = game.width
+    neighbors, masks = move_table(width, game.height, game.move_rule)
+    region = reachable(game, location)
+    memo = {}
+    count = [0]
+
+    def search(idx, free):
+        # longest path from cell idx over the cells in `free`
+        key = (idx, free)
+        if key in memo:
+            return memo[key]
+        count[0] += 1
+        if count[0] > budget:
+            raise BudgetExceeded()
+
+        moves = [bit for _, bit in neighbors[idx] if free & bit]
+        # Warnsdorff's rule: try the most constrained cells first, which
+        # tends to find a path that uses every cell early
+        moves.sort(key=lambda bit: _popcount(masks[bit.bit_length() - 1] & free))
+        best, best_bit, bound = 0, 0, _popcount(free)
+        for bit in moves:
+            length = 1 + search(bit.bit_length() - 1, free ^ bit)[0]
+            if length > best:
+                best, best_bit = length, bit
+                if best == bound:
+                    break
+        memo[key] = (best, best_bit)
+        return best, best_bit
+
+    length, bit = search(location[0] * width + location[1], region)
+    if not bit:
+        return 0, (-1, -1)
+    return length, divmod(bit.bit_length() - 1, width)
+
+
+def solve(game, budget=NODE_BUDGET, opponent=True):
+    """
+    Solve a partitioned endgame for the active player.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The game state.
+
+    budget : int (optional)
+        The maximum number of path extensions to explore for each player.
+
+    opponent : bool (optional)
+        Flag indicating whether to find the longest path of the inactive
+        player too; its length is None if not.
+
+    Returns
+    -------
+    ((int, int), int, int) or None
+        The first move of the longest path available to the active player,
+        the length of that path, and the length of the longest path of the
+        inactive player (the active player wins if and only if its path is
+        longer); or None if the players are not separated yet or the path of
+        the active player exceeds the budget. The length for the inactive
+        player is None if only its path exceeds the budget, since the best
+        move of the active player does not depend on it. Also None for a
+        sliding move rule.
+    """
+    if MOVE_RULES[game.move_rule][1] or not is_partitioned(game):
+        return None
+    try:
+        own_length, move = longest_path(game, game.get_player_location(game.active_player), budget)
+    except BudgetExceeded:
+        return None
+    opp_length = None
+    if opponent:
+        try:
+            opp_length, _ = longest_path(game, game.get_player_location(game.inactive_player),
+                                         budget)
+        except BudgetExceeded:
+            pass
+    return move, own_length, opp_length
+
+
+class Solver:
+    """Endgame solver for an agent that calls it on every move.
+
+    Only the move of the active player is solved. A region whose longest
+    path exceeded the budget is remembered, and the regions that are subsets
+    of it are not searched again until they have lost RETRY_CELLS cells, so
+    that the moves after a failure do not spend the budget again on an almost
+    identical region. Any other region (e.g., in a new game) is searched, and
+    a success forgets the failure.
+
+    Parameters
+    ----------
+    budget : int (optional)
+        The maximum number of path extensions to explore.
+
+    Attributes
+    ----------
+    failed : (int, int, str, int)
+        The width, height and move rule of the board and the bitboard of the
+        last region that exceeded the budget, or None.
+    """
+
+    def __init__(self, budget=NODE_BUDGET):
+        self.budget = budget
+        self.failed = None
+
+    def best_move(self, game):
+        """Return the first move of the longest path of the active player if
+        the players are separated and the path is found within the budget,
+        and None otherwise.
+        """
+        location = game.get_player_location(game.active_player)
+        if location is None:
+            return None
+        board = (game.width, game.height, game.move_rule)
+        if self.failed is not None and self.failed[:3] == board:
+            region = reachable(game, location)
+            failed_region = self.failed[3]
+            if not region & ~failed_region and \
+                    _popcount(region) > _popcount(failed_region) - RETRY_CELLS:
+                return None
+        solution = solve(game, self.budget, opponent=False)
+        if solution is None:
+            if is_partitioned(game):
+                self.failed = board + (reachable(game, location),)
+            return None
+        self.failed = None
+        return solution[0]
@@ -6,7 +6,22 @@ augment the test suite with your own test cases to further test your code.
 You must test your agent's strength against a set of agents with known
 relative strength using tournament.py and include the results in your report.
 """
+import queue
 import random
+import time
+import timeit
+
+from collections import namedtuple
+from multiprocessing import Pool, Queue
+
+from endgame import Solver
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+
+# Mixed into the transposition table keys of positions searched by the
+# second player, since the stored scores are from the point of view of the
+# searching agent, which may play either seat of a board
+SEAT_KEY = 0x6A09E667F3BCC909
 
 
 class Timeout(Exception):
@@ -14,6 +29,170 @@ class Timeout(Exception):
     pass
 
 
+class SearchRecord(namedtuple("SearchRecord", [
+        "move_count", "depth", "nodes", "time", "iteration_nodes",
+        "iteration_times", "cutoffs", "first_move_cutoffs", "timed_out"])):
+    """Summary of the search performed by `CustomPlayer.get_move()` for one
+    move.
+
+    Attributes
+    ----------
+    move_count : int
+        The number of moves applied to the board before the search.
+
+    depth : int
+        The deepest search iteration that completed before the timer expired.
+
+    nodes : int
+        The number of nodes expanded, including an unfinished iteration.
+
+    time : float
+        The wall-clock time (in milliseconds) spent in get_move().
+
+    iteration_nodes : tuple<int>
+        The number of nodes expanded by each completed iteration.
+
+    iteration_times : tuple<float>
+        The time (in milliseconds) taken by each completed iteration.
+
+    cutoffs : tuple<int>
+        The number of alpha-beta cutoffs at each ply below the root.
+
+    first_move_cutoffs : int
+        The number of cutoffs caused by the first move searched at a node.
+
+    timed_out : bool
+        True if the search was aborted by the timer.
+    """
+    __slots__ = ()
+
+    @property
+    def nodes_per_second(self):
+        """Search throughput over the whole call to get_move()."""
+        return 1000. * self.nodes / self.time if self.time > 0 else 0.
+
+    @property
+    def branching_factor(self):
+        """Effective branching factor b such that the deepest completed
+        iteration expanded b ** depth nodes.
+        """
+        if not self.iteration_nodes or self.depth < 1:
+            return 0.
+        return self.iteration_nodes[-1] ** (1. / self.depth)
+
+
+# The queue the search workers report their progress to; see _init_worker()
+_results = None
+
+
+def _init_worker(results):
+    """Initializer of the worker processes of `CustomPlayer.parallel_search()`."""
+    global _results
+    _results = results
+
+
+def _search_root_moves(task):
+    """Worker for `CustomPlayer.parallel_search()`: run iterative deepening
+    alpha-beta over a subset of the root moves until the deadline.
+
+    Every completed depth is put on the results queue as soon as it is
+    known, as a tuple (search id, task index, (value, move), solved, nodes,
+    finished): the best (value, move) among the moves, a flag indicating
+    whether the depth searched every line to a terminal state (so deeper
+    iterations cannot change the result) and the number of nodes expanded
+    so far. A last tuple with no result and `finished` set is put when the
+    worker stops, so that the parent does not have to wait for the task
+    itself to return.
+
+    Parameters
+    ----------
+    task : (int, int, CustomPlayer, isolation.Board, list<(int, int)>, float)
+        The search id and index of the task, a copy of the agent, the root
+        position (with the copy registered as one of its players), the root
+        moves to search and the absolute deadline on the
+        `time.perf_counter()` clock.
+    """
+    search_id, index, agent, game, moves, deadline = task
+    agent.time_left = lambda: 1000 * (deadline - time.perf_counter())
+    if agent.tt is not None:
+        agent.tt.new_search()
+    if agent.move_ordering:
+        agent.new_search()
+    agent.reset_counters()
+
+    solved = False
+    try:
+        depth = 1
+        while not solved:
+            agent.reached_horizon = False
+            agent.nodes += 1
+            best, line = None, []
+            for move in moves:
+                alpha = float("-inf") if best is None else best[0]
+                v, _ = agent.alphabeta(game.forecast_move(move), depth - 1,
+                                       alpha, float("inf"), False)
+                if best is None or v > best[0]:
+                    best = (v, move)
+                    line = agent.pv_lines.get(game.move_count + 1, [])
+            solved = not agent.reached_horizon
+            _results.put((search_id, index, best, solved, agent.nodes, False))
+            if agent.move_ordering:
+                # search the best move of this iteration first in the next
+                moves = [best[1]] + [m for m in moves if m != best[1]]
+                agent.pv = [(game.zobrist_key, best[1])] + line
+                agent.pv_moves = dict(agent.pv)
+            depth += 1
+    except Timeout:
+        pass
+    _results.put((search_id, index, None, solved, agent.nodes, True))
+
+
+def combine_root_results(outcomes, default_move):
+    """Combine the iterations completed by the workers of
+    `CustomPlayer.parallel_search()`.
+
+    An iteration counts as completed when every worker completed it, or
+    proved with a shallower iteration that deeper searches cannot change its
+    result; its best move is the best of the best moves of the workers.
+
+    Parameters
+    ----------
+    outcomes : list<(list<(float, (int, int))>, bool)>
+        For every worker, the best (value, move) of each completed depth
+        starting at depth 1, and whether its last completed depth searched
+        every line to a terminal state.
+
+    default_move : (int, int)
+        The move to return if no iteration was completed by every worker.
+
+    Returns
+    -------
+    (int, int)
+        The best move of the deepest completed iteration.
+
+    int
+        The deepest completed iteration.
+
+    bool
+        True if deeper iterations could change the result.
+    """
+    best_move, depth = default_move, 0
+    while True:
+        best = None
+        for results, solved in outcomes:
+            if len(results) > depth:
+                value, move = results[depth]
+            elif solved and results:
+                value, move = results[-1]
+            else:
+                return best_move, depth, True
+            if best is None or value > best[0]:
+                best = (value, move)
+        best_move, depth = best[1], depth + 1
+        if all(solved and len(results) <= depth for results, solved in outcomes):
+            return best_move, depth, False
+
+
 def custom_score(game, player):
     """Calculate the heuristic value of a game state from the point of view
     of the given player.
@@ -40,9 +219,8 @@ def custom_score(game, player):
     # TODO: finish this function!
     # raise NotImplementedError
 
-    my_moves = game.get_legal_moves()
-    opponent_moves = game.get_legal_moves(game.get_opponent(player))
-    return float(len(my_moves) - len(opponent_moves))
+    my_moves, opponent_moves = game.count_legal_moves(player)
+    return float(my_moves - opponent_moves)
 
 
 class CustomPlayer:
@@ -73,16 +251,109 @@ class CustomPlayer:
         Time remaining (in milliseconds) when search is aborted. Should be a
         positive value large enough to allow the function to return before the
         timer expires.
+
+    tt_size : int (optional)
+        Number of slots in the transposition table used by alphabeta(). The
+        table persists across the iterations of iterative deepening, moves
+        and games, with the seat of the agent in the key (see tt_key()) so
+        that an agent can play both sides of a match; None disables it.
+
+    move_ordering : boolean (optional)
+        Flag indicating whether alphabeta() should search moves in order of
+        the principal variation from the previous iteration, killer moves
+        and the history heuristic (True) or in the order returned by
+        `Board.get_legal_moves()` (False).
+
+    trace : boolean (optional)
+        Flag indicating whether get_move() should append a `SearchRecord`
+        describing each search to `search_log`.
+
+    book : `opening_book.OpeningBook` (optional)
+        An opening book consulted by get_move() before searching; positions
+        found in the book are answered without a search.
+
+    endgame : boolean (optional)
+        Flag indicating whether get_move() should play the exact solution
+        from `endgame.Solver` once the players can no longer interact.
+
+    batch_score : callable (optional)
+        A function scoring a list of positions at once (see batch_eval.py)
+        that alphabeta() uses instead of `score_fn` to evaluate all children
+        of a node one ply above the search horizon in a single call.
+
+    workers : int (optional)
+        Number of worker processes for iterative deepening alpha-beta search
+        (see parallel_search()); None or 1 searches in the calling process.
+        The processes are started by the constructor, outside of the timed
+        get_move(), and stopped by close(). Worker processes cannot be
+        started from a daemonic process, such as a worker of
+        `multiprocessing.Pool`; a copy of the agent sent to another process
+        has no workers and searches in its own process.
     """
 
     def __init__(self, search_depth=3, score_fn=custom_score,
-                 iterative=True, method='minimax', timeout=10.):
+                 iterative=True, method='minimax', timeout=10., tt_size=None,
+                 move_ordering=False, trace=False, book=None, endgame=False,
+                 batch_score=None, workers=None):
         self.search_depth = search_depth
         self.iterative = iterative
         self.score = score_fn
         self.method = method
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        self.tt = TranspositionTable(tt_size) if tt_size else None
+        self.move_ordering = move_ordering
+        self.pv = []
+        self.pv_moves = {}
+        self.pv_lines = {}
+        self.killers = {}
+        self.history = {}
+        self.trace = trace
+        self.search_log = []
+        self.book = book
+        self.endgame = Solver() if endgame else None
+        self.batch_score = batch_score
+        self.workers = workers
+        self.pool = None
+        self.results = None
+        self.search_id = 0
+        self.reset_counters()
+        if workers and workers > 1:
+            self.results = Queue()
+            self.pool = Pool(workers, _init_worker, (self.results,))
+
+    def __getstate__(self):
+        """Drop the timer of the last move (a closure over the game that was
+        being played), the worker pool, the contents of the transposition
+        table and the search log (a copy starts its own log; the records of
+        tournament games are sent back separately) so that agents can be
+        sent to worker processes cheaply. An agent with running search
+        workers is only sent to them, and they never consult the opening
+        book, so its book is dropped too.
+        """
+        state = self.__dict__.copy()
+        state['time_left'] = None
+        state['pool'] = None
+        state['results'] = None
+        state['search_log'] = []
+        if self.pool is not None:
+            state['book'] = None
+        if self.tt is not None:
+            state['tt'] = self.tt.size
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.tt is not None:
+            self.tt = TranspositionTable(self.tt)
+
+    def close(self):
+        """Terminate the worker processes started by parallel_search()."""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+            self.results.close()
+            self.results = None
 
     def get_move(self, game, legal_moves, time_left):
         """Search for the best move from the available legal moves and return a
@@ -137,32 +408,262 @@ class CustomPlayer:
             return (-1, -1)
         next_move = legal_moves[0]
 
+        if self.book is not None:
+            book_move = self.book.lookup(game)
+            if book_move in legal_moves:
+                return book_move
+        if self.endgame is not None:
+            endgame_move = self.endgame.best_move(game)
+            if endgame_move in legal_moves:
+                return endgame_move
+
+        if self.tt is not None:
+            self.tt.new_search()
+        if self.move_ordering:
+            self.new_search()
+        self.reset_counters()
+        start = timeit.default_timer()
+        completed_depth = 0
+        timed_out = False
+
         try:
             # The search method call (alpha beta or minimax) should happen in
             # here in order to avoid timeout. The try/except block will
             # automatically catch the exception raised by the search method
             # when the timer gets close to expiring
-            if self.iterative:
-                depth = 0
+            if self.pool is not None and self.iterative and \
+                    self.method == 'alphabeta' and len(legal_moves) > 1:
+                next_move, completed_depth, timed_out = self.parallel_search(game, legal_moves)
+            elif self.iterative:
+                depth = 1
                 while True:
+                    iteration_start, iteration_nodes = timeit.default_timer(), self.nodes
+                    self.reached_horizon = False
                     if self.method == 'minimax':
                         v, next_move = self.minimax(game, depth)
                     elif self.method == 'alphabeta':
                         v, next_move = self.alphabeta(game, depth)
+                        if self.move_ordering:
+                            # keep the line of the completed iteration to
+                            # order the moves of the next, deeper one
+                            self.pv = self.pv_lines.get(game.move_count, [])
+                            self.pv_moves = dict(self.pv)
+                    self.iteration_nodes.append(self.nodes - iteration_nodes)
+                    self.iteration_times.append(
+                        1000 * (timeit.default_timer() - iteration_start))
+                    completed_depth = depth
+                    if not self.reached_horizon:
+                        # every line ended in a terminal state, so searching
+                        # deeper cannot change the result
+                        break
                     depth = depth + 1
             else:
                 if self.method == 'minimax':
                     v, next_move = self.minimax(game, self.search_depth)
                 elif self.method == 'alphabeta':
                     v, next_move = self.alphabeta(game, self.search_depth)
+                self.iteration_nodes.append(self.nodes)
+                self.iteration_times.append(1000 * (timeit.default_timer() - start))
+                completed_depth = self.search_depth
         except Timeout:
             # Handle any actions required at timeout, if necessary
-            pass
+            timed_out = True
+
+        if self.trace:
+            self.search_log.append(self.make_record(
+                game, completed_depth, 1000 * (timeit.default_timer() - start), timed_out))
         return next_move
 
         # Return the best move from the last completed search iteration
         # raise NotImplementedError
 
+    def parallel_search(self, game, legal_moves):
+        """Run iterative deepening alpha-beta search with the root moves
+        split across `workers` processes.
+
+        Each worker searches its share of the root moves with its own copy of
+        the agent (transposition table and move ordering state included) and
+        reports the best move of every depth it completes as soon as it
+        completes it. The processes cannot call `time_left`, so they stop at
+        an absolute deadline on the `time.perf_counter()` clock, computed
+        from it to leave TIMER_THRESHOLD ms for the parent to collect the
+        reports and another TIMER_THRESHOLD ms to return. While the workers
+        run, the agent searches depth 1 itself so that it has a move to play
+        if no deeper iteration is completed by every worker in time (see
+        combine_root_results()).
+
+        Parameters
+        ----------
+        game : isolation.Board
+            The current game state; the agent must be the active player.
+
+        legal_moves : list<(int, int)>
+            The legal moves of the agent.
+
+        Returns
+        -------
+        (int, int)
+            The best move of the deepest completed iteration (the first legal
+            move if no iteration completed).
+
+        int
+            The deepest completed iteration.
+
+        bool
+            True if the search was stopped by the deadline.
+        """
+        # drop the reports of searches that ran past their deadline
+        self.search_id += 1
+        try:
+            while True:
+                self.results.get_nowait()
+        except queue.Empty:
+            pass
+
+        deadline = time.perf_counter() + (self.time_left() - self.TIMER_THRESHOLD) / 1000.
+        num_tasks = min(self.workers, len(legal_moves))
+        for i in range(num_tasks):
+            self.pool.apply_async(_search_root_moves, ((
+                self.search_id, i, self, game, legal_moves[i::num_tasks], deadline),))
+
+        fallback, fallback_depth = legal_moves[0], 0
+        try:
+            _, fallback = self.alphabeta(game, 1)
+            fallback_depth = 1
+        except Timeout:
+            pass
+        own_nodes = self.nodes
+
+        outcomes = [([], False) for _ in range(num_tasks)]
+        nodes = [0] * num_tasks
+        finished = [False] * num_tasks
+        while not all(finished):
+            wait = (self.time_left() - self.TIMER_THRESHOLD) / 1000.
+            if wait <= 0:
+                break
+            try:
+                search_id, i, best, solved, nodes[i], done = self.results.get(timeout=wait)
+            except queue.Empty:
+                break
+            if search_id != self.search_id:
+                continue
+            if best is not None:
+                outcomes[i][0].append(best)
+                outcomes[i] = (outcomes[i][0], solved)
+            finished[i] = done
+        self.nodes = own_nodes + sum(nodes)
+
+        best_move, depth, timed_out = combine_root_results(outcomes, fallback)
+        if depth < fallback_depth:
+            return fallback, fallback_depth, True
+        return best_move, depth, timed_out
+
+    def reset_counters(self):
+        """Reset the search instrumentation counters. get_move() calls this
+        before every search; call it directly before invoking minimax() or
+        alphabeta() to measure a single search.
+        """
+        self.nodes = 0
+        self.reached_horizon = False
+        self.cutoffs = {}
+        self.first_move_cutoffs = 0
+        self.iteration_nodes = []
+        self.iteration_times = []
+
+    def make_record(self, game, depth, time, timed_out):
+        """Summarize the current instrumentation counters as a `SearchRecord`
+        for a search rooted at `game`.
+        """
+        root = game.move_count
+        max_ply = max(self.cutoffs) - root + 1 if self.cutoffs else 0
+        return SearchRecord(
+            move_count=root,
+            depth=depth,
+            nodes=self.nodes,
+            time=time,
+            iteration_nodes=tuple(self.iteration_nodes),
+            iteration_times=tuple(self.iteration_times),
+            cutoffs=tuple(self.cutoffs.get(root + ply, 0) for ply in range(max_ply)),
+            first_move_cutoffs=self.first_move_cutoffs,
+            timed_out=timed_out)
+
+    def new_search(self):
+        """Reset the move ordering state at the start of a new move. Killer
+        moves and the principal variation only describe the previous search,
+        while history scores are aged so that recent cutoffs dominate.
+        """
+        self.pv = []
+        self.pv_moves = {}
+        self.pv_lines = {}
+        self.killers = {}
+        self.history = {key: value // 2 for key, value in self.history.items() if value > 1}
+
+    def tt_key(self, game):
+        """Return the transposition table key of a position: its Zobrist
+        hash, combined with SEAT_KEY if the agent is the second player.
+        """
+        key = game.zobrist_key
+        return key ^ SEAT_KEY if game.__player_2__ is self else key
+
+    def order_moves(self, game, legal_moves, maximizing_player, hint=None):
+        """Sort legal moves so that the ones most likely to cause a cutoff in
+        alphabeta() are searched first.
+
+        The move from the principal variation of the previous iteration comes
+        first (when the position lies on that line), followed by the stored
+        transposition table move, the killer moves for the current ply, and
+        the remaining moves by descending history score.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            The game state the moves are legal in
+
+        legal_moves : list<(int, int)>
+            The legal moves of the active player
+
+        maximizing_player : bool
+            Flag indicating whether the moves are for a maximizing layer
+
+        hint : (int, int) (optional)
+            A move to prefer over killers and history, e.g., the best move
+            stored in the transposition table
+
+        Returns
+        -------
+        list<(int, int)>
+            The legal moves in search order
+        """
+        ply = game.move_count
+        pv_move = self.pv_moves.get(game.zobrist_key)
+        killers = self.killers.get(ply, ())
+        history = self.history
+
+        def priority(move):
+            return (move == pv_move, move == hint, move in killers,
+                    history.get((maximizing_player, move), 0))
+
+        return sorted(legal_moves, key=priority, reverse=True)
+
+    def update_pv(self, game, move):
+        """Make `move` followed by the line of the child just searched the
+        principal variation of the current node.
+        """
+        ply = game.move_count
+        self.pv_lines[ply] = [(game.zobrist_key, move)] + self.pv_lines.get(ply + 1, [])
+
+    def record_cutoff(self, game, move, depth, maximizing_player):
+        """Credit a move that caused an alpha-beta cutoff as a killer move
+        for the current ply and in the history table.
+        """
+        ply = game.move_count
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        key = (maximizing_player, move)
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
     def minimax(self, game, depth, maximizing_player=True):
         """Implement the minimax search algorithm as described in the lectures.
 
@@ -196,20 +697,23 @@ class CustomPlayer:
         """
         if self.time_left() < self.TIMER_THRESHOLD:
             raise Timeout()
+        self.nodes += 1
 
         # TODO: finish this function!
         # raise NotImplementedError
 
         if depth == 0:
+            self.reached_horizon = True
             return self.score(game, self), game.get_player_location(self)
-        if not game.get_legal_moves():
+        legal_moves = game.get_legal_moves()
+        if not legal_moves:
             return self.score(game, self), (-1, -1)
         if maximizing_player:
             good_value = float("-inf")
         else:
             good_value = float("inf")
         good_move = (-1, -1)
-        for move in game.get_legal_moves():
+        for move in legal_moves:
             v, m = self.minimax(game.forecast_move(
                 move), depth - 1, not maximizing_player)
             if (maximizing_player and v > good_value) or (not maximizing_player and v < good_value):
@@ -257,42 +761,111 @@ class CustomPlayer:
         """
         if self.time_left() < self.TIMER_THRESHOLD:
             raise Timeout()
+        self.nodes += 1
 
         # TODO: finish this function!
         # raise NotImplementedError
 
+        if self.move_ordering:
+            # forget the line of a previously searched sibling
+            self.pv_lines[game.move_count] = []
+
         if depth == 0:
+            self.reached_horizon = True
             return self.score(game, self), game.get_player_location(self)
-        if not game.get_legal_moves():
+        legal_moves = game.get_legal_moves()
+        if not legal_moves:
             return self.score(game, self), (-1, -1)
 
+        tt_move = None
+        if self.tt is not None:
+            # Use a stored result if it was searched at least as deep, and
+            # otherwise search the stored best move first
+            key = self.tt_key(game)
+            entry = self.tt.lookup(key)
+            if entry is not None and entry.move in legal_moves:
+                if entry.depth >= depth and (
+                        entry.flag == EXACT or
+                        entry.flag == LOWER and entry.value >= beta or
+                        entry.flag == UPPER and entry.value <= alpha):
+                    # the stored search may have been cut off by its depth
+                    self.reached_horizon = True
+                    return entry.value, entry.move
+                tt_move = entry.move
+            alpha_orig, beta_orig = alpha, beta
+
+        if self.move_ordering:
+            legal_moves = self.order_moves(game, legal_moves, maximizing_player, tt_move)
+        elif tt_move is not None:
+            legal_moves.remove(tt_move)
+            legal_moves.insert(0, tt_move)
+
         if maximizing_player:
             good_value = float("-inf")
         else:
             good_value = float("inf")
         good_move = (-1, -1)
 
+        values = None
+        if depth == 1 and self.batch_score is not None:
+            # every child is a leaf, so score them all in one call
+            values = self.batch_score([game.forecast_move(move) for move in legal_moves], self)
+            self.nodes += len(legal_moves)
+            self.reached_horizon = True
+            if self.move_ordering:
+                self.pv_lines[game.move_count + 1] = []
+
+        cutoff = None  # index of the move that caused a cutoff, if any
         if maximizing_player:
-            for move in game.get_legal_moves():
-                v, m = self.alphabeta(game.forecast_move(
-                    move), depth - 1, alpha, beta, not maximizing_player)
+            for idx, move in enumerate(legal_moves):
+                if values is not None:
+                    v = values[idx]
+                else:
+                    v, m = self.alphabeta(game.forecast_move(
+                        move), depth - 1, alpha, beta, not maximizing_player)
                 if v >= beta:
-                    return v, move
+                    good_value, good_move = v, move
+                    cutoff = idx
+                    break
                 if v > alpha:
                     alpha = v
                 if v > good_value:
                     good_value = v
                     good_move = move
-            return good_value, good_move
+                    if self.move_ordering:
+                        self.update_pv(game, move)
         else:
-            for move in game.get_legal_moves():
-                v, m = self.alphabeta(game.forecast_move(
-                    move), depth - 1, alpha, beta, not maximizing_player)
+            for idx, move in enumerate(legal_moves):
+                if values is not None:
+                    v = values[idx]
+                else:
+                    v, m = self.alphabeta(game.forecast_move(
+                        move), depth - 1, alpha, beta, not maximizing_player)
                 if v <= alpha:
-                    return v, move
+                    good_value, good_move = v, move
+                    cutoff = idx
+                    break
                 if v < beta:
                     beta = v
                 if v < good_value:
                     good_value = v
                     good_move = move
-            return good_value, good_move
+                    if self.move_ordering:
+                        self.update_pv(game, move)
+
+        if cutoff is not None:
+            self.cutoffs[game.move_count] = self.cutoffs.get(game.move_count, 0) + 1
+            if cutoff == 0:
+                self.first_move_cutoffs += 1
+            if self.move_ordering:
+                self.record_cutoff(game, good_move, depth, maximizing_player)
+
+        if self.tt is not None and good_move != (-1, -1):
+            if good_value <= alpha_orig:
+                flag = UPPER
+            elif good_value >= beta_orig:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.tt.store(key, depth, good_value, flag, good_move)
+        return good_value, good_move
@@ -0,0 +1,257 @@
+"""This file contains a compact binary store for finished Isolation games and
+a replay tool that re-evaluates the stored positions with a score function.
+
+A record file starts with the 8-byte signature `MAGIC` followed by one
+record per game, appended as soon as the game ends:
+
+    width, height, winner, termination, num_moves    (struct "<BBBBH")
+    num_moves bytes                                  (cell index of each move)
+
+`winner` is 1 or 2 for the player who won (0 if unknown). The low four bits
+of `termination` index `TERMINATIONS` and the high four bits index
+`MOVE_RULES` (0 for the standard knight rule). Each move is stored as its cell index
+(row * width + col), so a game on a 7x7 board takes 6 bytes plus one byte
+per ply (boards are limited to 256 cells). The moves start from the empty
+board and include every move that was applied, but not the final illegal
+or late move that ended the game.
+
+The replay tool evaluates every position of every game in a file, e.g.:
+
+    python game_records.py games.bin --score sample_players:improved_score
+"""
+
+import argparse
+import csv
+import importlib
+import os
+import struct
+import sys
+
+from collections import namedtuple
+
+from isolation import Board
+
+MAGIC = b"ISOREC1\n"
+HEADER = struct.Struct("<BBBBH")
+
+# Reasons for the end of a game as reported by `isolation.Board.play()`
+TERMINATIONS = ("", "timeout", "illegal move")
+
+# Move rules of `isolation.Board` in the order of their stored index
+MOVE_RULES = ("knight", "king", "queen")
+
+GameRecord = namedtuple("GameRecord", ["width", "height", "moves", "winner", "termination",
+                                       "move_rule"], defaults=("knight",))
+
+# Player objects used for the boards rebuilt from records
+PLAYERS = ("player1", "player2")
+
+
+def record_game(game, winner=None, termination=""):
+    """
+    Create a `GameRecord` from a finished game.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The final state of the game; the record holds every move applied to
+        the board since it was created.
+
+    winner : object (optional)
+        The winning player (e.g., as returned by `isolation.Board.play()`).
+
+    termination : str (optional)
+        The reason the game ended, one of `TERMINATIONS`.
+
+    Returns
+    -------
+    GameRecord
+    """
+    if winner == game.__player_1__:
+        winner = 1
+    elif winner == game.__player_2__:
+        winner = 2
+    else:
+        winner = 0
+    return GameRecord(game.width, game.height, tuple(game.get_applied_moves()), winner,
+                      termination, game.move_rule)
+
+
+def encode(record):
+    """Serialize a `GameRecord` to bytes."""
+    width = record.width
+    cells = bytes(row * width + col for row, col in record.moves)
+    flags = TERMINATIONS.index(record.termination) | MOVE_RULES.index(record.move_rule) << 4
+    header = HEADER.pack(width, record.height, record.winner, flags, len(cells))
+    return header + cells
+
+
+def decode(data, offset=0):
+    """
+    Deserialize the `GameRecord` that starts at `offset` in `data`.
+
+    Returns
+    -------
+    (GameRecord, int)
+        The record and the offset of the next record.
+    """
+    width, height, winner, flags, num_moves = HEADER.unpack_from(data, offset)
+    start = offset + HEADER.size
+    cells = data[start:start + num_moves]
+    if len(cells) < num_moves:
+        raise ValueError("Truncated game record at offset {}.".format(offset))
+    moves = tuple(divmod(idx, width) for idx in cells)
+    record = GameRecord(width, height, moves, winner, TERMINATIONS[flags & 0xF],
+                        MOVE_RULES[flags >> 4])
+    return record, start + num_moves
+
+
+class RecordWriter:
+    """Append-only writer for a game record file.
+
+    Records are written and flushed one game at a time, so a file can be
+    read while a tournament is still adding to it, and an interrupted run
+    keeps every game that finished.
+
+    Parameters
+    ----------
+    path : str
+        The record file; created if it does not exist, appended to if it
+        does.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, record):
+        """Append a `GameRecord` to the file."""
+        self.file.write(encode(record))
+        self.file.flush()
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+
+def read_records(path):
+    """
+    Iterate over the `GameRecord` entries of a record file, reading one
+    game at a time.
+    """
+    with open(path, "rb") as record_file:
+        if record_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{} is not a game record file.".format(path))
+        while True:
+            header = record_file.read(HEADER.size)
+            if not header:
+                break
+            if len(header) < HEADER.size:
+                raise ValueError("Truncated game record in {}.".format(path))
+            data = header + record_file.read(HEADER.unpack(header)[-1])
+            record, _ = decode(data)
+            yield record
+
+
+def positions(record):
+    """
+    Replay a game and yield the board after each move, starting from the
+    empty board. The same `isolation.Board` instance is updated in place
+    between positions, so copy it to keep a position.
+
+    Yields
+    ------
+    `isolation.Board`
+        A board whose players are the strings in `PLAYERS`.
+    """
+    game = Board(PLAYERS[0], PLAYERS[1], record.width, record.height, record.move_rule)
+    yield game
+    for move in record.moves:
+        game.apply_move(move)
+        yield game
+
+
+def evaluate(records, score_fn):
+    """
+    Evaluate every position of a sequence of games with a score function.
+
+    Parameters
+    ----------
+    records : iterable<GameRecord>
+        The games to replay.
+
+    score_fn : callable
+        A heuristic evaluation function `score_fn(game, player)`.
+
+    Yields
+    ------
+    (int, int, float, int)
+        The index of the game, the number of moves played, the score of the
+        position for the player to move, and the result of the game for
+        that player (1 for a win, 0 for a loss, None if unknown).
+    """
+    for game_idx, record in enumerate(records):
+        for game in positions(record):
+            player = game.active_player
+            if record.winner:
+                result = int(PLAYERS[record.winner - 1] == player)
+            else:
+                result = None
+            yield game_idx, game.move_count, score_fn(game, player), result
+
+
+def load_score_fn(name):
+    """Import a score function given as "module:function"."""
+    module_name, _, function_name = name.partition(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def main(path, score_name, output=None):
+    """
+    Write the evaluation of every stored position as CSV (to `output`, or
+    standard output) and print how often the sign of the score predicts the
+    result of the game.
+    """
+    score_fn = load_score_fn(score_name)
+    out = open(output, "w", newline="") if output else sys.stdout
+    writer = csv.writer(out)
+    writer.writerow(["game", "ply", "score", "result"])
+    correct = decided = total = 0
+    try:
+        for row in evaluate(read_records(path), score_fn):
+            writer.writerow(row)
+            _, _, score, result = row
+            total += 1
+            if result is not None and score != 0:
+                decided += 1
+                correct += (score > 0) == bool(result)
+    finally:
+        if output:
+            out.close()
+    print("{} positions evaluated with {}; the sign of the score predicts the winner "
+          "in {:.1f}% of {} decided positions".format(
+              total, score_name, 100. * correct / decided if decided else 0., decided),
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Re-evaluate the positions of stored Isolation games.")
+    parser.add_argument("path", help="game record file written by tournament.py --records")
+    parser.add_argument("--score", default="sample_players:improved_score",
+                        help="score function to evaluate with, as module:function")
+    parser.add_argument("--output", default=None,
+                        help="CSV file for the evaluations (default: standard output)")
+    args = parser.parse_args()
+    if not os.path.exists(args.path):
+        parser.error("{} does not exist".format(args.path))
+    main(args.path, args.score, args.output)
@@ -8,19 +8,214 @@ remain compatible with the defaults provided, and none of your changes will
 be available to project reviewers.
 """
 
+import random
 import timeit
 
-from copy import deepcopy
 from copy import copy
 
 
 TIME_LIMIT_MILLIS = 200
 
+# Offsets (row, col) for an L-shaped motion like a knight in chess, in the
+# order that legal moves are reported by `Board.get_legal_moves()`
+KNIGHT_DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                     (1, -2),  (1, 2), (2, -1),  (2, 1)]
+
+# Offsets (row, col) to the eight surrounding cells, for king and queen moves
+KING_DIRECTIONS = [(-1, -1), (-1, 0), (-1, 1), (0, -1),
+                   (0, 1), (1, -1), (1, 0), (1, 1)]
+
+# Move rules supported by `Board`: the offsets of a single step and whether
+# a piece may repeat the step in the same direction until it meets a blocked
+# cell or the edge of the board (sliding, like a queen in chess)
+MOVE_RULES = {
+    "knight": (KNIGHT_DIRECTIONS, False),
+    "king": (KING_DIRECTIONS, False),
+    "queen": (KING_DIRECTIONS, True),
+}
+
+# Precomputed adjacency tables shared by every board of the same size and
+# move rule; see `move_table()`
+_MOVE_TABLES = {}
+
+# Cells of each board size in the order of `Board.get_blank_spaces()`; see
+# `cell_order()`
+_CELL_ORDERS = {}
+
+# Zobrist keys shared by every board of the same size; see `zobrist_table()`
+_ZOBRIST_TABLES = {}
+ZOBRIST_SEED = 0x15014710
+
+# Cell permutations for the symmetries of each board size; see
+# `symmetry_table()`
+_SYMMETRY_TABLES = {}
+
+
+def move_table(width, height, rule="knight"):
+    """
+    Return the precomputed adjacency tables for a board size and move rule.
+
+    The tables are built once per (width, height, rule) and shared by every
+    `Board` instance with those settings. Cells are indexed as
+    (row * width + col), which is also the bit position of the cell in the
+    board bitboard.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns on the board.
+
+    height : int
+        The number of rows on the board.
+
+    rule : str (optional)
+        One of the move rules in `MOVE_RULES`.
+
+    Returns
+    ----------
+    (tuple, tuple)
+        A pair (neighbors, masks) indexed by cell. For jumping rules (knight,
+        king), neighbors[idx] is a tuple of ((row, col), bit) pairs for every
+        on-board destination reachable from the cell; for sliding rules
+        (queen), it is a tuple of rays, each a tuple of ((row, col), bit)
+        pairs ordered away from the cell. masks[idx] is the bitwise OR of
+        every destination bit, i.e., the moves available on an empty board.
+    """
+    key = (width, height, rule)
+    if key not in _MOVE_TABLES:
+        if rule not in MOVE_RULES:
+            raise ValueError("Unknown move rule {!r}; expected one of {}.".format(
+                rule, ", ".join(sorted(MOVE_RULES))))
+        directions, sliding = MOVE_RULES[rule]
+        neighbors = []
+        masks = []
+        for r in range(height):
+            for c in range(width):
+                rays = []
+                for dr, dc in directions:
+                    ray = []
+                    row, col = r + dr, c + dc
+                    while 0 <= row < height and 0 <= col < width:
+                        ray.append(((row, col), 1 << (row * width + col)))
+                        if not sliding:
+                            break
+                        row, col = row + dr, col + dc
+                    if ray:
+                        rays.append(tuple(ray))
+                cells = tuple(rays) if sliding else tuple(ray[0] for ray in rays)
+                mask = 0
+                for ray in rays:
+                    for _, bit in ray:
+                        mask |= bit
+                neighbors.append(cells)
+                masks.append(mask)
+        _MOVE_TABLES[key] = (tuple(neighbors), tuple(masks))
+    return _MOVE_TABLES[key]
+
+
+def cell_order(width, height):
+    """
+    Return the ((row, col), bit) pairs of every cell of a board size in the
+    order used by `Board.get_blank_spaces()` (column by column), shared by
+    every board of that size.
+    """
+    key = (width, height)
+    if key not in _CELL_ORDERS:
+        _CELL_ORDERS[key] = tuple(((i, j), 1 << (i * width + j))
+                                  for j in range(width) for i in range(height))
+    return _CELL_ORDERS[key]
+
+
+def zobrist_table(width, height):
+    """
+    Return the Zobrist hashing keys for a board size.
+
+    The keys are drawn from a generator with a fixed seed, so every process
+    computes identical hashes for identical positions (e.g., to share or
+    persist transposition tables).
+
+    Parameters
+    ----------
+    width : int
+        The number of columns on the board.
+
+    height : int
+        The number of rows on the board.
+
+    Returns
+    ----------
+    (tuple, dict, int)
+        A triple (blocked, pieces, side). blocked[idx] is the key for a
+        blocked cell, pieces[symbol][idx] is the key for player 1 (symbol 1)
+        or player 2 (symbol 2) standing on the cell, and side is toggled
+        whenever the initiative passes to the other player.
+    """
+    key = (width, height)
+    if key not in _ZOBRIST_TABLES:
+        rng = random.Random(ZOBRIST_SEED ^ (width << 16) ^ height)
+        cells = width * height
+        blocked = tuple(rng.getrandbits(64) for _ in range(cells))
+        pieces = {1: tuple(rng.getrandbits(64) for _ in range(cells)),
+                  2: tuple(rng.getrandbits(64) for _ in range(cells))}
+        _ZOBRIST_TABLES[key] = (blocked, pieces, rng.getrandbits(64))
+    return _ZOBRIST_TABLES[key]
+
+
+def symmetry_table(width, height):
+    """
+    Return the cell permutations for the symmetries of a board size.
+
+    Square boards have eight symmetries (the rotations and reflections of the
+    dihedral group); other boards have four (the identity, both reflections
+    and the half turn). Knight moves are preserved by all of them, so a game
+    mapped through any symmetry plays exactly like the original. The first
+    symmetry is always the identity.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns on the board.
+
+    height : int
+        The number of rows on the board.
+
+    Returns
+    ----------
+    tuple<(tuple, tuple)>
+        A pair (perm, inverse) for every symmetry. perm[idx] is the index of
+        the image of cell idx (row * width + col) and inverse undoes perm.
+    """
+    key = (width, height)
+    if key not in _SYMMETRY_TABLES:
+        w, h = width - 1, height - 1
+        maps = [lambda r, c: (r, c),
+                lambda r, c: (r, w - c),
+                lambda r, c: (h - r, c),
+                lambda r, c: (h - r, w - c)]
+        if width == height:
+            maps += [lambda r, c: (c, r),
+                     lambda r, c: (c, h - r),
+                     lambda r, c: (w - c, r),
+                     lambda r, c: (w - c, h - r)]
+        symmetries = []
+        for transform in maps:
+            perm = [0] * (width * height)
+            for r in range(height):
+                for c in range(width):
+                    tr, tc = transform(r, c)
+                    perm[r * width + c] = tr * width + tc
+            inverse = [0] * len(perm)
+            for idx, image in enumerate(perm):
+                inverse[image] = idx
+            symmetries.append((tuple(perm), tuple(inverse)))
+        _SYMMETRY_TABLES[key] = tuple(symmetries)
+    return _SYMMETRY_TABLES[key]
+
 
 class Board(object):
     """
     Implement a model for the game Isolation assuming each player moves like
-    a knight in chess.
+    a knight in chess (or another piece; see `move_rule`).
 
     Parameters
     ----------
@@ -37,21 +232,43 @@ class Board(object):
 
     height : int (optional)
         The number of rows that the board should have.
+
+    move_rule : str (optional)
+        How the players move: "knight" (the default), "king" (one step in any
+        direction) or "queen" (any number of steps in a straight line over
+        blank cells); see `MOVE_RULES`.
+
+    Notes
+    -----
+        The blocked cells are stored as a single integer bitboard in which
+        bit (row * width + col) is set once either player has occupied the
+        cell.  Every piece of game state is either an immutable integer or a
+        small dictionary, so `copy()` and `forecast_move()` never walk the
+        grid, and `apply_move()` / `undo_move()` update the state in O(1).
+        Legal moves are read from adjacency tables compiled once per board
+        size and move rule (see `move_table()`), so the cost of a search
+        node does not grow with the size of the board.
     """
     BLANK = 0
     NOT_MOVED = None
 
-    def __init__(self, player_1, player_2, width=7, height=7):
+    def __init__(self, player_1, player_2, width=7, height=7, move_rule="knight"):
         self.width = width
         self.height = height
+        self.move_rule = move_rule
         self.move_count = 0
         self.__player_1__ = player_1
         self.__player_2__ = player_2
         self.__active_player__ = player_1
         self.__inactive_player__ = player_2
-        self.__board_state__ = [[Board.BLANK for i in range(width)] for j in range(height)]
+        self.__board_state__ = Board.BLANK
         self.__last_player_move__ = {player_1: Board.NOT_MOVED, player_2: Board.NOT_MOVED}
         self.__player_symbols__ = {Board.BLANK: Board.BLANK, player_1: 1, player_2: 2}
+        self.__undo_stack__ = None
+        self.__move_table__ = move_table(width, height, move_rule)
+        self.__sliding__ = MOVE_RULES[move_rule][1]
+        self.__zobrist_table__ = zobrist_table(width, height)
+        self.__zobrist__ = 0
 
     @property
     def active_player(self):
@@ -69,6 +286,18 @@ class Board(object):
         """
         return self.__inactive_player__
 
+    @property
+    def zobrist_key(self):
+        """
+        A 64-bit Zobrist hash of the game state (blocked cells, both player
+        locations and the player holding initiative), updated incrementally
+        by `apply_move()` and `undo_move()`.
+
+        Subclasses that override `copy()` must carry `__zobrist__` over to
+        the new board for the key to remain valid.
+        """
+        return self.__zobrist__
+
     def get_opponent(self, player):
         """
         Return the opponent of the supplied player.
@@ -92,16 +321,104 @@ class Board(object):
         raise RuntimeError("`player` must be an object registered as a player in the current game.")
 
     def copy(self):
-        """ Return a deep copy of the current board. """
-        new_board = Board(self.__player_1__, self.__player_2__, width=self.width, height=self.height)
+        """ Return a deep copy of the current board.
+
+        The bitboard and the undo stack are immutable, so the copy shares
+        them with the original instead of duplicating the grid.
+        """
+        new_board = Board.__new__(Board)
+        new_board.width = self.width
+        new_board.height = self.height
+        new_board.move_rule = self.move_rule
         new_board.move_count = self.move_count
+        new_board.__player_1__ = self.__player_1__
+        new_board.__player_2__ = self.__player_2__
         new_board.__active_player__ = self.__active_player__
         new_board.__inactive_player__ = self.__inactive_player__
         new_board.__last_player_move__ = copy(self.__last_player_move__)
-        new_board.__player_symbols__ = copy(self.__player_symbols__)
-        new_board.__board_state__ = deepcopy(self.__board_state__)
+        new_board.__player_symbols__ = self.__player_symbols__
+        new_board.__board_state__ = self.__board_state__
+        new_board.__undo_stack__ = self.__undo_stack__
+        new_board.__move_table__ = self.__move_table__
+        new_board.__sliding__ = self.__sliding__
+        new_board.__zobrist_table__ = self.__zobrist_table__
+        new_board.__zobrist__ = self.__zobrist__
         return new_board
 
+    def canonical_form(self):
+        """
+        Return a key identifying the game state up to the symmetries of the
+        board, and the symmetry that maps this board onto the canonical form.
+
+        Every board related to this one by a rotation or reflection (see
+        `symmetry_table()`) has the same key, so caches keyed by it (e.g.,
+        transposition tables, opening books or evaluation caches) store one
+        entry for up to eight positions. Moves read from or written to such
+        a cache must be translated with `transform_move()`.
+
+        Returns
+        ----------
+        (tuple, int)
+            A pair (key, transform). key is a hashable tuple (width, height,
+            move_rule, blocked, location_1, location_2, side) where blocked
+            is the canonical bitboard, location_1 and location_2 are the
+            canonical cell indices of player 1 and player 2 (-1 before their
+            first move), and side is 1 or 2 for the player holding initiative.
+            transform is the index of the symmetry in `symmetry_table()`.
+        """
+        width = self.width
+        state = self.__board_state__
+        blocked = []
+        while state:
+            bit = state & -state
+            blocked.append(bit.bit_length() - 1)
+            state ^= bit
+        locations = [self.__last_player_move__[p] for p in (self.__player_1__, self.__player_2__)]
+        locations = [-1 if loc is None else loc[0] * width + loc[1] for loc in locations]
+
+        best = None
+        for t, (perm, _) in enumerate(symmetry_table(width, self.height)):
+            image = 0
+            for idx in blocked:
+                image |= 1 << perm[idx]
+            key = (image,) + tuple(-1 if loc < 0 else perm[loc] for loc in locations)
+            if best is None or key < best[0]:
+                best = (key, t)
+
+        key, t = best
+        side = self.__player_symbols__[self.__active_player__]
+        return (width, self.height, self.move_rule) + key + (side,), t
+
+    def transform_move(self, move, transform, inverse=False):
+        """
+        Map a move through one of the symmetries of the board.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) on this board, or in canonical
+            coordinates if `inverse` is True. (-1, -1) is returned unchanged.
+
+        transform : int
+            The index of a symmetry in `symmetry_table()`, e.g., as returned
+            by `canonical_form()`.
+
+        inverse : boolean (optional)
+            Flag indicating whether to map a canonical move back onto this
+            board instead of mapping a move of this board to the canonical
+            orientation.
+
+        Returns
+        ----------
+        (int, int)
+            The image of the move.
+        """
+        if move == (-1, -1):
+            return move
+        perm, inverse_perm = symmetry_table(self.width, self.height)[transform]
+        table = inverse_perm if inverse else perm
+        return divmod(table[move[0] * self.width + move[1]], self.width)
+
     def forecast_move(self, move):
         """
         Return a deep copy of the current game with an input move applied to
@@ -140,14 +457,14 @@ class Board(object):
         row, col = move
         return 0 <= row < self.height and \
                0 <= col < self.width and \
-               self.__board_state__[row][col] == Board.BLANK
+               not (self.__board_state__ >> (row * self.width + col)) & 1
 
     def get_blank_spaces(self):
         """
         Return a list of the locations that are still available on the board.
         """
-        return [(i, j) for j in range(self.width) for i in range(self.height)
-            if self.__board_state__[i][j] == Board.BLANK]
+        state = self.__board_state__
+        return [cell for cell, bit in cell_order(self.width, self.height) if not state & bit]
 
     def get_player_location(self, player):
         """
@@ -185,6 +502,32 @@ class Board(object):
             player = self.active_player
         return self.__get_moves__(self.__last_player_move__[player])
 
+    def count_legal_moves(self, player=None):
+        """
+        Count the legal moves of a player and of its opponent at once.
+
+        Counting uses the precomputed neighbor masks for the board size, so
+        heuristics that only need mobility can call this once per node
+        instead of building two lists with `get_legal_moves()`.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            count from the perspective of the active player on the board.
+
+        Returns
+        ----------
+        (int, int)
+            The number of legal moves available to `player` and to its
+            opponent, respectively.
+        """
+        if player is None:
+            player = self.active_player
+        opponent = self.get_opponent(player)
+        return (self.__count_moves__(self.__last_player_move__[player]),
+                self.__count_moves__(self.__last_player_move__[opponent]))
+
     def apply_move(self, move):
         """
         Move the active player to a specified location.
@@ -200,18 +543,82 @@ class Board(object):
         None
         """
         row, col = move
-        self.__last_player_move__[self.active_player] = move
-        self.__board_state__[row][col] = self.__player_symbols__[self.active_player]
+        player = self.__active_player__
+        previous = self.__last_player_move__[player]
+        self.__undo_stack__ = (move, previous, self.__undo_stack__)
+        self.__last_player_move__[player] = move
+        self.__board_state__ |= 1 << (row * self.width + col)
+        self.__update_zobrist__(player, move, previous)
         self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
         self.move_count += 1
 
+    def undo_move(self):
+        """
+        Revert the most recent call to `apply_move()`, restoring the previous
+        location of the player that moved and returning the initiative to it.
+
+        Boards created by `copy()` or `forecast_move()` share the undo stack
+        of their parent, so a forecast board can be unwound past the point at
+        which it was copied without affecting the original.
+
+        Returns
+        ----------
+        (int, int)
+            The move that was reverted.
+        """
+        if self.__undo_stack__ is None:
+            raise RuntimeError("There are no moves to undo on this board.")
+        move, previous, self.__undo_stack__ = self.__undo_stack__
+        row, col = move
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        self.__last_player_move__[self.__active_player__] = previous
+        self.__board_state__ &= ~(1 << (row * self.width + col))
+        self.__update_zobrist__(self.__active_player__, move, previous)
+        self.move_count -= 1
+        return move
+
+    def get_applied_moves(self):
+        """
+        Return the moves applied to the board since it was created, in the
+        order they were played (i.e., the moves that `undo_move()` would
+        revert, oldest first).
+
+        Returns
+        ----------
+        list<(int, int)>
+            The coordinate pairs (row, column) of the applied moves.
+        """
+        moves = []
+        node = self.__undo_stack__
+        while node is not None:
+            moves.append(node[0])
+            node = node[2]
+        moves.reverse()
+        return moves
+
+    def __update_zobrist__(self, player, move, previous):
+        """
+        Toggle the Zobrist keys for `player` moving from `previous` to `move`.
+        Applying the same update twice restores the original key, so this
+        serves both `apply_move()` and `undo_move()`.
+        """
+        blocked, pieces, side = self.__zobrist_table__
+        piece = pieces[self.__player_symbols__[player]]
+        idx = move[0] * self.width + move[1]
+        key = self.__zobrist__ ^ blocked[idx] ^ piece[idx] ^ side
+        if previous != Board.NOT_MOVED:
+            key ^= piece[previous[0] * self.width + previous[1]]
+        self.__zobrist__ = key
+
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
-        return player == self.inactive_player and not self.get_legal_moves(self.active_player)
+        return player == self.inactive_player and \
+            not self.__count_moves__(self.__last_player_move__[self.active_player])
 
     def is_loser(self, player):
         """ Test whether the specified player has lost the game. """
-        return player == self.active_player and not self.get_legal_moves(self.active_player)
+        return player == self.active_player and \
+            not self.__count_moves__(self.__last_player_move__[self.active_player])
 
     def utility(self, player):
         """
@@ -237,7 +644,7 @@ class Board(object):
             otherwise.
         """
 
-        if not self.get_legal_moves(self.active_player):
+        if not self.__count_moves__(self.__last_player_move__[self.active_player]):
 
             if player == self.inactive_player:
                 return float("inf")
@@ -249,22 +656,53 @@ class Board(object):
 
     def __get_moves__(self, move):
         """
-        Generate the list of possible moves for an L-shaped motion (like a
-        knight in chess).
+        Generate the list of possible moves from a location under the move
+        rule of the board (an L-shaped motion like a knight in chess by
+        default).
         """
 
         if move == Board.NOT_MOVED:
             return self.get_blank_spaces()
 
         r, c = move
+        state = self.__board_state__
+        neighbors = self.__move_table__[0][r * self.width + c]
 
-        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                      (1, -2),  (1, 2), (2, -1),  (2, 1)]
+        if self.__sliding__:
+            valid_moves = []
+            for ray in neighbors:
+                for cell, bit in ray:
+                    if state & bit:
+                        break
+                    valid_moves.append(cell)
+            return valid_moves
 
-        valid_moves = [(r+dr,c+dc) for dr, dc in directions if self.move_is_legal((r+dr, c+dc))]
+        valid_moves = [cell for cell, bit in neighbors if not state & bit]
 
         return valid_moves
 
+    def __count_moves__(self, move):
+        """
+        Count the moves that `__get_moves__()` would generate from a location
+        without building the list.
+        """
+
+        if move == Board.NOT_MOVED:
+            return self.width * self.height - bin(self.__board_state__).count("1")
+
+        r, c = move
+        if self.__sliding__:
+            state = self.__board_state__
+            count = 0
+            for ray in self.__move_table__[0][r * self.width + c]:
+                for _, bit in ray:
+                    if state & bit:
+                        break
+                    count += 1
+            return count
+        open_cells = self.__move_table__[1][r * self.width + c] & ~self.__board_state__
+        return bin(open_cells).count("1")
+
     def print_board(self):
         """DEPRECATED - use Board.to_string()"""
         return self.to_string()
@@ -285,7 +723,7 @@ class Board(object):
 
             for j in range(self.width):
 
-                if not self.__board_state__[i][j]:
+                if not (self.__board_state__ >> (i * self.width + j)) & 1:
                     out += ' '
                 elif p1_loc and i == p1_loc[0] and j == p1_loc[1]:
                     out += '1'
@@ -299,7 +737,7 @@ class Board(object):
 
         return out
 
-    def play(self, time_limit=TIME_LIMIT_MILLIS):
+    def play(self, time_limit=TIME_LIMIT_MILLIS, timer=timeit.default_timer):
         """
         Execute a match between the players by alternately soliciting them
         to select a move and applying it in the game.
@@ -310,6 +748,12 @@ class Board(object):
             The maximum number of milliseconds to allow before timeout
             during each turn.
 
+        timer : callable (optional)
+            A function returning the current time in seconds, used to measure
+            the time taken by each turn. Defaults to wall-clock time; pass
+            `time.process_time` to charge each player only for the CPU time
+            of its own process (e.g., when many games share the machine).
+
         Returns
         ----------
         (player, list<[(int, int),]>, str)
@@ -319,7 +763,7 @@ class Board(object):
         """
         move_history = []
 
-        curr_time_millis = lambda: 1000 * timeit.default_timer()
+        curr_time_millis = lambda: 1000 * timer()
 
         while True:
 
@@ -0,0 +1,247 @@
+"""This file contains a Monte Carlo Tree Search player for Isolation.
+
+`MCTSPlayer` grows a UCT search tree from the current position for as long
+as the time limit allows, estimating the value of each leaf with a random
+playout to the end of the game. The tree and the playouts work directly on
+integers (the blocked cell bitboard of `isolation.Board` and the cell
+indices of both players) with the shared move tables, so no `Board`
+objects are created during the search. The subtree of the position reached
+after the opponent replies is kept for the next move.
+"""
+
+import gc
+import math
+import random
+import timeit
+
+from game_agent import SearchRecord
+from isolation.isolation import MOVE_RULES, move_table
+
+
+class _Node:
+    """A position in the search tree, reached by the player who moved to the
+    cell `move`. `wins` counts the playouts won by that player.
+
+    Nodes do not link back to their parents, so a discarded subtree has no
+    reference cycles and is freed as soon as it becomes unreachable instead
+    of by a (slow, untimed) garbage collection pass.
+    """
+    __slots__ = ("move", "children", "untried", "visits", "wins")
+
+    def __init__(self, move, untried):
+        self.move = move
+        self.children = {}
+        self.untried = untried
+        self.visits = 0
+        self.wins = 0.
+
+
+class MCTSPlayer:
+    """Game-playing agent that chooses a move with Monte Carlo Tree Search
+    using the UCT selection rule and uniformly random playouts.
+
+    Parameters
+    ----------
+    exploration : float (optional)
+        The exploration constant c of the UCT rule
+        wins / visits + c * sqrt(ln(parent visits) / visits).
+
+    timeout : float (optional)
+        Time remaining (in milliseconds) when search is stopped.
+
+    reuse_tree : boolean (optional)
+        Flag indicating whether get_move() should continue from the subtree
+        of the previous search that matches the current position.
+
+    trace : boolean (optional)
+        Flag indicating whether get_move() should append a
+        `game_agent.SearchRecord` describing each search to `search_log`;
+        its `nodes` are the playouts and its `depth` the deepest node
+        selected in the tree.
+
+    seed : int (optional)
+        Seed for the random number generator used by the playouts.
+
+    Attributes
+    ----------
+    playouts : int
+        The number of playouts run by the last call to get_move().
+    """
+
+    def __init__(self, exploration=math.sqrt(2), timeout=10., reuse_tree=True,
+                 trace=False, seed=None):
+        self.exploration = exploration
+        self.TIMER_THRESHOLD = timeout
+        self.reuse_tree = reuse_tree
+        self.trace = trace
+        self.search_log = []
+        self.rng = random.Random(seed)
+        self.playouts = 0
+        self.tree = None
+        self.discarded = None
+
+    def __getstate__(self):
+        """Drop the search tree so that agents can be sent to worker
+        processes cheaply.
+        """
+        state = self.__dict__.copy()
+        state['tree'] = state['discarded'] = None
+        return state
+
+    def get_move(self, game, legal_moves, time_left):
+        """Search for the best move until the time limit expires and return
+        the most visited move at the root.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        legal_moves : list<(int, int)>
+            A list containing legal moves. Moves are encoded as tuples of pairs
+            of ints defining the next (row, col) for the agent to occupy.
+
+        time_left : callable
+            A function that returns the number of milliseconds left in the
+            current turn. Returning with any less than 0 ms remaining forfeits
+            the game.
+
+        Returns
+        -------
+        (int, int)
+            Board coordinates corresponding to a legal move; may return
+            (-1, -1) if there are no available legal moves.
+        """
+        if not legal_moves:
+            return (-1, -1)
+        start = timeit.default_timer()
+
+        # The tree has no reference cycles, so the cyclic garbage collector
+        # would only add untimed pauses proportional to the size of the tree
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self.search(game, legal_moves, time_left, start)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def search(self, game, legal_moves, time_left, start):
+        """Run the search for get_move()."""
+        # free the part of the previous tree that is not reused while the
+        # timer is running, rather than after the last check of time_left
+        self.discarded = None
+
+        width = game.width
+        table, _ = move_table(width, game.height, game.move_rule)
+        sliding = MOVE_RULES[game.move_rule][1]
+        if sliding:
+            neighbors = [tuple(tuple((bit, bit.bit_length() - 1) for _, bit in ray) for ray in rays)
+                         for rays in table]
+        else:
+            neighbors = [tuple((bit, bit.bit_length() - 1) for _, bit in cells)
+                         for cells in table]
+        cells = width * game.height
+
+        def legal(blocked, location):
+            if location < 0:
+                return [idx for idx in range(cells) if not (blocked >> idx) & 1]
+            if sliding:
+                moves = []
+                for ray in neighbors[location]:
+                    for bit, idx in ray:
+                        if blocked & bit:
+                            break
+                        moves.append(idx)
+                return moves
+            return [idx for bit, idx in neighbors[location] if not blocked & bit]
+
+        def index(location):
+            return -1 if location is None else location[0] * width + location[1]
+
+        blocked = game.__board_state__
+        own = index(game.get_player_location(game.active_player))
+        opp = index(game.get_player_location(game.inactive_player))
+        root = self.find_root(blocked, opp)
+        if root is None:
+            root = _Node(opp, [m[0] * width + m[1] for m in legal_moves])
+
+        rng = self.rng
+        log = math.log
+        sqrt = math.sqrt
+        c = self.exploration
+        playouts = 0
+        max_depth = 0
+
+        while time_left() > self.TIMER_THRESHOLD or not root.children:
+            node, state, mover, waiting = root, blocked, own, opp
+            path = [root]
+
+            # selection: descend through fully expanded nodes by UCT
+            while not node.untried and node.children:
+                scale = c * sqrt(log(node.visits))
+                node = max(node.children.values(),
+                           key=lambda n: n.wins / n.visits + scale / sqrt(n.visits))
+                state |= 1 << node.move
+                mover, waiting = waiting, node.move
+                path.append(node)
+
+            # expansion: add one untried move
+            if node.untried:
+                move = node.untried.pop(rng.randrange(len(node.untried)))
+                state |= 1 << move
+                mover, waiting = waiting, move
+                child = _Node(move, legal(state, mover))
+                node.children[move] = child
+                node = child
+                path.append(node)
+            max_depth = max(max_depth, len(path) - 1)
+
+            # playout: alternate random moves until the player to move is
+            # stuck; `result` is 1 if the player who moved into `node` wins
+            result = 1.
+            while True:
+                if mover < 0 or sliding:
+                    moves = legal(state, mover)
+                else:
+                    moves = [idx for bit, idx in neighbors[mover] if not state & bit]
+                if not moves:
+                    break
+                move = moves[rng.randrange(len(moves))]
+                state |= 1 << move
+                mover, waiting = waiting, move
+                result = 1. - result
+
+            # backpropagation
+            for node in reversed(path):
+                node.visits += 1
+                node.wins += result
+                result = 1. - result
+            playouts += 1
+
+        best = max(root.children.values(), key=lambda n: n.visits)
+        self.tree = (best, blocked | (1 << best.move)) if self.reuse_tree else None
+        self.discarded = root
+        self.playouts = playouts
+
+        if self.trace:
+            self.search_log.append(SearchRecord(
+                move_count=game.move_count, depth=max_depth, nodes=playouts,
+                time=1000 * (timeit.default_timer() - start), iteration_nodes=(),
+                iteration_times=(), cutoffs=(), first_move_cutoffs=0, timed_out=False))
+        return divmod(best.move, width)
+
+    def find_root(self, blocked, opp):
+        """Return the node of the previous search tree for the position in
+        which the opponent moved to cell `opp` and the blocked cells are
+        `blocked`, or None if the position is not in the tree.
+        """
+        if self.tree is None:
+            return None
+        node, tree_blocked = self.tree
+        self.tree = None
+        child = node.children.get(opp)
+        if child is None or tree_blocked | (1 << opp) != blocked:
+            return None
+        return child
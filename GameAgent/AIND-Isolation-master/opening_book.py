@@ -0,0 +1,158 @@
+"""This file contains an opening book for Isolation: a table of precomputed
+replies for the first plies of the game, when the branching factor is the
+largest (a player that has not moved yet may jump to any blank cell).
+
+Positions are stored in a canonical form shared by every board related by a
+symmetry of the board (rotations and reflections), so a book for a 7x7
+board needs roughly one eighth of the entries. The book is built offline by
+searching every canonical position with alpha-beta and saved to disk as
+JSON, e.g.:
+
+    python opening_book.py --plies 4 --depth 8 --output opening_book.json
+"""
+
+import argparse
+import json
+import timeit
+
+from isolation import Board
+from game_agent import CustomPlayer
+from sample_players import improved_score
+
+# Default location of the book loaded by tournament.py
+BOOK_FILE = "opening_book.json"
+
+
+def canonical_key(game):
+    """
+    Return a string identifying the position of a game up to symmetry, and
+    the index of the symmetry that maps the game onto its canonical form
+    (see `isolation.Board.canonical_form()`).
+
+    The player to move is implied by the number of blocked cells, so the key
+    only encodes the board size (and move rule, unless players move like
+    knights), the blocked cells and both player locations.
+    """
+    (width, height, rule, image, loc1, loc2, _), t = game.canonical_form()
+    size = "{}x{}".format(width, height) + ("" if rule == "knight" else "/" + rule)
+    return "{}:{:x}:{}:{}".format(size, image, loc1, loc2), t
+
+
+class OpeningBook:
+    """Mapping from canonical positions to the move to play from them.
+
+    Parameters
+    ----------
+    moves : dict (optional)
+        Initial book entries mapping canonical keys (see `canonical_key()`)
+        to moves (row, col) expressed in canonical coordinates.
+    """
+
+    def __init__(self, moves=None):
+        self.moves = dict(moves or {})
+
+    def __len__(self):
+        return len(self.moves)
+
+    @classmethod
+    def load(cls, path):
+        """Read a book saved with `save()`."""
+        with open(path, "r") as book_file:
+            entries = json.load(book_file)
+        return cls({key: tuple(move) for key, move in entries.items()})
+
+    def save(self, path):
+        """Write the book to a JSON file."""
+        with open(path, "w") as book_file:
+            json.dump(self.moves, book_file, sort_keys=True, indent=0)
+
+    def add(self, game, move):
+        """Record `move` as the reply of the active player in `game`."""
+        key, t = canonical_key(game)
+        self.moves[key] = game.transform_move(move, t)
+
+    def lookup(self, game):
+        """
+        Return the book move for the active player in `game`, translated to
+        the orientation of `game`, or None if the position is not in the book.
+        """
+        key, t = canonical_key(game)
+        move = self.moves.get(key)
+        if move is None:
+            return None
+        return game.transform_move(move, t, inverse=True)
+
+
+def build_book(plies, depth, score_fn=improved_score, width=7, height=7, verbose=False):
+    """
+    Build an opening book by searching every position reachable in fewer than
+    `plies` moves from the empty board (one representative per symmetry
+    class) to a fixed depth with alpha-beta search.
+
+    Parameters
+    ----------
+    plies : int
+        The number of plies covered by the book; e.g., plies=3 stores the
+        first move of each player and the second move of player 1.
+
+    depth : int
+        The alpha-beta search depth used to choose each book move.
+
+    score_fn : callable (optional)
+        The heuristic evaluation function used by the search.
+
+    width, height : int (optional)
+        The board size.
+
+    Returns
+    -------
+    OpeningBook
+    """
+    book = OpeningBook()
+    frontier = {canonical_key(Board("player1", "player2", width, height))[0]: []}
+
+    for ply in range(plies):
+        start = timeit.default_timer()
+        children = {}
+        for history in frontier.values():
+            agent = CustomPlayer(depth, score_fn, iterative=False, method='alphabeta',
+                                 tt_size=2 ** 16, move_ordering=True)
+            agent.time_left = lambda: float("inf")
+            players = (agent, "opponent") if ply % 2 == 0 else ("opponent", agent)
+            game = Board(players[0], players[1], width, height)
+            for move in history:
+                game.apply_move(move)
+
+            _, move = agent.alphabeta(game, depth)
+            if move in game.get_legal_moves():
+                book.add(game, move)
+
+            if ply + 1 < plies:
+                for child_move in game.get_legal_moves():
+                    key, _ = canonical_key(game.forecast_move(child_move))
+                    children.setdefault(key, history + [child_move])
+
+        if verbose:
+            print("ply {}: {} positions in {:.1f}s".format(
+                ply, len(frontier), timeit.default_timer() - start))
+        frontier = children
+
+    return book
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build an Isolation opening book.")
+    parser.add_argument("--plies", type=int, default=3,
+                        help="number of plies from the empty board covered by the book")
+    parser.add_argument("--depth", type=int, default=5,
+                        help="alpha-beta search depth used to choose each move")
+    parser.add_argument("--size", type=int, nargs=2, default=(7, 7), metavar=("WIDTH", "HEIGHT"),
+                        help="board size")
+    parser.add_argument("--output", default=BOOK_FILE,
+                        help="path of the JSON book file to write")
+    args = parser.parse_args()
+
+    book = build_book(args.plies, args.depth, width=args.size[0], height=args.size[1],
+                      verbose=True)
+    book.save(args.output)
+    print("Saved {} positions to {}".format(len(book), args.output))
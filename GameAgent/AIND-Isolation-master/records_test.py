@@ -0,0 +1,76 @@
+"""
+This file contains test cases for the game record store and replay tool in
+game_records.py.
+"""
+import os
+import random
+import tempfile
+import unittest
+
+import isolation
+import game_records
+
+from sample_players import RandomPlayer, improved_score
+
+
+class GameRecordsTest(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".bin")
+        os.close(handle)
+        os.remove(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def play_games(self, num_games, width=7, height=7, move_rule="knight"):
+        """Play random games and return (board, winner, termination) triples."""
+        random.seed(0)
+        games = []
+        for _ in range(num_games):
+            game = isolation.Board(RandomPlayer(), RandomPlayer(), width, height, move_rule)
+            winner, _, termination = game.play(time_limit=float("inf"))
+            games.append((game, winner, termination))
+        return games
+
+    def test_round_trip(self):
+        """ Test that records survive the file format and append mode """
+        games = self.play_games(6) + self.play_games(2, 9, 6) + self.play_games(2, 6, 6, "queen")
+        records = [game_records.record_game(*game) for game in games]
+        with game_records.RecordWriter(self.path) as writer:
+            for record in records[:4]:
+                writer.write(record)
+        with game_records.RecordWriter(self.path) as writer:
+            for record in records[4:]:
+                writer.write(record)
+        self.assertEqual(list(game_records.read_records(self.path)), records)
+
+        for (game, winner, _), record in zip(games, records):
+            self.assertEqual(len(game_records.encode(record)), 6 + game.move_count)
+            self.assertEqual(record.winner, 1 if winner is game.__player_1__ else 2)
+            self.assertEqual(record.termination, "illegal move")
+
+    def test_replay(self):
+        """ Test that replayed positions match the original games """
+        game, winner, termination = self.play_games(1)[0]
+        record = game_records.record_game(game, winner, termination)
+        boards = list(b.to_string() for b in game_records.positions(record))
+        self.assertEqual(len(boards), game.move_count + 1)
+        self.assertEqual(boards[-1], game.to_string())
+
+        king_game, king_winner, king_termination = self.play_games(1, 6, 6, "king")[0]
+        king_record = game_records.record_game(king_game, king_winner, king_termination)
+        self.assertEqual(king_record.move_rule, "king")
+        self.assertEqual(list(game_records.positions(king_record))[-1].to_string(),
+                         king_game.to_string())
+
+        rows = list(game_records.evaluate([record, record], improved_score))
+        self.assertEqual(len(rows), 2 * len(boards))
+        # the player to move in the final position has lost
+        self.assertEqual(rows[-1][2:], (float("-inf"), 0))
+        self.assertEqual([r[3] for r in rows[:2]], [int(record.winner == 1), int(record.winner == 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
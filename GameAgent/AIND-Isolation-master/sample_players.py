@@ -61,7 +61,8 @@ def open_move_score(game, player):
     if game.is_winner(player):
         return float("inf")
 
-    return float(len(game.get_legal_moves(player)))
+    own_moves, _ = game.count_legal_moves(player)
+    return float(own_moves)
 
 
 def improved_score(game, player):
@@ -91,8 +92,7 @@ def improved_score(game, player):
     if game.is_winner(player):
         return float("inf")
 
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    own_moves, opp_moves = game.count_legal_moves(player)
     return float(own_moves - opp_moves)
 
 
@@ -0,0 +1,418 @@
+"""
+This file contains test cases for the search extensions of `CustomPlayer`
+in game_agent.py that are not covered by agent_test.py.
+"""
+import pickle
+import random
+import timeit
+import unittest
+
+import isolation
+import batch_eval
+import endgame
+import game_agent
+import mcts
+
+from opening_book import OpeningBook
+from sample_players import improved_score, open_move_score
+
+
+def make_board(player, num_moves, seed, w=7, h=7):
+    """Create a board with `player` as player 1 after random opening moves."""
+    rng = random.Random(seed)
+    board = isolation.Board(player, 'null_agent', w, h)
+    for _ in range(num_moves):
+        board.apply_move(rng.choice(board.get_legal_moves()))
+    return board
+
+
+class TranspositionTableTest(unittest.TestCase):
+
+    def test_alphabeta_value(self):
+        """ Test that the transposition table does not change search results """
+        for seed in range(4):
+            for depth in range(1, 5):
+                plain = game_agent.CustomPlayer(depth, improved_score, False, 'alphabeta')
+                cached = game_agent.CustomPlayer(depth, improved_score, False, 'alphabeta',
+                                                 tt_size=4096)
+                plain.time_left = cached.time_left = lambda: 1e3
+
+                v1, _ = plain.alphabeta(make_board(plain, 4, seed), depth)
+                v2, move = cached.alphabeta(make_board(cached, 4, seed), depth)
+                self.assertEqual(v1, v2)
+                self.assertIn(move, make_board(cached, 4, seed).get_legal_moves())
+
+    def test_both_seats(self):
+        """ Test that results stored in one seat are not used in the other """
+        for seed in range(4):
+            moves = []
+            rng = random.Random(seed)
+            board = isolation.Board('player_1', 'player_2')
+            for _ in range(4):
+                moves.append(rng.choice(board.get_legal_moves()))
+                board.apply_move(moves[-1])
+
+            values = []
+            for warm in (False, True):
+                agent = game_agent.CustomPlayer(3, improved_score, False, 'alphabeta',
+                                                tt_size=4096)
+                agent.time_left = lambda: 1e3
+                if warm:
+                    first = isolation.Board(agent, 'opponent')
+                    for move in moves:
+                        first.apply_move(move)
+                    agent.alphabeta(first, 3)
+                # the same position with the agent in the second seat
+                second = isolation.Board('opponent', agent)
+                for move in moves:
+                    second.apply_move(move)
+                values.append(agent.alphabeta(second, 3, maximizing_player=False)[0])
+            self.assertEqual(values[0], values[1])
+
+    def test_reuse_across_iterations(self):
+        """ Test that iterative deepening reuses stored results """
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score, method='alphabeta',
+                                          tt_size=4096)
+        board = make_board(agentUT, 4, 0)
+        legal_moves = board.get_legal_moves()
+        move = agentUT.get_move(board, legal_moves, lambda: 1e3 if agentUT.tt.stores < 2000 else 0)
+        self.assertIn(move, legal_moves)
+        self.assertGreater(agentUT.tt.hits, 0)
+        self.assertLessEqual(len(agentUT.tt), agentUT.tt.size)
+
+
+class MoveOrderingTest(unittest.TestCase):
+
+    def test_alphabeta_value(self):
+        """ Test that move ordering does not change search results """
+        for seed in range(4):
+            plain = game_agent.CustomPlayer(1, improved_score, False, 'alphabeta')
+            ordered = game_agent.CustomPlayer(1, improved_score, False, 'alphabeta',
+                                              move_ordering=True)
+            plain.time_left = ordered.time_left = lambda: 1e3
+            board = make_board(plain, 4, seed)
+            ordered_board = make_board(ordered, 4, seed)
+            ordered.new_search()
+
+            for depth in range(1, 5):
+                v1, _ = plain.alphabeta(board, depth)
+                v2, move = ordered.alphabeta(ordered_board, depth)
+                self.assertEqual(v1, v2)
+                self.assertIn(move, ordered_board.get_legal_moves())
+
+                # the principal variation starts at the root with the best move
+                ordered.pv = ordered.pv_lines[ordered_board.move_count]
+                ordered.pv_moves = dict(ordered.pv)
+                self.assertEqual(ordered.pv[0], (ordered_board.zobrist_key, move))
+
+    def test_order_moves(self):
+        """ Test the priority of PV, hint, killer and history moves """
+        agentUT = game_agent.CustomPlayer(method='alphabeta', move_ordering=True)
+        board = make_board(agentUT, 2, 0)
+        legal_moves = board.get_legal_moves()
+        self.assertGreaterEqual(len(legal_moves), 5)
+        pv_move, hint, killer, best, other = legal_moves[-5:]
+
+        agentUT.pv_moves = {board.zobrist_key: pv_move}
+        agentUT.killers = {board.move_count: [killer]}
+        agentUT.history = {(True, best): 9, (True, other): 1, (False, legal_moves[0]): 50}
+        ordered = agentUT.order_moves(board, legal_moves, True, hint)
+        self.assertEqual(ordered[:5], [pv_move, hint, killer, best, other])
+        self.assertEqual(sorted(ordered), sorted(legal_moves))
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def test_search_log(self):
+        """ Test that traced searches log one consistent record per move """
+        agentUT = game_agent.CustomPlayer(3, improved_score, False, 'alphabeta',
+                                          trace=True)
+        board = make_board(agentUT, 4, 1)
+        legal_moves = board.get_legal_moves()
+        agentUT.get_move(board, legal_moves, lambda: 1e3)
+
+        self.assertEqual(len(agentUT.search_log), 1)
+        record = agentUT.search_log[0]
+        self.assertEqual(record.move_count, board.move_count)
+        self.assertEqual(record.depth, 3)
+        self.assertFalse(record.timed_out)
+        self.assertEqual(record.nodes, sum(record.iteration_nodes))
+        self.assertGreater(record.nodes, len(legal_moves))
+        self.assertLessEqual(len(record.cutoffs), 3)
+        self.assertLessEqual(record.first_move_cutoffs, sum(record.cutoffs))
+        self.assertGreater(record.branching_factor, 1.)
+
+    def test_iterative_timeout(self):
+        """ Test that iterative deepening records the depth it completed """
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score, method='alphabeta',
+                                          trace=True)
+        board = make_board(agentUT, 4, 2)
+        agentUT.get_move(board, board.get_legal_moves(),
+                         lambda: 1e3 if agentUT.nodes < 3000 else 0)
+
+        record = agentUT.search_log[-1]
+        self.assertTrue(record.timed_out)
+        self.assertEqual(record.depth, len(record.iteration_nodes))
+        self.assertGreater(record.nodes, sum(record.iteration_nodes))
+
+
+class BatchScoreTest(unittest.TestCase):
+
+    def test_batch_scores(self):
+        """ Test that batch scores match the scalar score functions """
+        pairs = [(batch_eval.batch_improved_score, improved_score),
+                 (batch_eval.batch_open_move_score, open_move_score),
+                 (batch_eval.batch_custom_score, game_agent.custom_score)]
+        for w, h in [(7, 7), (9, 6)]:
+            games = []
+            for seed in range(20):
+                rng = random.Random(seed)
+                game = isolation.Board('player1', 'player2', w, h)
+                for _ in range(rng.randrange(40)):
+                    if not game.get_legal_moves():
+                        break
+                    game.apply_move(rng.choice(game.get_legal_moves()))
+                games.append(game)
+            for batch_fn, score_fn in pairs:
+                for player in ('player1', 'player2'):
+                    self.assertEqual(batch_fn(games, player),
+                                     [score_fn(game, player) for game in games])
+
+    def test_features(self):
+        """ Test the reach and centrality features on a small board """
+        game = isolation.Board('player1', 'player2', 5, 5)
+        game.apply_move((2, 2))
+        game.apply_move((0, 0))
+        f = batch_eval.features([game], 'player1')
+        self.assertEqual(f.own_moves[0], 8)
+        self.assertEqual(f.own_center[0], 0.)
+        self.assertEqual(f.opp_center[0], -8.)
+        reach = set()
+        for move in game.get_legal_moves('player1'):
+            reach.add(move)
+            child = game.copy()
+            child.__last_player_move__['player1'] = move
+            child.__board_state__ |= 1 << (move[0] * 5 + move[1])
+            reach.update(child.get_legal_moves('player1'))
+        self.assertEqual(f.own_reach[0], len(reach))
+        self.assertTrue(f.active[0])
+
+    def test_alphabeta_value(self):
+        """ Test that batch evaluation does not change search results """
+        for seed in range(4):
+            for depth in range(1, 5):
+                plain = game_agent.CustomPlayer(depth, improved_score, False, 'alphabeta')
+                batched = game_agent.CustomPlayer(depth, improved_score, False, 'alphabeta',
+                                                  batch_score=batch_eval.batch_improved_score)
+                plain.time_left = batched.time_left = lambda: 1e3
+
+                v1, m1 = plain.alphabeta(make_board(plain, 4, seed), depth)
+                v2, m2 = batched.alphabeta(make_board(batched, 4, seed), depth)
+                self.assertEqual((v1, m1), (v2, m2))
+                self.assertGreaterEqual(batched.nodes, plain.nodes)
+
+
+def active_player_wins(game):
+    """Solve a game exactly by exhaustive search (small boards only)."""
+    return any(not active_player_wins(game.forecast_move(m)) for m in game.get_legal_moves())
+
+
+class EndgameTest(unittest.TestCase):
+
+    def test_solve(self):
+        """ Test that the solver agrees with exhaustive search """
+        solved = 0
+        for seed in range(200):
+            rng = random.Random(seed)
+            game = isolation.Board('player1', 'player2', 5, 5)
+            while game.get_legal_moves() and not (game.move_count > 2 and
+                                                  endgame.is_partitioned(game)):
+                game.apply_move(rng.choice(game.get_legal_moves()))
+            solution = endgame.solve(game)
+            if solution is None or solution[2] is None:
+                continue
+            move, own, opp = solution
+            solved += 1
+            self.assertEqual(own > opp, active_player_wins(game))
+            if own:
+                self.assertIn(move, game.get_legal_moves())
+                self.assertEqual(own > opp, not active_player_wins(game.forecast_move(move)))
+        self.assertGreater(solved, 50)
+
+    def test_budget(self):
+        """ Test that the solver gives up on regions that are too large """
+        game = isolation.Board('player1', 'player2')
+        self.assertIsNone(endgame.solve(game))
+        game.apply_move((0, 0))
+        game.apply_move((6, 6))
+        self.assertRaises(endgame.BudgetExceeded, endgame.longest_path,
+                          game, (0, 0), 5)
+
+    def test_solver(self):
+        """ Test that the agent's solver only skips regions over budget """
+        positions = []
+        for seed in range(200):
+            rng = random.Random(seed)
+            game = isolation.Board('player1', 'player2', 5, 5)
+            while game.get_legal_moves() and not (game.move_count > 2 and
+                                                  endgame.is_partitioned(game)):
+                game.apply_move(rng.choice(game.get_legal_moves()))
+            solution = endgame.solve(game, opponent=False)
+            if solution is not None and solution[1] >= 4:
+                self.assertIsNone(solution[2])
+                positions.append((game, solution[0]))
+        regions = [endgame.reachable(game, game.get_player_location(game.active_player))
+                   for game, _ in positions]
+        # two games whose regions are not subsets of each other
+        first, second = next((i, j) for i in range(len(positions)) for j in range(len(positions))
+                             if regions[j] & ~regions[i] and regions[i] & ~regions[j])
+        (game, move), (other_game, other_move) = positions[first], positions[second]
+
+        solver = endgame.Solver(budget=1)
+        self.assertIsNone(solver.best_move(game))
+        self.assertIsNotNone(solver.failed)
+        solver.budget = endgame.NODE_BUDGET
+        # the same region is not searched again
+        self.assertIsNone(solver.best_move(game))
+        # but the next game is solved, which forgets the failure
+        self.assertEqual(solver.best_move(other_game), other_move)
+        self.assertIsNone(solver.failed)
+        self.assertEqual(solver.best_move(game), move)
+
+
+class ParallelSearchTest(unittest.TestCase):
+
+    def test_solved_positions(self):
+        """ Test that root-parallel search finds winning moves """
+        agent = game_agent.CustomPlayer(score_fn=improved_score, method='alphabeta',
+                                        tt_size=1024, move_ordering=True, workers=2)
+        try:
+            for seed in range(6):
+                rng = random.Random(seed)
+                game = isolation.Board(agent, 'opponent', 5, 5)
+                while len(game.get_blank_spaces()) > 12 and game.get_legal_moves():
+                    game.apply_move(rng.choice(game.get_legal_moves()))
+                if game.active_player is not agent or len(game.get_legal_moves()) < 2:
+                    continue
+                move = agent.get_move(game, game.get_legal_moves(), lambda: 1000.)
+                self.assertIn(move, game.get_legal_moves())
+                if active_player_wins(game):
+                    self.assertFalse(active_player_wins(game.forecast_move(move)))
+        finally:
+            agent.close()
+
+    def test_time_limit(self):
+        """ Test that root-parallel search honors the time_left callback """
+        agent = game_agent.CustomPlayer(score_fn=improved_score, method='alphabeta',
+                                        trace=True, workers=2)
+        try:
+            for num_moves in (2, 6):
+                game = make_board(agent, num_moves, 0)
+                # a clock that only advances when it is read, so that the
+                # agent sees the same timeline however the workers are
+                # scheduled
+                clock = [150.]
+
+                def time_left():
+                    clock[0] -= 1.
+                    return clock[0]
+
+                move = agent.get_move(game, game.get_legal_moves(), time_left)
+                self.assertIn(move, game.get_legal_moves())
+                self.assertGreater(time_left(), 0)
+                self.assertGreater(agent.search_log[-1].depth, 0)
+        finally:
+            agent.close()
+
+    def test_task_state(self):
+        """ Test that the agent sent to the search workers is slim """
+        agent = game_agent.CustomPlayer(method='alphabeta', tt_size=1024, book=OpeningBook(),
+                                        trace=True, workers=2)
+        try:
+            agent.search_log.append(None)
+            copy = pickle.loads(pickle.dumps(agent))
+            self.assertIsNone(copy.pool)
+            self.assertIsNone(copy.book)
+            self.assertEqual(copy.search_log, [])
+            self.assertEqual(copy.tt.size, 1024)
+            self.assertIsNotNone(agent.book)
+            self.assertEqual(len(agent.search_log), 1)
+        finally:
+            agent.close()
+
+    def test_combine_root_results(self):
+        """ Test that the depths completed by every worker are kept """
+        a, b, c = (0, 1), (1, 0), (2, 2)
+        outcomes = [([(1., a), (-1., a), (0., a)], False), ([(0., b), (2., c)], False)]
+        self.assertEqual(game_agent.combine_root_results(outcomes, a), (c, 2, True))
+        # a worker that reported nothing leaves no completed iteration
+        outcomes.append(([], False))
+        self.assertEqual(game_agent.combine_root_results(outcomes, b), (b, 0, True))
+        # a worker that solved its moves at depth 1 completes every depth
+        outcomes[2] = ([(-5., (3, 3))], True)
+        self.assertEqual(game_agent.combine_root_results(outcomes, a), (c, 2, True))
+        outcomes = [([(1., a)], True), ([(0., b), (5., c)], True)]
+        self.assertEqual(game_agent.combine_root_results(outcomes, a), (c, 2, False))
+
+
+class MCTSTest(unittest.TestCase):
+
+    def timer(self, limit):
+        start = timeit.default_timer()
+        return lambda: limit - 1000 * (timeit.default_timer() - start)
+
+    def test_winning_moves(self):
+        """ Test that MCTS finds the winning moves of small endgames """
+        agent = mcts.MCTSPlayer(seed=0)
+        tested = 0
+        for seed in range(40):
+            rng = random.Random(seed)
+            game = isolation.Board(agent, 'opponent', 5, 5)
+            while len(game.get_blank_spaces()) > 15 and game.get_legal_moves():
+                game.apply_move(rng.choice(game.get_legal_moves()))
+            if game.active_player is not agent or not active_player_wins(game):
+                continue
+            tested += 1
+            move = agent.get_move(game, game.get_legal_moves(), self.timer(50))
+            self.assertFalse(active_player_wins(game.forecast_move(move)))
+        self.assertGreater(tested, 5)
+
+    def test_tree_reuse(self):
+        """ Test that the subtree of the reached position is kept """
+        agent = mcts.MCTSPlayer(trace=True, seed=0)
+        game = make_board(agent, 2, 0)
+        time_left = self.timer(50)
+        game.apply_move(agent.get_move(game, game.get_legal_moves(), time_left))
+        self.assertGreater(time_left(), 0)
+        first = agent.playouts
+        self.assertGreater(first, 0)
+
+        game.apply_move(game.get_legal_moves()[0])
+        self.assertIsNotNone(agent.tree)
+        agent.get_move(game, game.get_legal_moves(), self.timer(50))
+        self.assertGreater(agent.discarded.visits, agent.playouts)
+        self.assertEqual([r.nodes for r in agent.search_log], [first, agent.playouts])
+
+
+class OpeningBookTest(unittest.TestCase):
+
+    def test_symmetric_lookup(self):
+        """ Test that book moves are translated to every orientation """
+        book = OpeningBook()
+        game = isolation.Board('player1', 'player2')
+        game.apply_move((1, 2))
+        book.add(game, (4, 5))
+        self.assertEqual(book.lookup(game), (4, 5))
+
+        for first, reply in [((1, 4), (4, 1)), ((5, 2), (2, 5)), ((2, 1), (5, 4)),
+                             ((4, 5), (1, 2))]:
+            other = isolation.Board('player1', 'player2')
+            other.apply_move(first)
+            self.assertEqual(book.lookup(other), reply)
+
+        game.apply_move((4, 5))
+        self.assertIsNone(book.lookup(game))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -19,19 +19,30 @@ initiative in the second match with agentB at (5, 2) as player 1 and agentA at
 (1, 3) as player 2.
 """
 
+import argparse
 import itertools
+import os
 import random
+import time
+import timeit
 import warnings
 
 from collections import namedtuple
+from multiprocessing import Pool
 
 from isolation import Board
+from isolation.isolation import MOVE_RULES
 from sample_players import RandomPlayer
 from sample_players import null_score
 from sample_players import open_move_score
 from sample_players import improved_score
 from game_agent import CustomPlayer
 from game_agent import custom_score
+from game_records import RecordWriter
+from game_records import record_game
+from mcts import MCTSPlayer
+from opening_book import BOOK_FILE
+from opening_book import OpeningBook
 
 NUM_MATCHES = 5  # number of matches against each opponent
 TIME_LIMIT = 150  # number of milliseconds before timeout
@@ -57,17 +68,46 @@ same opponents.
 Agent = namedtuple("Agent", ["player", "name"])
 
 
-def play_match(player1, player2):
+def play_match(player1, player2, seed=None, timer=timeit.default_timer, board_args=None):
     """
     Play a "fair" set of matches between two agents by playing two games
     between the players, forcing each agent to play from randomly selected
     positions. This should control for differences in outcome resulting from
     advantage due to starting position on the board.
+
+    If a seed is given, the random module is seeded with it before the
+    match, so the opening moves (and any randomized agents) are the same
+    whether the match is played here or in a worker process. The timer is
+    passed to `Board.play()` to measure the time taken by each turn, and
+    `board_args` (e.g., width, height and move_rule) to the `Board`
+    constructor.
+    """
+    num_wins, num_timeouts, _, _ = _play_games(player1, player2, seed, timer, board_args)
+
+    if num_timeouts != 0:
+        warnings.warn(TIMEOUT_WARNING)
+
+    return num_wins
+
+
+def _play_games(player1, player2, seed, timer, board_args=None):
+    """
+    Play both games of a match and return the win counts of each player,
+    the number of games that were lost due to timeout, the search records
+    logged by each player during the match (which are removed from the
+    players so that they are only reported once), and a
+    `game_records.GameRecord` for each game.
     """
+    if seed is not None:
+        random.seed(seed)
+
+    log_start = [len(getattr(p, "search_log", ())) for p in (player1, player2)]
+
     num_wins = {player1: 0, player2: 0}
     num_timeouts = {player1: 0, player2: 0}
     num_invalid_moves = {player1: 0, player2: 0}
-    games = [Board(player1, player2), Board(player2, player1)]
+    board_args = board_args or {}
+    games = [Board(player1, player2, **board_args), Board(player2, player1, **board_args)]
 
     # initialize both games with a random move and response
     for _ in range(2):
@@ -76,8 +116,10 @@ def play_match(player1, player2):
         games[1].apply_move(move)
 
     # play both games and tally the results
+    game_records = []
     for game in games:
-        winner, _, termination = game.play(time_limit=TIME_LIMIT)
+        winner, _, termination = game.play(time_limit=TIME_LIMIT, timer=timer)
+        game_records.append(record_game(game, winner, termination))
 
         if player1 == winner:
             num_wins[player1] += 1
@@ -96,15 +138,46 @@ def play_match(player1, player2):
             else:
                 num_invalid_moves[player1] += 1
 
-    if sum(num_timeouts.values()) != 0:
-        warnings.warn(TIMEOUT_WARNING)
+    records = []
+    for player, start in zip((player1, player2), log_start):
+        log = getattr(player, "search_log", [])
+        records.append(log[start:])
+        del log[start:]
+
+    return (num_wins[player1], num_wins[player2]), sum(num_timeouts.values()), records, game_records
 
-    return num_wins[player1], num_wins[player2]
+
+def _play_match_task(task):
+    """
+    Worker entry point for `play_round()`; plays one match in a process of
+    the pool, charging each agent for CPU time rather than wall-clock time
+    so that contention between the workers does not cause timeouts.
+    """
+    player1, player2, seed, board_args = task
+    return _play_games(player1, player2, seed, time.process_time, board_args)
 
 
-def play_round(agents, num_matches):
+def play_round(agents, num_matches, pool=None, rng=random, stats=None, writer=None,
+               board_args=None):
     """
     Play one round (i.e., a single match between each pair of opponents)
+
+    If a `multiprocessing.Pool` is given, the matches against each opponent
+    are played concurrently in the pool; otherwise they are played one at a
+    time in this process. Every match is assigned a seed drawn from `rng`
+    in the same order in both cases, so a seeded tournament plays the same
+    opening positions serially and in parallel, and the results are
+    tallied in the same order.
+
+    If a `stats` dictionary is given, the search records logged by agents
+    with tracing enabled are appended to stats[agent name].
+
+    If a `game_records.RecordWriter` is given, every game is appended to
+    its file once the match it belongs to is over.
+
+    The games are played on boards created with `board_args` (keyword
+    arguments of the `Board` constructor, e.g., width, height and
+    move_rule), or on the default 7x7 knight board.
     """
     agent_1 = agents[-1]
     wins = 0.
@@ -120,12 +193,33 @@ def play_round(agents, num_matches):
         print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ')
 
         # Each player takes a turn going first
-        for p1, p2 in itertools.permutations((agent_1.player, agent_2.player)):
-            for _ in range(num_matches):
-                score_1, score_2 = play_match(p1, p2)
-                counts[p1] += score_1
-                counts[p2] += score_2
-                total += score_1 + score_2
+        tasks = [(p1, p2, rng.randrange(2 ** 32), board_args)
+                 for p1, p2 in itertools.permutations((agent_1.player, agent_2.player))
+                 for _ in range(num_matches)]
+
+        if pool is None:
+            results = [_play_games(p1, p2, seed, timeit.default_timer, args)
+                       for p1, p2, seed, args in tasks]
+        else:
+            results = pool.map(_play_match_task, tasks)
+
+        agent_names = {agent_1.player: agent_1.name, agent_2.player: agent_2.name}
+        num_timeouts = 0
+        for (p1, p2, _, _), ((score_1, score_2), timeouts, records, games) in zip(tasks, results):
+            counts[p1] += score_1
+            counts[p2] += score_2
+            total += score_1 + score_2
+            num_timeouts += timeouts
+            if writer is not None:
+                for record in games:
+                    writer.write(record)
+            if stats is not None:
+                for player, player_records in zip((p1, p2), records):
+                    if player_records:
+                        stats.setdefault(agent_names[player], []).extend(player_records)
+
+        if num_timeouts != 0:
+            warnings.warn(TIMEOUT_WARNING)
 
         wins += counts[agent_1.player]
 
@@ -135,14 +229,62 @@ def play_round(agents, num_matches):
     return 100. * wins / total
 
 
-def main():
+def summarize_search(records):
+    """
+    Aggregate the `game_agent.SearchRecord` entries logged by an agent into
+    averages per move: depth reached, nodes expanded, nodes per second,
+    effective branching factor, cutoffs, and the fraction of cutoffs caused
+    by the first move searched (a measure of move ordering quality).
+    """
+    num_moves = len(records)
+    nodes = sum(r.nodes for r in records)
+    time_ms = sum(r.time for r in records)
+    cutoffs = sum(sum(r.cutoffs) for r in records)
+    first_cutoffs = sum(r.first_move_cutoffs for r in records)
+    return {
+        "moves": num_moves,
+        "depth": sum(r.depth for r in records) / num_moves,
+        "max_depth": max(r.depth for r in records),
+        "nodes": nodes / num_moves,
+        "nodes_per_second": 1000. * nodes / time_ms if time_ms else 0.,
+        "branching_factor": sum(r.branching_factor for r in records) / num_moves,
+        "cutoffs": cutoffs / num_moves,
+        "first_move_cutoff_rate": first_cutoffs / cutoffs if cutoffs else 0.,
+        "timeouts": sum(r.timed_out for r in records) / num_moves,
+    }
+
+
+def print_search_report(stats):
+    """
+    Print a table summarizing the search performance of each traced agent.
+    """
+    print("\n\nSearch Performance (averages per move):")
+    print("----------")
+    print("{:<15}{:>7}{:>7}{:>7}{:>10}{:>11}{:>7}{:>9}{:>8}".format(
+        "Agent", "Moves", "Depth", "Max", "Nodes", "Nodes/s", "EBF", "Cutoffs", "First%"))
+    for name, records in stats.items():
+        summary = summarize_search(records)
+        print("{:<15}{:>7d}{:>7.2f}{:>7d}{:>10.0f}{:>11.0f}{:>7.2f}{:>9.0f}{:>8.1f}".format(
+            name, summary["moves"], summary["depth"], summary["max_depth"],
+            summary["nodes"], summary["nodes_per_second"], summary["branching_factor"],
+            summary["cutoffs"], 100 * summary["first_move_cutoff_rate"]))
+
+
+def main(num_processes=1, seed=None, report=False, search_workers=None, records=None,
+         board_args=None):
 
     HEURISTICS = [("Null", null_score),
                   ("Open", open_move_score),
                   ("Improved", improved_score)]
-    AB_ARGS = {"search_depth": 5, "method": 'alphabeta', "iterative": False}
-    MM_ARGS = {"search_depth": 3, "method": 'minimax', "iterative": False}
-    CUSTOM_ARGS = {"method": 'alphabeta', 'iterative': True}
+    AB_ARGS = {"search_depth": 5, "method": 'alphabeta', "iterative": False,
+               "trace": report}
+    MM_ARGS = {"search_depth": 3, "method": 'minimax', "iterative": False,
+               "trace": report}
+    book_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), BOOK_FILE)
+    book = OpeningBook.load(book_path) if os.path.exists(book_path) else None
+    CUSTOM_ARGS = {"method": 'alphabeta', 'iterative': True, 'tt_size': 2 ** 16,
+                   'move_ordering': True, "trace": report, "book": book,
+                   "endgame": True, "workers": search_workers}
 
     # Create a collection of CPU agents using fixed-depth minimax or alpha beta
     # search, or random selection.  The agent names encode the search method
@@ -154,6 +296,7 @@ def main():
     ab_agents = [Agent(CustomPlayer(score_fn=h, **AB_ARGS),
                        "AB_" + name) for name, h in HEURISTICS]
     random_agents = [Agent(RandomPlayer(), "Random")]
+    mcts_agents = [Agent(MCTSPlayer(trace=report), "MCTS")]
 
     # ID_Improved agent is used for comparison to the performance of the
     # submitted agent for calibration on the performance across different
@@ -163,20 +306,68 @@ def main():
     test_agents = [Agent(CustomPlayer(score_fn=improved_score, **CUSTOM_ARGS), "ID_Improved"),
                    Agent(CustomPlayer(score_fn=custom_score, **CUSTOM_ARGS), "Student")]
 
-    print(DESCRIPTION)
-    for agentUT in test_agents:
-        print("")
-        print("*************************")
-        print("{:^25}".format("Evaluating: " + agentUT.name))
-        print("*************************")
-
-        agents = random_agents + mm_agents + ab_agents + [agentUT]
-        win_ratio = play_round(agents, NUM_MATCHES)
+    rng = random.Random(seed)
+    pool = Pool(num_processes or None) if num_processes != 1 else None
+    stats = {} if report else None
+    writer = RecordWriter(records) if records else None
 
-        print("\n\nResults:")
-        print("----------")
-        print("{!s:<15}{:>10.2f}%".format(agentUT.name, win_ratio))
+    print(DESCRIPTION)
+    try:
+        for agentUT in test_agents:
+            print("")
+            print("*************************")
+            print("{:^25}".format("Evaluating: " + agentUT.name))
+            print("*************************")
+
+            agents = random_agents + mm_agents + ab_agents + mcts_agents + [agentUT]
+            win_ratio = play_round(agents, NUM_MATCHES, pool, rng, stats, writer, board_args)
+
+            print("\n\nResults:")
+            print("----------")
+            print("{!s:<15}{:>10.2f}%".format(agentUT.name, win_ratio))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        for agent in test_agents:
+            agent.player.close()
+        if writer is not None:
+            writer.close()
+            print("\n{} games appended to {}".format(writer.count, records))
+
+    if stats:
+        print_search_report(stats)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(
+        description=DESCRIPTION,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-p", "--processes", type=int, default=1,
+                        help="number of worker processes used to play " +
+                             "matches concurrently (0 uses every core); " +
+                             "parallel games are timed in CPU time")
+    parser.add_argument("-s", "--seed", type=int, default=None,
+                        help="seed for the random opening positions")
+    parser.add_argument("-r", "--report", action="store_true",
+                        help="trace every search and print the search " +
+                             "performance of each agent")
+    parser.add_argument("-w", "--search-workers", type=int, default=None,
+                        help="number of processes used by each search of " +
+                             "the ID_Improved and Student agents (requires " +
+                             "--processes 1)")
+    parser.add_argument("--records", default=None, metavar="PATH",
+                        help="append every game to a binary record file " +
+                             "(see game_records.py)")
+    parser.add_argument("--size", type=int, nargs=2, default=(7, 7), metavar=("WIDTH", "HEIGHT"),
+                        help="board size (default: 7 7)")
+    parser.add_argument("--move-rule", choices=sorted(MOVE_RULES), default="knight",
+                        help="how the players move (default: knight)")
+    args = parser.parse_args()
+    if args.search_workers and args.processes != 1:
+        parser.error("--search-workers cannot be combined with parallel matches")
+    if args.records and args.size[0] * args.size[1] > 256:
+        parser.error("--records supports boards of at most 256 cells")
+    board_args = {"width": args.size[0], "height": args.size[1], "move_rule": args.move_rule}
+    main(args.processes, args.seed, args.report, args.search_workers, args.records,
+         board_args)
@@ -0,0 +1,121 @@
+"""This file contains a bounded transposition table for caching the results
+of game tree searches on `isolation.Board` positions keyed by their Zobrist
+hash (see `isolation.Board.zobrist_key`).
+"""
+
+from collections import namedtuple
+
+# Bound types describing how a stored value relates to the true minimax value
+EXACT = 0  # the value is exact
+LOWER = 1  # the search failed high; the true value is at least the value
+UPPER = 2  # the search failed low; the true value is at most the value
+
+TTEntry = namedtuple("TTEntry", ["key", "depth", "value", "flag", "move", "generation"])
+
+
+class TranspositionTable:
+    """Fixed-size hash table of search results.
+
+    Each position maps to a single slot (its key modulo the table size). A
+    new result replaces the stored one if it comes from a deeper (or equally
+    deep) search, or if the stored result belongs to an earlier call to
+    `new_search()`, so entries from previous moves age out of the table.
+
+    Parameters
+    ----------
+    size : int
+        The number of slots in the table.
+
+    Attributes
+    ----------
+    hits : int
+        The number of lookups that found an entry for the requested key.
+
+    misses : int
+        The number of lookups that found an empty slot or another position.
+
+    stores : int
+        The number of results written to the table.
+
+    rejected : int
+        The number of results discarded by the replacement policy.
+    """
+
+    def __init__(self, size):
+        if size < 1:
+            raise ValueError("The transposition table must have at least one slot.")
+        self.size = size
+        self.generation = 0
+        self.entries = [None] * size
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.rejected = 0
+
+    def __len__(self):
+        return sum(1 for entry in self.entries if entry is not None)
+
+    def new_search(self):
+        """Mark the start of a new search (e.g., a new call to get_move()).
+        Entries stored before this call become eligible for replacement
+        regardless of their depth, but remain available for lookups.
+        """
+        self.generation += 1
+
+    def clear(self):
+        """Remove every entry and reset the counters."""
+        self.entries = [None] * self.size
+        self.hits = self.misses = self.stores = self.rejected = 0
+
+    def lookup(self, key):
+        """Return the `TTEntry` stored for a Zobrist key, or None.
+
+        Parameters
+        ----------
+        key : int
+            The Zobrist hash of the position.
+
+        Returns
+        -------
+        TTEntry or None
+        """
+        entry = self.entries[key % self.size]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, value, flag, move):
+        """Record the result of searching a position to a fixed depth.
+
+        Parameters
+        ----------
+        key : int
+            The Zobrist hash of the position.
+
+        depth : int
+            The remaining search depth the value was computed with.
+
+        value : float
+            The score returned by the search.
+
+        flag : {EXACT, LOWER, UPPER}
+            How `value` bounds the true value of the position.
+
+        move : (int, int)
+            The best move found from the position.
+        """
+        slot = key % self.size
+        entry = self.entries[slot]
+        if entry is not None and entry.depth > depth and \
+                (entry.key == key or entry.generation == self.generation):
+            self.rejected += 1
+            return
+        self.entries[slot] = TTEntry(key, depth, value, flag, move, self.generation)
+        self.stores += 1
+
+    def hit_rate(self):
+        """Return the fraction of lookups that found an entry."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.
@@ -0,0 +1,350 @@
+"""This file contains tools to tune the weights of a linear evaluation
+function for Isolation without running full tournaments.
+
+`ParametricScore` scores a position as a weighted sum of the features in
+`FEATURES` (mobility, reach within two moves and centrality of both
+players; see batch_eval.py). The weights can be fitted in two ways:
+
+    - `texel_fit()`: a logistic regression of game results on the features
+      of positions stored by `tournament.py --records` (the "Texel" method:
+      the sigmoid of the score should predict the outcome);
+    - `evolve()`: an evolution strategy that mutates the weights and keeps
+      the candidates winning the most fixed-depth matches against the
+      AB_Improved agent, with the matches played in a process pool.
+
+`emit_score_function()` writes the tuned weights as a module defining a
+ready-to-use score function, e.g.:
+
+    python tuning.py games.bin --method texel --output tuned_score.py
+"""
+
+import argparse
+import random
+import time
+import timeit
+
+from multiprocessing import Pool
+
+import numpy as np
+
+import batch_eval
+from game_records import PLAYERS, positions, read_records
+from isolation.isolation import MOVE_RULES, move_table
+
+FEATURES = ("own_moves", "opp_moves", "own_reach", "opp_reach", "own_center", "opp_center")
+
+# Weights equivalent to `sample_players.improved_score()`
+IMPROVED_WEIGHTS = (1., -1., 0., 0., 0., 0.)
+
+
+def _popcount(bits):
+    return bin(bits).count("1")
+
+
+def _reach(masks, blank, location, width):
+    """Return the number of blank cells reachable within two moves and the
+    number reachable in one move from `location` (None: any blank cell)."""
+    if location is None:
+        count = _popcount(blank)
+        return count, count
+    first = masks[location[0] * width + location[1]] & blank
+    second = 0
+    bits = first
+    while bits:
+        bit = bits & -bits
+        second |= masks[bit.bit_length() - 1]
+        bits ^= bit
+    return _popcount(first | (second & blank)), _popcount(first)
+
+
+def feature_vector(game, player):
+    """
+    Compute the features in `FEATURES` for one position, with the same
+    values as `batch_eval.features()`. Sliding move rules are not
+    supported.
+
+    Returns
+    -------
+    list<float>
+    """
+    width, height = game.width, game.height
+    if MOVE_RULES[game.move_rule][1]:
+        raise ValueError("Features are not defined for the sliding move rule "
+                         "{!r}.".format(game.move_rule))
+    _, masks = move_table(width, height, game.move_rule)
+    blank = ~game.__board_state__ & ((1 << (width * height)) - 1)
+    values = []
+    for p in (player, game.get_opponent(player)):
+        location = game.get_player_location(p)
+        reach, moves = _reach(masks, blank, location, width)
+        if location is None:
+            center = 0.
+        else:
+            center = -((location[0] - (height - 1) / 2.) ** 2 +
+                       (location[1] - (width - 1) / 2.) ** 2)
+        values.append((moves, reach, center))
+    (own_moves, own_reach, own_center), (opp_moves, opp_reach, opp_center) = values
+    return [own_moves, opp_moves, own_reach, opp_reach, own_center, opp_center]
+
+
+class ParametricScore:
+    """Heuristic evaluation function computing a weighted sum of the
+    features in `FEATURES`. Instances are picklable, so they can be used by
+    agents sent to worker processes.
+
+    Parameters
+    ----------
+    weights : sequence<float> or dict
+        One weight per feature, in the order of `FEATURES` or by name.
+    """
+
+    def __init__(self, weights):
+        if isinstance(weights, dict):
+            weights = [weights.get(name, 0.) for name in FEATURES]
+        if len(weights) != len(FEATURES):
+            raise ValueError("Expected {} weights.".format(len(FEATURES)))
+        self.weights = tuple(float(w) for w in weights)
+
+    def __repr__(self):
+        return "ParametricScore({!r})".format(dict(zip(FEATURES, self.weights)))
+
+    def __call__(self, game, player):
+        if game.is_loser(player):
+            return float("-inf")
+
+        if game.is_winner(player):
+            return float("inf")
+
+        return sum(w * f for w, f in zip(self.weights, feature_vector(game, player)) if w)
+
+
+def load_positions(paths, min_ply=2):
+    """
+    Extract labeled training positions from game record files.
+
+    Parameters
+    ----------
+    paths : list<str>
+        Record files written by `tournament.py --records`.
+
+    min_ply : int (optional)
+        Skip the positions before this ply (e.g., the random opening moves
+        played by the tournament).
+
+    Returns
+    -------
+    (numpy.ndarray, numpy.ndarray)
+        The features (one row per position, columns as in `FEATURES`) from
+        the point of view of the player to move, and the result of the
+        game for that player (1 for a win, 0 for a loss). Finished
+        positions, games without a recorded winner and games with a sliding
+        move rule (which `batch_eval.features()` does not support) are
+        skipped.
+    """
+    rows, labels = [], []
+    for path in paths:
+        for record in read_records(path):
+            if not record.winner or MOVE_RULES[record.move_rule][1]:
+                continue
+            games = [game.copy() for game in positions(record)][min_ply:]
+            if not games:
+                continue
+            f = batch_eval.features(games, PLAYERS[0])
+            own = np.stack([f.own_moves, f.own_reach, f.own_center], axis=1)
+            opp = np.stack([f.opp_moves, f.opp_reach, f.opp_center], axis=1)
+            # view each position from the player to move
+            mover = np.where(f.active[:, None], own, opp)
+            waiter = np.where(f.active[:, None], opp, own)
+            live = (mover[:, 0] > 0) & (waiter[:, 0] > 0)
+            rows.append(np.stack([mover[:, 0], waiter[:, 0], mover[:, 1], waiter[:, 1],
+                                  mover[:, 2], waiter[:, 2]], axis=1)[live])
+            won = f.active if record.winner == 1 else ~f.active
+            labels.append(won[live].astype(float))
+    if not rows:
+        return np.zeros((0, len(FEATURES))), np.zeros(0)
+    return np.concatenate(rows).astype(float), np.concatenate(labels)
+
+
+def texel_fit(features, labels, iterations=2000, learning_rate=0.5, l2=1e-3):
+    """
+    Fit weights so that sigmoid(score) predicts the result of the game from
+    each position (logistic regression by gradient descent on the log loss).
+
+    Parameters
+    ----------
+    features : numpy.ndarray
+        One row of features per position (see `load_positions()`).
+
+    labels : numpy.ndarray
+        1 if the player to move won, 0 otherwise.
+
+    iterations : int (optional)
+        The number of gradient descent steps.
+
+    learning_rate : float (optional)
+        The step size (for standardized features).
+
+    l2 : float (optional)
+        The strength of the L2 penalty on the standardized weights.
+
+    Returns
+    -------
+    (tuple<float>, float)
+        The weights in the order of `FEATURES`, and the final mean log loss.
+    """
+    # standardize the features so that one step size suits every weight;
+    # the intercept absorbs the means (and any advantage of the player to
+    # move) but is left out of the score, where it would not change the
+    # choice of moves
+    mean = features.mean(axis=0)
+    scale = features.std(axis=0)
+    scale[scale == 0] = 1.
+    x = (features - mean) / scale
+    w = np.zeros(x.shape[1])
+    bias = 0.
+    for _ in range(iterations):
+        error = 1. / (1. + np.exp(-(x @ w + bias))) - labels
+        w -= learning_rate * (x.T @ error / len(labels) + l2 * w)
+        bias -= learning_rate * error.mean()
+    p = np.clip(1. / (1. + np.exp(-(x @ w + bias))), 1e-12, 1 - 1e-12)
+    loss = -np.mean(labels * np.log(p) + (1 - labels) * np.log(1 - p))
+    return tuple((w / scale).tolist()), float(loss)
+
+
+def _fitness_task(task):
+    """Worker for `evolve()`: return the fraction of games won by an agent
+    using the weights against the AB_Improved agent."""
+    from game_agent import CustomPlayer
+    from sample_players import improved_score
+    from tournament import play_match
+
+    weights, seeds, depth = task
+    wins = 0
+    for seed in seeds:
+        agent = CustomPlayer(depth, ParametricScore(weights), iterative=False,
+                             method='alphabeta')
+        opponent = CustomPlayer(depth, improved_score, iterative=False,
+                                method='alphabeta')
+        # charge CPU time, like tournament._play_match_task(), so that the
+        # workers of the pool do not lose games by timeout
+        agent_wins, _ = play_match(agent, opponent, seed, time.process_time)
+        wins += agent_wins
+    return wins / (2. * len(seeds))
+
+
+def evolve(initial, generations=10, population=8, matches=4, depth=3, sigma=0.5,
+           pool=None, seed=None, verbose=False):
+    """
+    Tune weights with a (1 + lambda) evolution strategy on match results.
+
+    Each generation draws `population` candidates by adding Gaussian noise
+    to the current weights, and every candidate (and the current weights)
+    plays the same `matches` seeded matches at fixed search depth against
+    AB_Improved. The best candidate replaces the current weights only if it
+    wins more games; on a tie the current weights are kept.
+
+    Parameters
+    ----------
+    initial : sequence<float>
+        The starting weights, in the order of `FEATURES`.
+
+    generations, population, matches, depth : int (optional)
+        The size of the search and of each fitness evaluation.
+
+    sigma : float (optional)
+        The standard deviation of the mutations, relative to the magnitude
+        of each weight (or absolute for weights close to zero).
+
+    pool : `multiprocessing.Pool` (optional)
+        The pool used to play the matches of a generation concurrently.
+
+    seed : int (optional)
+        Seed for the mutations and the match openings.
+
+    Returns
+    -------
+    (tuple<float>, float)
+        The best weights and their win rate.
+    """
+    rng = random.Random(seed)
+    mapper = pool.map if pool is not None else map
+    best = tuple(float(w) for w in initial)
+    best_fitness = None
+    for generation in range(generations):
+        start = timeit.default_timer()
+        seeds = [rng.randrange(2 ** 32) for _ in range(matches)]
+        candidates = [best] + [
+            tuple(w + rng.gauss(0, sigma) * max(abs(w), 0.1) for w in best)
+            for _ in range(population)]
+        fitness = list(mapper(_fitness_task, [(c, seeds, depth) for c in candidates]))
+        idx = max(range(len(candidates)), key=lambda i: (fitness[i], i == 0))
+        best, best_fitness = candidates[idx], fitness[idx]
+        if verbose:
+            print("generation {}: win rate {:.2f} ({:.1f}s) {}".format(
+                generation, best_fitness, timeit.default_timer() - start,
+                ParametricScore(best)))
+    return best, best_fitness
+
+
+def emit_score_function(weights, name="tuned_score", note=""):
+    """
+    Return the source of a module defining a score function `name` with the
+    given weights, e.g., to save as tuned_score.py and import from
+    tournament.py or game_agent.py.
+    """
+    lines = ['"""Score function generated by tuning.py{}."""'.format(
+                 " ({})".format(note) if note else ""),
+             "",
+             "from tuning import ParametricScore",
+             "",
+             "WEIGHTS = {"]
+    lines += ["    {!r}: {!r},".format(feature, w) for feature, w in zip(FEATURES, weights)]
+    lines += ["}",
+              "",
+              "{} = ParametricScore(WEIGHTS)".format(name),
+              ""]
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune a linear Isolation heuristic.")
+    parser.add_argument("records", nargs="*",
+                        help="game record files used by the texel method")
+    parser.add_argument("--method", choices=("texel", "evolve"), default="texel")
+    parser.add_argument("--generations", type=int, default=10)
+    parser.add_argument("--population", type=int, default=8)
+    parser.add_argument("--matches", type=int, default=4,
+                        help="seeded matches (two games each) per candidate")
+    parser.add_argument("--depth", type=int, default=3,
+                        help="fixed alpha-beta depth used for the matches")
+    parser.add_argument("-p", "--processes", type=int, default=0,
+                        help="worker processes for the evolve method (0 uses every core)")
+    parser.add_argument("-s", "--seed", type=int, default=None)
+    parser.add_argument("--output", default="tuned_score.py",
+                        help="path of the generated score function module")
+    args = parser.parse_args()
+
+    if args.method == "texel":
+        if not args.records:
+            parser.error("the texel method needs at least one record file")
+        features, labels = load_positions(args.records)
+        print("{} positions loaded".format(len(labels)))
+        weights, loss = texel_fit(features, labels)
+        note = "texel fit on {} positions, log loss {:.4f}".format(len(labels), loss)
+    else:
+        pool = Pool(args.processes or None) if args.processes != 1 else None
+        try:
+            weights, win_rate = evolve(IMPROVED_WEIGHTS, args.generations, args.population,
+                                       args.matches, args.depth, pool=pool, seed=args.seed,
+                                       verbose=True)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        note = "evolution strategy, win rate {:.2f} against AB_Improved".format(win_rate)
+
+    print(note)
+    print(ParametricScore(weights))
+    with open(args.output, "w") as output:
+        output.write(emit_score_function(weights, note=note))
+    print("Saved to {}".format(args.output))
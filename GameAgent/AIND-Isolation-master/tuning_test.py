@@ -0,0 +1,95 @@
+"""
+This file contains test cases for the heuristic tuning tools in tuning.py.
+"""
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+import isolation
+import batch_eval
+import game_records
+import tuning
+
+from sample_players import RandomPlayer, improved_score
+
+
+def random_games(num_games, seed=0, move_rule="knight"):
+    """Play random games to the end and return their boards and winners."""
+    random.seed(seed)
+    games = []
+    for _ in range(num_games):
+        game = isolation.Board(RandomPlayer(), RandomPlayer(), move_rule=move_rule)
+        winner, _, termination = game.play(time_limit=float("inf"))
+        games.append((game, winner, termination))
+    return games
+
+
+class TuningTest(unittest.TestCase):
+
+    def test_features(self):
+        """ Test that scalar features match the batch features """
+        record = game_records.record_game(*random_games(1)[0])
+        boards = [game.copy() for game in game_records.positions(record)]
+        for player in game_records.PLAYERS:
+            f = batch_eval.features(boards, player)
+            expected = np.stack([getattr(f, name) for name in tuning.FEATURES], axis=1)
+            actual = np.array([tuning.feature_vector(game, player) for game in boards])
+            np.testing.assert_allclose(actual, expected)
+
+    def test_parametric_score(self):
+        """ Test that the improved weights reproduce improved_score """
+        score = tuning.ParametricScore(tuning.IMPROVED_WEIGHTS)
+        record = game_records.record_game(*random_games(1, seed=3)[0])
+        for game in game_records.positions(record):
+            for player in game_records.PLAYERS:
+                self.assertEqual(score(game, player), improved_score(game, player))
+
+        namespace = {}
+        exec(tuning.emit_score_function((1., 2., 3., 4., 5., 6.), note="test"), namespace)
+        self.assertEqual(namespace["tuned_score"].weights, (1., 2., 3., 4., 5., 6.))
+
+    def test_texel_fit(self):
+        """ Test that the logistic fit learns from stored games """
+        handle, path = tempfile.mkstemp(suffix=".bin")
+        os.close(handle)
+        os.remove(path)
+        try:
+            with game_records.RecordWriter(path) as writer:
+                for game in random_games(60):
+                    writer.write(game_records.record_game(*game))
+                # batch_eval cannot compute features for these
+                for game in random_games(5, move_rule="queen"):
+                    writer.write(game_records.record_game(*game))
+            features, labels = tuning.load_positions([path])
+        finally:
+            os.remove(path)
+
+        self.assertEqual(features.shape, (len(labels), len(tuning.FEATURES)))
+        self.assertTrue(np.all(features[:, 0] > 0))
+        self.assertTrue(set(labels) <= {0., 1.})
+        _, loss = tuning.texel_fit(features, labels)
+        self.assertLessEqual(loss, np.log(2) + 1e-6)
+
+        # recover known weights from outcomes drawn with a logistic model
+        rng = np.random.RandomState(0)
+        features = rng.randint(0, 9, size=(5000, len(tuning.FEATURES))).astype(float)
+        true_weights = np.array([0.8, -0.6, 0.1, 0., 0.2, -0.3])
+        odds = np.exp(features @ true_weights - 1.)
+        labels = (rng.uniform(size=5000) < odds / (1 + odds)).astype(float)
+        weights, _ = tuning.texel_fit(features, labels, l2=0.)
+        np.testing.assert_allclose(weights, true_weights, atol=0.1)
+
+    def test_evolve(self):
+        """ Test that the evolution strategy returns the best candidate """
+        weights, win_rate = tuning.evolve(tuning.IMPROVED_WEIGHTS, generations=1,
+                                          population=1, matches=1, depth=1, seed=0)
+        self.assertEqual(len(weights), len(tuning.FEATURES))
+        self.assertGreaterEqual(win_rate, 0.)
+        self.assertLessEqual(win_rate, 1.)
+
+
+if __name__ == '__main__':
+    unittest.main()
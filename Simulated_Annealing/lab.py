@@ -21,6 +21,22 @@ with open('capitals.json', 'r') as capitals_file:
 	capitals = json.load(capitals_file)
 capitals_list = list(capitals.items())
 
+# Pairwise distance matrices built by distance_matrix(), keyed by the city coordinates
+distance_cache = {}
+
+
+def distance_matrix(cities):
+	"""Return the (cached) NumPy array of the distances between every pair of
+	cities, given as (name, (x, y)) tuples; entry [i, j] is the distance from
+	cities[i] to cities[j].
+	"""
+	key = tuple(tuple(xy) for _, xy in cities)
+	if key not in distance_cache:
+		points = np.array(key, dtype=float).reshape(-1, 2)
+		offsets = points[:, np.newaxis, :] - points[np.newaxis, :, :]
+		distance_cache[key] = np.sqrt((offsets ** 2).sum(axis=2))
+	return distance_cache[key]
+
 
 def show_path(path, starting_city, w=12, h=8):
 	"""Plot a TSP path overlaid on a map of the US States & their capitals."""
@@ -48,7 +64,10 @@ def simulated_annealing(problem, schedule):
 		The Problem class interface must implement a callable method
 		"successors()" which returns states in the neighborhood of the current
 		state, and a callable function "get_value()" which returns a fitness
-		score for the state. (See the `TravelingSalesmanProblem` class below
+		score for the state. The search itself uses the move interface:
+		"propose_move()" returns a random move, "move_delta(move)" the change
+		in get_value() that the move would make, and "apply_move(move)"
+		makes it in place. (See the `TravelingSalesmanProblem` class below
 		for details.)
 
 	schedule : callable
@@ -58,7 +77,8 @@ def simulated_annealing(problem, schedule):
 	Returns
 	-------
 	Problem
-		An approximate solution state of the optimization problem
+		An approximate solution state of the optimization problem (a copy;
+		the problem passed in is not changed)
 
 	Notes
 	-----
@@ -74,20 +94,19 @@ def simulated_annealing(problem, schedule):
 		https://github.com/aimacode/aima-pseudocode/blob/master/md/Simulated-Annealing.md
 	"""
 	# raise NotImplementedError
-	current = problem
+	# Work on a copy and change it in place: each iteration proposes a single
+	# move and evaluates only its change in value, instead of building and
+	# scoring every neighbor
+	current = problem.copy()
 	starttime = time.time()
 	while True:
 		temperature = schedule(time.time() - starttime)
 		if temperature == 0 or temperature < 0.1:
 			return current
-		next = problem.successors()
-		if len(next) > 0:
-			next = np.random.choice(next, 1)[0]
-		else:
-			continue
-		deltaE = next.get_value() - current.get_value()
+		move = current.propose_move()
+		deltaE = current.move_delta(move)
 		if deltaE > 0 or random.random() < (np.exp(deltaE / temperature)):
-			current = next
+			current.apply_move(move)
 
 
 class TravelingSalesmanProblem:
@@ -110,16 +129,48 @@ class TravelingSalesmanProblem:
 	path : list
 		The current path between cities as specified by the order of the city
 		tuples in the list.
+	cities : list
+		The cities in the order given to the constructor.
+	order : numpy.ndarray
+		The path as a permutation of indices into `cities`.
+	distances : numpy.ndarray
+		The distance matrix of `cities` (see distance_matrix()).
+
+	Notes
+	-----
+		The state is the `order` array; `path`, `names` and `coords` are
+		views of it built when first read after a change. The distances
+		between every pair of cities are computed once and shared by every
+		problem over the same cities, so that get_value() is a single
+		vectorized sum and the change in path length made by a move (see
+		propose_move()) is found from the few edges it replaces.
 	"""
 
+	# The kinds of move returned by propose_move()
+	MOVES = ('swap', '2opt')
+
 	def __init__(self, cities):
-		self.path = copy.deepcopy(cities)
+		self.cities = copy.deepcopy(cities)
+		self.order = np.arange(len(self.cities))
+		self.distances = distance_matrix(self.cities)
+		self._path = None
 
 	def copy(self):
 		"""Return a copy of the current board state."""
-		new_tsp = TravelingSalesmanProblem(self.path)
+		new_tsp = TravelingSalesmanProblem.__new__(TravelingSalesmanProblem)
+		new_tsp.cities = self.cities
+		new_tsp.order = self.order.copy()
+		new_tsp.distances = self.distances
+		new_tsp._path = None
 		return new_tsp
 
+	@property
+	def path(self):
+		"""The list of city tuples in the order of the current path."""
+		if self._path is None:
+			self._path = [self.cities[k] for k in self.order]
+		return self._path
+
 	@property
 	def names(self):
 		"""Strip and return only the city name from each element of the
@@ -160,12 +211,79 @@ class TravelingSalesmanProblem:
 		# raise NotImplementedError
 		neighbors = []
 		for i in range(0, len(self.path)):
-			new_path = copy.deepcopy(self.path)
 			j = i + 1 if i + 1 < len(self.path) else 0
-			new_path[i], new_path[j] = new_path[j], new_path[i]
-			neighbors.append(TravelingSalesmanProblem(new_path))
+			neighbor = self.copy()
+			neighbor.apply_move(('swap', i, j))
+			neighbors.append(neighbor)
 		return neighbors
 
+	def propose_move(self, kind=None):
+		"""Return a random move in the neighborhood of the current state,
+		without changing it.
+
+		Parameters
+		----------
+		kind : str (optional)
+			'swap' to exchange the cities at two positions of the path, or
+			'2opt' to reverse the part of the path between two positions
+			(replacing two edges by two others); a random kind by default.
+
+		Returns
+		-------
+		tuple
+			A move (kind, i, j) with positions i < j of the path
+		"""
+		if kind is None:
+			kind = self.MOVES[random.randint(len(self.MOVES))]
+		i, j = random.choice(len(self.order), 2, replace=False)
+		return (kind, int(min(i, j)), int(max(i, j)))
+
+	def move_delta(self, move):
+		"""Return the change in get_value() that apply_move(move) would make,
+		in constant time from the edges that the move replaces.
+
+		Parameters
+		----------
+		move : tuple
+			A move (kind, i, j) as returned by propose_move()
+
+		Returns
+		-------
+		float
+			The new value minus the current value; positive if the move
+			shortens the path
+		"""
+		kind, i, j = move
+		order = self.order
+		dist = self.distances
+		n = len(order)
+		if kind == '2opt':
+			if j - i >= n - 2:
+				# reversing all the cities, or all but one, gives the same loop
+				return 0.
+			a, b, c, d = order[i - 1], order[i], order[j], order[(j + 1) % n]
+			return float(dist[a, b] + dist[c, d] - dist[a, c] - dist[b, d])
+
+		# swap: only the edges on either side of positions i and j change;
+		# edge k joins the cities at positions k and k + 1
+		def city(k):
+			k %= n
+			return order[j] if k == i else order[i] if k == j else order[k]
+
+		edges = set(k % n for k in (i - 1, i, j - 1, j))
+		before = sum(dist[order[k], order[(k + 1) % n]] for k in edges)
+		after = sum(dist[city(k), city(k + 1)] for k in edges)
+		return float(before - after)
+
+	def apply_move(self, move):
+		"""Change the path in place by a move returned by propose_move()."""
+		kind, i, j = move
+		if kind == '2opt':
+			self.order[i:j + 1] = self.order[i:j + 1][::-1].copy()
+		else:
+			self.order[[i, j]] = self.order[[j, i]]
+		self._path = None
+
 	def get_value(self):
 		"""Calculate the total length of the closed-circuit path of the current
 		state by summing the distance between every pair of adjacent cities.  Since
@@ -188,12 +306,8 @@ class TravelingSalesmanProblem:
 			annealing finds the shortest path
 		"""
 		# raise NotImplementedError
-		dist = 0.0
-		for i in range(0, len(self.path)):
-			j = i + 1 if i + 1 < len(self.path) else 0
-			dist += ((self.path[i][1][0] - self.path[j][1][0]) ** 2 + (self.path[i][1][1] - self.path[j][1][1]) ** 2) \
-			        ** 0.5
-		return dist * -1
+		dist = self.distances[self.order, np.roll(self.order, -1)].sum()
+		return float(dist) * -1
 
 
 # Construct an instance of the TravelingSalesmanProblem
@@ -213,6 +327,13 @@ assert (all(x in [[('LA', (0, -4)), ('SF', (0, 0)), ('PHX', (2, -3)), ('DC', (11
 # Test the get_value() method -- no output means the test passed
 assert (np.allclose(tsp.get_value(), -28.97, atol=1e-3))
 
+# Test the move_delta() method against get_value() -- no output means the test passed
+for move in [('swap', 0, 1), ('swap', 0, 3), ('swap', 1, 3), ('2opt', 0, 1), ('2opt', 1, 2), ('2opt', 0, 3)]:
+	neighbor = tsp.copy()
+	neighbor.apply_move(move)
+	assert (np.allclose(neighbor.get_value() - tsp.get_value(), tsp.move_delta(move)))
+assert (tsp.path == test_cities)
+
 # These are presented as globals so that the signature of schedule()
 # matches what is shown in the AIMA textbook; you could alternatively
 # define them within the schedule function, use a closure to limit
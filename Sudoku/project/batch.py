@@ -0,0 +1,168 @@
+"""
+Solve a file of Sudoku puzzles across a process pool.
+
+The input has one puzzle per line in the form accepted by `solution.solve`
+(81 characters for a 9x9 grid, 256 for 16x16, ...; blank lines and lines
+starting with '#' are skipped).
+Each solution is written as soon as it and every puzzle before it are
+solved, so the output lines match the input order; a puzzle without a
+solution is written as 'unsolvable'. For example:
+
+    python batch.py puzzles.txt --output solutions.txt --processes 4 --timings timings.csv
+"""
+
+import argparse
+import csv
+import sys
+import time
+
+from multiprocessing import Pool
+
+import solution
+import topology
+
+UNSOLVABLE = 'unsolvable'
+
+
+def read_puzzles(lines):
+    """
+    Yield the puzzles in an iterable of lines (e.g. an open file).
+    Args:
+        lines(iterable): lines of text, one puzzle each.
+    Returns:
+        A generator of puzzle strings.
+    """
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+
+def grid_string(values):
+    """
+    Convert a solved sudoku in dictionary form into its grid string.
+    Args:
+        values(dict): The sudoku in dictionary form, or False.
+    Returns:
+        The grid string, or UNSOLVABLE if values is False.
+    """
+    if not values:
+        return UNSOLVABLE
+    size = int(round(len(values) ** 0.25))
+    return ''.join(values[box] for box in topology.layout(size).boxes)
+
+
+def solve_task(task):
+    """
+    Solve one puzzle; the worker function of `solve_all`.
+    Args:
+        task(tuple): (index, grid, engine, diagonal)
+    Returns:
+        A tuple (index, solution string, seconds, search nodes).
+    """
+    index, grid, engine, diagonal = task
+    stats = {}
+    start = time.perf_counter()
+    values = solution.solve(grid, engine, stats, diagonal=diagonal)
+    elapsed = time.perf_counter() - start
+    return index, grid_string(values), elapsed, stats.get('nodes', 0)
+
+
+def solve_all(puzzles, engine=None, processes=1, chunksize=16, diagonal=None):
+    """
+    Solve a stream of puzzles, in a process pool if processes is not 1.
+    Args:
+        puzzles(iterable): puzzle strings.
+        engine(string): the engine passed to `solution.solve`. The default
+            solves 9x9 diagonal puzzles with the 'dict' engine (reduce_puzzle
+            and search) and the other grids, which it cannot solve, with 'bitmask'.
+        processes(int): the number of worker processes (0 uses every core).
+        chunksize(int): the number of puzzles sent to a worker at a time.
+        diagonal(bool): whether the diagonals are units too (default: only for 9x9 grids).
+    Returns:
+        A generator of (index, solution string, seconds, search nodes) tuples in input order.
+    """
+    tasks = ((index, grid, engine, diagonal) for index, grid in enumerate(puzzles))
+    if processes == 1:
+        for task in tasks:
+            yield solve_task(task)
+        return
+    with Pool(processes or None) as pool:
+        for result in pool.imap(solve_task, tasks, chunksize):
+            yield result
+
+
+def main(puzzle_path, output=None, engine=None, processes=1, timings=None, diagonal=None):
+    """
+    Solve every puzzle in a file, write the solutions incrementally, and
+    print a summary of the run.
+    Args:
+        puzzle_path(string): the puzzle file.
+        output(string): the solution file (default: standard output).
+        engine(string): the engine passed to `solution.solve`, as for `solve_all`.
+        processes(int): the number of worker processes (0 uses every core).
+        timings(string): optional CSV file for the time and nodes of every puzzle.
+        diagonal(bool): whether the diagonals are units too (default: only for 9x9 grids).
+    Returns:
+        A dictionary of summary statistics.
+    """
+    out = open(output, 'w') if output else sys.stdout
+    timing_file = open(timings, 'w', newline='') if timings else None
+    timing_writer = csv.writer(timing_file) if timing_file else None
+    if timing_writer:
+        timing_writer.writerow(['puzzle', 'solved', 'seconds', 'nodes'])
+
+    count = solved = nodes = 0
+    solve_time = max_time = 0.
+    start = time.perf_counter()
+    try:
+        with open(puzzle_path) as puzzles:
+            for index, answer, elapsed, puzzle_nodes in solve_all(read_puzzles(puzzles), engine,
+                                                                  processes, diagonal=diagonal):
+                out.write(answer + '\n')
+                out.flush()
+                if timing_writer:
+                    timing_writer.writerow([index, int(answer != UNSOLVABLE),
+                                            '{:.6f}'.format(elapsed), puzzle_nodes])
+                count += 1
+                solved += answer != UNSOLVABLE
+                nodes += puzzle_nodes
+                solve_time += elapsed
+                max_time = max(max_time, elapsed)
+    finally:
+        if output:
+            out.close()
+        if timing_file:
+            timing_file.close()
+    wall_time = time.perf_counter() - start
+
+    summary = {
+        'puzzles': count,
+        'solved': solved,
+        'nodes': nodes,
+        'wall_time': wall_time,
+        'mean_time': solve_time / count if count else 0.,
+        'max_time': max_time,
+        'puzzles_per_second': count / wall_time if wall_time else 0.,
+    }
+    print('{puzzles} puzzles ({solved} solved) in {wall_time:.2f}s: {puzzles_per_second:.1f} '
+          'puzzles/s, {mean_time:.4f}s mean and {max_time:.4f}s max per puzzle, '
+          '{nodes} search nodes'.format(**summary), file=sys.stderr)
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Solve a file of Sudoku puzzles.')
+    parser.add_argument('puzzles', help='file with one puzzle per line')
+    parser.add_argument('--output', default=None, help='solution file (default: standard output)')
+    parser.add_argument('--engine', choices=('dict', 'bitmask', 'dlx'), default=None,
+                        help="solver engine (default: 'dict' for 9x9 diagonal puzzles, "
+                             "'bitmask' for the others)")
+    parser.add_argument('-p', '--processes', type=int, default=1,
+                        help='number of worker processes (0 uses every core)')
+    parser.add_argument('--timings', default=None, help='CSV file for per-puzzle time and nodes')
+    parser.add_argument('--standard', action='store_true',
+                        help='solve 9x9 puzzles as standard Sudoku instead of diagonal Sudoku')
+    args = parser.parse_args()
+    main(args.puzzles, args.output, args.engine, args.processes, args.timings,
+         diagonal=False if args.standard else None)
@@ -0,0 +1,261 @@
+"""
+Bitmask engine for the Sudoku solver, for grids of any size.
+
+The candidates of each box are stored as an N-bit mask (bit d set if the
+digit `layout.digits[d]` is still possible) in a flat list indexed like
+the boxes of a `topology.Topology`, whose tables give the units and peers
+of every box. Constraint propagation (elimination and only choice) runs
+from a stack of pending eliminations instead of rescanning the board, and
+the search undoes its changes from a trail of (box index, old mask) pairs
+instead of copying the board for every branch. Neither grows with the
+number of boxes, so 16x16 and 25x25 grids stay practical.
+
+Random 25x25 puzzles with half or more of the boxes empty are
+heavy-tailed for a plain fewest-candidates search: one early wrong digit
+can cost minutes to refute. The search therefore weights every unit by
+the contradictions found in it and branches on the box with the fewest
+candidates per unit weight (dom/wdeg), tries first the digits that leave
+the peers the most candidates, and restarts from the givens whenever it
+exceeds a node budget that follows the Luby sequence (1, 1, 2, 1, 1, 2,
+4, ...) times RESTART_NODES. The weights persist across restarts, so each
+run starts from the units that caused the previous ones to fail; the
+budgets grow without bound, so the search is still complete.
+
+Use it through `solution.solve(grid, engine='bitmask')`.
+"""
+
+from topology import DIAGONAL, grid_layout
+
+# Nodes searched before the first restart; later budgets are multiples from `luby`
+RESTART_NODES = 100
+
+
+def _bits(mask):
+    """Return the single-bit masks of mask, lowest first."""
+    bits = []
+    while mask:
+        bit = mask & -mask
+        bits.append(bit)
+        mask ^= bit
+    return bits
+
+
+def _count(mask):
+    return bin(mask).count('1')
+
+
+def luby(i):
+    """Return the i-th term (from 1) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ..."""
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while (1 << k) - 1 != i:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+class Board(object):
+    """
+    Candidate masks of a Sudoku grid with an undo trail.
+
+    Args:
+        cells(list): the candidate mask of each box, in the order of `layout.boxes`.
+        layout(Topology): the units and peers of the grid.
+
+    Attributes:
+        nodes(int): the number of nodes visited by `search`.
+        weights(list): the contradictions found in each unit of `layout.units`, plus one.
+        budget(int): the nodes `search` may still visit, or None for no limit.
+    """
+
+    def __init__(self, cells, layout=DIAGONAL):
+        self.cells = cells
+        self.layout = layout
+        self.trail = []
+        self.nodes = 0
+        self.weights = [1] * len(layout.units)
+        self.budget = None
+
+    def mark(self):
+        """Return a position of the trail to undo to."""
+        return len(self.trail)
+
+    def undo(self, mark):
+        """Restore the candidates changed since `mark`."""
+        cells = self.cells
+        trail = self.trail
+        while len(trail) > mark:
+            i, mask = trail.pop()
+            cells[i] = mask
+
+    def assign(self, i, bit):
+        """
+        Keep only the candidate `bit` in box i and propagate.
+        Returns:
+            False if a contradiction was found, True otherwise.
+        """
+        return self.propagate([(i, other) for other in _bits(self.cells[i] & ~bit)])
+
+    def eliminate(self, i, bit):
+        """
+        Remove the candidate `bit` from box i and propagate.
+        Returns:
+            False if a contradiction was found, True otherwise.
+        """
+        return self.propagate([(i, bit)])
+
+    def propagate(self, pending):
+        """
+        Apply a stack of (box, candidate bit) eliminations and their
+        consequences: a box left with one candidate removes it from its
+        peers (eliminate), and a unit left with one place for a digit gets
+        it there (only choice). A contradiction adds to the weight of the
+        units it was found in: every unit of an emptied box, or the unit
+        left with no place for a digit.
+        Returns:
+            False if a contradiction was found, True otherwise.
+        """
+        cells = self.cells
+        trail = self.trail
+        weights = self.weights
+        peers = self.layout.peers
+        units_of = self.layout.units_of
+        box_units = self.layout.box_units
+        while pending:
+            i, bit = pending.pop()
+            mask = cells[i]
+            if not mask & bit:
+                continue
+            trail.append((i, mask))
+            mask &= ~bit
+            cells[i] = mask
+            if not mask:
+                for u in units_of[i]:
+                    weights[u] += 1
+                return False
+            if not mask & (mask - 1):
+                for peer in peers[i]:
+                    if cells[peer] & mask:
+                        pending.append((peer, mask))
+            for u, unit in zip(units_of[i], box_units[i]):
+                place = -1
+                for j in unit:
+                    if cells[j] & bit:
+                        if place >= 0:
+                            break
+                        place = j
+                else:
+                    if place < 0:
+                        weights[u] += 1
+                        return False
+                    if cells[place] != bit:
+                        pending.extend((place, other) for other in _bits(cells[place] & ~bit))
+        return True
+
+    def search(self):
+        """
+        Depth-first search over the box with the fewest candidates per unit
+        weight, trying first the digits found in the fewest peers.
+        Returns:
+            True if the board was solved (the solution is left in `cells`),
+            False if it has no solution, None if `budget` ran out first.
+        """
+        if self.budget is not None:
+            if self.budget <= 0:
+                return None
+            self.budget -= 1
+        self.nodes += 1
+        cells = self.cells
+        weights = self.weights
+        units_of = self.layout.units_of
+        best, best_count, best_weight = None, 0, 1
+        for i, mask in enumerate(cells):
+            if mask & (mask - 1):
+                count = _count(mask)
+                weight = 0
+                for u in units_of[i]:
+                    weight += weights[u]
+                if best is None or count * best_weight < best_count * weight:
+                    best, best_count, best_weight = i, count, weight
+        if best is None:
+            return True
+        peers = self.layout.peers[best]
+        bits = sorted(_bits(cells[best]), key=lambda bit: sum(1 for j in peers if cells[j] & bit))
+        for bit in bits:
+            mark = self.mark()
+            if self.assign(best, bit):
+                solved = self.search()
+                if solved is not False:
+                    return solved
+            self.undo(mark)
+        return False
+
+    def restart_search(self, restart_nodes=RESTART_NODES):
+        """
+        Run `search` from the current candidates with node budgets of
+        `restart_nodes` times the Luby sequence, undoing every failed run.
+        Returns:
+            True if the board was solved (the solution is left in `cells`),
+            False otherwise.
+        """
+        start = self.mark()
+        run = 1
+        try:
+            while True:
+                self.budget = restart_nodes * luby(run)
+                solved = self.search()
+                if solved is not None:
+                    return solved
+                self.undo(start)
+                run += 1
+        finally:
+            self.budget = None
+
+
+def grid_masks(grid, layout=DIAGONAL):
+    """
+    Convert grid into a list of candidate masks with every digit possible in
+    the empty boxes.
+    Args:
+        grid(string) - A grid in string form.
+        layout(Topology) - The layout of the grid.
+    Returns:
+        A list of masks in the order of `layout.boxes`.
+    """
+    full = (1 << layout.n) - 1
+    return [full if value == layout.digits else 1 << layout.digits.index(value)
+            for value in layout.to_cells(layout.grid_values(grid))]
+
+
+def to_values(cells, layout=DIAGONAL):
+    """Convert candidate masks into the dictionary form used by `solution`."""
+    digits = layout.digits
+    return layout.to_values([''.join(digits[d] for d in range(layout.n) if mask >> d & 1)
+                             for mask in cells])
+
+
+def solve(grid, stats=None, diagonal=None):
+    """
+    Find the solution to a Sudoku grid of any size with the bitmask engine.
+    Args:
+        grid(string): a string representing a sudoku grid.
+        stats(dict): Optional counters; stats['nodes'] is incremented for every node searched.
+        diagonal(bool): whether the diagonals are units too (default: only for 9x9 grids).
+    Returns:
+        The dictionary representation of the final sudoku grid. False if no solution exists.
+    """
+    layout = grid_layout(grid, diagonal)
+    full = (1 << layout.n) - 1
+    board = Board([full] * len(layout.boxes), layout)
+    for i, mask in enumerate(grid_masks(grid, layout)):
+        if mask != full and not board.assign(i, mask):
+            return False
+    solved = board.restart_search()
+    if stats is not None:
+        stats['nodes'] = stats.get('nodes', 0) + board.nodes
+    if not solved:
+        return False
+    return to_values(board.cells, layout)
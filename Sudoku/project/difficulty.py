@@ -0,0 +1,150 @@
+"""
+Rank a file of Sudoku puzzles by how hard they are for the strategies in
+solution.py.
+
+Every puzzle is solved by the dictionary engine with its per-strategy
+counters (see `solution.reduce_unit` and `solution.search`), and the
+puzzles are written as a CSV table from the most to the least expensive,
+with the search nodes, branches, backtracks and depth, the digits removed
+by each strategy, and the strategy that took most of the solve time. The
+time not spent in a strategy is charged to 'search' (choosing a box,
+copying the board). Puzzles with as many search nodes are ranked by the
+total digits removed before time, so that the ranking of a corpus does
+not depend on timing. For example:
+
+    python difficulty.py puzzles.txt --output ranking.csv --processes 4 --top 10
+
+The input is read like batch.py: one 81-character diagonal Sudoku per line.
+"""
+
+import argparse
+import csv
+import sys
+import time
+
+from collections import Counter
+from multiprocessing import Pool
+
+import solution
+from batch import read_puzzles
+
+COLUMNS = (['rank', 'puzzle', 'grid', 'solved', 'seconds', 'nodes', 'branches', 'backtracks',
+            'max_depth', 'only_choice']
+           + ['removed_' + strategy for strategy in solution.STRATEGIES]
+           + ['dominant'])
+
+
+def dominant_strategy(seconds):
+    """
+    Return the strategy that took the most time.
+    Args:
+        seconds(dict): the seconds spent in each strategy.
+    Returns:
+        The name of the strategy, or None if no time was recorded.
+    """
+    if not seconds:
+        return None
+    return max(solution.STRATEGIES, key=lambda strategy: seconds.get(strategy, 0.))
+
+
+def profile_puzzle(task):
+    """
+    Solve one puzzle with the strategy counters; the worker function of `profile_all`.
+    Args:
+        task(tuple): (index, grid)
+    Returns:
+        A dictionary with the COLUMNS of the puzzle, except 'rank'.
+    """
+    index, grid = task
+    stats = {}
+    start = time.perf_counter()
+    values = solution.solve(grid, 'dict', stats)
+    elapsed = time.perf_counter() - start
+    seconds = dict(stats.get('seconds', {}))
+    seconds['search'] = max(0., elapsed - sum(seconds.values()))
+    removed = stats.get('removed', {})
+    row = {
+        'puzzle': index,
+        'grid': grid,
+        'solved': int(bool(values)),
+        'seconds': elapsed,
+        'dominant': dominant_strategy(seconds),
+    }
+    for key in ('nodes', 'branches', 'backtracks', 'max_depth', 'only_choice'):
+        row[key] = stats.get(key, 0)
+    for strategy in solution.STRATEGIES:
+        row['removed_' + strategy] = removed.get(strategy, 0)
+    return row
+
+
+def removed(row):
+    """Return the digits removed by every strategy in a row of `profile_puzzle`."""
+    return sum(row['removed_' + strategy] for strategy in solution.STRATEGIES)
+
+
+def profile_all(puzzles, processes=1, chunksize=16):
+    """
+    Profile a stream of puzzles, in a process pool if processes is not 1.
+    Args:
+        puzzles(iterable): puzzle strings.
+        processes(int): the number of worker processes (0 uses every core).
+        chunksize(int): the number of puzzles sent to a worker at a time.
+    Returns:
+        The rows of `profile_puzzle`, ranked from the most to the least
+        expensive puzzle by search nodes, then by the digits removed by all
+        the strategies, and only then by time.
+    """
+    tasks = enumerate(puzzles)
+    if processes == 1:
+        rows = [profile_puzzle(task) for task in tasks]
+    else:
+        with Pool(processes or None) as pool:
+            rows = list(pool.imap(profile_puzzle, tasks, chunksize))
+    rows.sort(key=lambda row: (row['nodes'], removed(row), row['seconds']), reverse=True)
+    for rank, row in enumerate(rows, 1):
+        row['rank'] = rank
+    return rows
+
+
+def main(puzzle_path, output=None, processes=1, top=None):
+    """
+    Profile every puzzle in a file, write the ranking as CSV, and print
+    which strategies dominate.
+    Args:
+        puzzle_path(string): the puzzle file.
+        output(string): the CSV file (default: standard output).
+        processes(int): the number of worker processes (0 uses every core).
+        top(int): only write the this many most expensive puzzles.
+    Returns:
+        The ranked rows.
+    """
+    with open(puzzle_path) as puzzles:
+        rows = profile_all(read_puzzles(puzzles), processes)
+
+    out = open(output, 'w', newline='') if output else sys.stdout
+    try:
+        writer = csv.DictWriter(out, COLUMNS)
+        writer.writeheader()
+        for row in rows[:top]:
+            writer.writerow(dict(row, seconds='{:.6f}'.format(row['seconds'])))
+    finally:
+        if output:
+            out.close()
+
+    dominant = Counter(row['dominant'] for row in rows)
+    print('{} puzzles, dominant strategy: {}'.format(
+        len(rows), ', '.join('{} {}'.format(strategy, n) for strategy, n in dominant.most_common())),
+        file=sys.stderr)
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rank a file of Sudoku puzzles by solve cost.')
+    parser.add_argument('puzzles', help='file with one 81-character puzzle per line')
+    parser.add_argument('--output', default=None, help='CSV file (default: standard output)')
+    parser.add_argument('-p', '--processes', type=int, default=1,
+                        help='number of worker processes (0 uses every core)')
+    parser.add_argument('--top', type=int, default=None,
+                        help='only write the most expensive puzzles')
+    args = parser.parse_args()
+    main(args.puzzles, args.output, args.processes, args.top)
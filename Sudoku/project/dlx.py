@@ -0,0 +1,266 @@
+"""
+Dancing Links (Knuth's Algorithm X) exact-cover engine for the Sudoku solver.
+
+A Sudoku is encoded as an exact-cover problem with one row per (box, digit)
+choice and one column per constraint: every box holds exactly one digit,
+and every unit of the `topology` layout (rows, columns, squares and, for
+the diagonal Sudoku, both diagonals) holds each digit exactly once, for
+grids of any size. The choice
+rows are linked into a sparse matrix of doubly linked lists, built once and
+copied for every solve, and the search always branches on the column with
+the fewest rows left.
+
+The engine can return the first solution (`solution.solve(grid,
+engine='dlx')`), or count and enumerate every solution, e.g. to check that a
+puzzle has a unique solution:
+
+    dlx.count_solutions(grid, limit=2) == 1
+
+The search is a plain depth-first search, which it must be to count
+solutions, so on 16x16 and larger grids with many empty boxes it can take
+minutes where the restarting search of bitmask.py takes seconds (e.g. a
+random 25x25 grid with 60% of its boxes empty). Use it to count solutions
+or for 9x9 grids, and `bitmask` to solve the larger ones.
+"""
+
+from topology import grid_layout
+
+
+class ExactCover(object):
+    """
+    A sparse 0/1 matrix in dancing links form.
+
+    Args:
+        num_columns(int): the number of constraints, all of which must be covered exactly once.
+        rows(list): the columns covered by each row, as lists of column indices.
+
+    Attributes:
+        nodes(int): the number of search nodes visited by `solutions`.
+    """
+
+    def __init__(self, num_columns, rows):
+        # node 0 is the root, nodes 1..num_columns the column headers, and
+        # the rest one node per 1 in the matrix
+        size = 1 + num_columns + sum(len(row) for row in rows)
+        self.L = [0] * size
+        self.R = [0] * size
+        self.U = list(range(size))
+        self.D = list(range(size))
+        self.C = list(range(size))
+        self.ROW = [-1] * size
+        self.S = [0] * (num_columns + 1)
+        self.nodes = 0
+        L, R, U, D, C = self.L, self.R, self.U, self.D, self.C
+        for c in range(num_columns + 1):
+            L[c] = c - 1 if c else num_columns
+            R[c] = c + 1 if c < num_columns else 0
+        node = num_columns + 1
+        for r, columns in enumerate(rows):
+            first, last = node, node + len(columns) - 1
+            for col in columns:
+                c = col + 1
+                C[node] = c
+                self.ROW[node] = r
+                U[node], D[node] = U[c], c
+                D[U[c]] = node
+                U[c] = node
+                self.S[c] += 1
+                L[node] = node - 1 if node > first else last
+                R[node] = node + 1 if node < last else first
+                node += 1
+        # index of a node of every row, to select given rows
+        self.row_nodes = {}
+        for n in range(num_columns + 1, size):
+            self.row_nodes.setdefault(self.ROW[n], n)
+
+    def copy(self):
+        """Return an independent copy of the matrix."""
+        other = ExactCover.__new__(ExactCover)
+        for name in ('L', 'R', 'U', 'D', 'S'):
+            setattr(other, name, list(getattr(self, name)))
+        other.C = self.C
+        other.ROW = self.ROW
+        other.row_nodes = self.row_nodes
+        other.nodes = 0
+        return other
+
+    def cover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        R[L[c]] = R[c]
+        L[R[c]] = L[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                U[D[j]] = U[j]
+                D[U[j]] = D[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                U[D[j]] = j
+                D[U[j]] = j
+                j = L[j]
+            i = U[i]
+        R[L[c]] = c
+        L[R[c]] = c
+
+    def select(self, row):
+        """
+        Add a row to the solution before searching, covering its columns.
+        Returns:
+            False if one of its columns is already covered, True otherwise.
+        """
+        first = self.row_nodes[row]
+        node = first
+        while True:
+            c = self.C[node]
+            if self.L[self.R[c]] != c:
+                return False
+            self.cover(c)
+            node = self.R[node]
+            if node == first:
+                return True
+
+    def solutions(self):
+        """
+        Enumerate the exact covers of the remaining columns.
+        Returns:
+            A generator of lists of row indices; each list is reused by the
+            search, so copy it to keep it.
+        """
+        L, R, D, C, S, ROW = self.L, self.R, self.D, self.C, self.S, self.ROW
+        chosen = []
+
+        def search():
+            self.nodes += 1
+            if R[0] == 0:
+                yield chosen
+                return
+            # branch on the column with the fewest rows
+            c, best = 0, None
+            j = R[0]
+            while j != 0:
+                if best is None or S[j] < best:
+                    c, best = j, S[j]
+                    if best < 2:
+                        break
+                j = R[j]
+            if best == 0:
+                return
+            self.cover(c)
+            r = D[c]
+            while r != c:
+                chosen.append(ROW[r])
+                j = R[r]
+                while j != r:
+                    self.cover(C[j])
+                    j = R[j]
+                for found in search():
+                    yield found
+                j = L[r]
+                while j != r:
+                    self.uncover(C[j])
+                    j = L[j]
+                chosen.pop()
+                r = D[r]
+            self.uncover(c)
+
+        return search()
+
+
+def _sudoku_matrix(topology):
+    """Build the exact-cover matrix of an empty grid: row N * box + digit."""
+    n = topology.n
+    num_boxes = len(topology.boxes)
+    rows = []
+    for i in range(num_boxes):
+        for d in range(n):
+            rows.append([i] + [num_boxes + n * u + d for u in topology.units_of[i]])
+    return ExactCover(num_boxes + n * len(topology.units), rows)
+
+
+# Exact-cover matrices of the empty grids, keyed by layout; see _setup()
+_EMPTY_GRIDS = {}
+
+
+def _setup(grid, layout):
+    """Return a matrix with the givens of grid selected, or None if they conflict."""
+    if layout not in _EMPTY_GRIDS:
+        _EMPTY_GRIDS[layout] = _sudoku_matrix(layout)
+    matrix = _EMPTY_GRIDS[layout].copy()
+    n = layout.n
+    for i, value in enumerate(layout.to_cells(layout.grid_values(grid))):
+        if len(value) == 1 and not matrix.select(n * i + layout.digits.index(value)):
+            return None
+    return matrix
+
+
+def enumerate_solutions(grid, limit=None, stats=None, diagonal=None):
+    """
+    Enumerate the solutions of a Sudoku grid of any size.
+    Args:
+        grid(string): a string representing a sudoku grid.
+        limit(int): stop after this many solutions (default: all of them).
+        stats(dict): Optional counters; stats['nodes'] is incremented for every node searched.
+        diagonal(bool): whether the diagonals are units too (default: only for 9x9 grids).
+    Returns:
+        A generator of solutions in the dictionary form used by `solution`.
+    """
+    layout = grid_layout(grid, diagonal)
+    matrix = _setup(grid, layout)
+    if matrix is None:
+        return
+    boxes, digits, n = layout.boxes, layout.digits, layout.n
+    givens = dict((box, value) for box, value in layout.grid_values(grid).items()
+                  if len(value) == 1)
+    found = 0
+    try:
+        for rows in matrix.solutions():
+            values = dict(givens)
+            for row in rows:
+                values[boxes[row // n]] = digits[row % n]
+            yield values
+            found += 1
+            if limit is not None and found >= limit:
+                return
+    finally:
+        if stats is not None:
+            stats['nodes'] = stats.get('nodes', 0) + matrix.nodes
+
+
+def count_solutions(grid, limit=None, stats=None, diagonal=None):
+    """
+    Count the solutions of a Sudoku grid.
+    Args:
+        grid(string): a string representing a sudoku grid.
+        limit(int): stop counting at this many solutions, e.g. 2 to test uniqueness.
+        stats(dict): Optional counters, as for `enumerate_solutions`.
+        diagonal(bool): whether the diagonals are units too (default: only for 9x9 grids).
+    Returns:
+        The number of solutions (at most limit).
+    """
+    return sum(1 for _ in enumerate_solutions(grid, limit, stats, diagonal))
+
+
+def solve(grid, stats=None, diagonal=None):
+    """
+    Find the solution to a Sudoku grid with the exact-cover engine.
+    Args:
+        grid(string): a string representing a sudoku grid.
+        stats(dict): Optional counters, as for `enumerate_solutions`.
+        diagonal(bool): whether the diagonals are units too (default: only for 9x9 grids).
+    Returns:
+        The dictionary representation of the final sudoku grid. False if no solution exists.
+    """
+    solutions = enumerate_solutions(grid, 1, stats, diagonal)
+    values = next(solutions, False)
+    solutions.close()
+    return values
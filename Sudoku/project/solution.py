@@ -1,10 +1,19 @@
+import time
 
-assignments = []
+from collections import deque
+from itertools import combinations
 
+import bitmask
+import dlx
+
+from topology import DIAGONAL, cross, grid_layout, layout
+
+# The History recording the current solve, if any; see solve()
+recording = None
+
+# The strategies counted in stats['removed'] by reduce_puzzle and search
+STRATEGIES = ('eliminate', 'only_choice', 'naked_twins', 'hidden_twins', 'search')
 
-def cross(A, B):
-    "Cross product of elements in A and elements in B."
-    return [s + t for s in A for t in B]
 
 rows = 'ABCDEFGHI'
 cols = '123456789'
@@ -17,21 +26,120 @@ square_units = [cross(rs, cs) for rs in ('ABC', 'DEF', 'GHI')
 rev_rows = rows[::-1]
 diagonal_units = [[rows[i] + cols[i] for i in range(len(rows))]] + [[rev_rows[i] + cols[i] for i in range(len(rev_rows))]]
 
-# unitlist = row_units + column_units + square_units
-unitlist = row_units + column_units + square_units + diagonal_units
+# The integer index tables used by the strategies (topology.STANDARD for
+# the standard layout); unitlist, units and peers are their string-keyed views
+TOPOLOGY = DIAGONAL
+BOX_NAMES = TOPOLOGY.boxes
+BOX_INDEX = TOPOLOGY.index
+
+unitlist = TOPOLOGY.unitlist()
+units = TOPOLOGY.units_dict()
+peers = TOPOLOGY.peers_dict()
+
+
+class History(object):
+    """
+    The assignments made by a solve, stored as (box, old, new) diffs from the
+    initial values rather than as copies of the board. Pass an instance to
+    solve() to record it; the states are rebuilt lazily by replaying the
+    diffs, e.g. for visualize.py.
+    """
+
+    def __init__(self):
+        self.initial = {}
+        self.state = {}
+        self.diffs = []
+
+    def __len__(self):
+        return len(self.diffs)
+
+    def reset(self, values):
+        """Start recording from the given values."""
+        self.initial = dict(values)
+        self.state = dict(values)
+        self.diffs = []
+
+    def record(self, box, value):
+        """Record that a box now holds value."""
+        old = self.state[box]
+        if old != value:
+            self.diffs.append((box, old, value))
+            self.state[box] = value
+
+    def sync(self, values):
+        """Record every box of values that differs from the recorded state,
+        e.g. when the search backtracks to a copy of an earlier board."""
+        for box in self.initial:
+            self.record(box, values[box])
+
+    def replay(self):
+        """
+        Replay the diffs from the initial values.
+        Returns:
+            A generator of (box, values) pairs after each diff; values is the
+            same dictionary updated in place, so copy it to keep a state.
+        """
+        values = dict(self.initial)
+        for box, old, new in self.diffs:
+            values[box] = new
+            yield box, values
+
+    def solved_states(self):
+        """Replay the diffs, yielding the values each time a box gets solved."""
+        for box, values in self.replay():
+            if len(values[box]) == 1:
+                yield values
+
+
+class Assignments(object):
+    """
+    The boards of the last recorded solve, one for every box that got
+    solved, in the list form read by visualize.visualize_assignments(). The
+    boards are only built, from the diffs of the History, when the list is
+    first read after a solve.
+    """
+
+    def __init__(self):
+        self.history = None
+        self.boards = []
+        self.length = 0
+
+    def follow(self, history):
+        """Show the solve recorded by history from now on."""
+        self.history = history
+        self.boards = []
+        self.length = 0
+
+    def _boards(self):
+        if self.history is not None and len(self.history) != self.length:
+            self.boards = [dict(values) for values in self.history.solved_states()]
+            self.length = len(self.history)
+        return self.boards
+
+    def __len__(self):
+        return len(self._boards())
+
+    def __getitem__(self, i):
+        return self._boards()[i]
 
-units = dict((s, [u for u in unitlist if s in u]) for s in boxes)
-peers = dict((s, set(sum(units[s], [])) - set([s])) for s in boxes)
+    def __iter__(self):
+        return iter(self._boards())
+
+
+# The boards of the last solve recorded with a History, for
+# visualize.visualize_assignments(solution.assignments)
+assignments = Assignments()
 
 
 def assign_value(values, box, value):
     """
     Please use this function to update your values dictionary!
-    Assigns a value to a given box. If it updates the board record it.
+    Assigns a value to a given box. If a History is recording the solve, it
+    records the change.
     """
     values[box] = value
-    if len(value) == 1:
-        assignments.append(values.copy())
+    if recording is not None:
+        recording.record(box, value)
     return values
 
 
@@ -47,15 +155,16 @@ def naked_twins(values):
     # Find all instances of naked twins
     # Eliminate the naked twins as possibilities for their peers
     naked_twins = []
-    possible_twins = [box for box in values.keys() if len(values[box])==2]
-    for box1 in possible_twins:
-        for box2 in peers[box1]:
-            if values[box1]==values[box2]:
-                naked_twins.append([box1, box2, [peer for peer in peers[box1] if peer in peers[box2]]])
-    for twins in naked_twins:
-        for peer in twins[2]:
-            if len(values[peer])>2:
-                for digit in values[twins[0]]:
+    possible_twins = [i for i, box in enumerate(BOX_NAMES) if len(values[box]) == 2]
+    for i in possible_twins:
+        for j in TOPOLOGY.peers[i]:
+            if values[BOX_NAMES[i]] == values[BOX_NAMES[j]]:
+                naked_twins.append((BOX_NAMES[i], TOPOLOGY.common_peers[i][j]))
+    for box, common in naked_twins:
+        for k in common:
+            peer = BOX_NAMES[k]
+            if len(values[peer]) > 2:
+                for digit in values[box]:
                     values = assign_value(values, peer, values[peer].replace(digit, ''))
     return values
 
@@ -85,88 +194,317 @@ def display(values):
     """
     Display the values as a 2-D grid.
     Args:
-        values(dict): The sudoku in dictionary form
+        values(dict): The sudoku in dictionary form, of any size
     """
-
-    width = 1 + max(len(values[s]) for s in boxes)
-    line = '+'.join(['-' * (width * 3)] * 3)
-    for r in rows:
-        print(''.join(values[r + c].center(width) + ('|' if c in '36' else '')
-                      for c in cols))
-        if r in 'CF':
+    grid = layout(int(round(len(values) ** 0.25)))
+    size = grid.size
+    width = 1 + max(len(values[s]) for s in grid.boxes)
+    line = '+'.join(['-' * (width * size)] * size)
+    for i, r in enumerate(grid.rows):
+        print(''.join(values[r + c].center(width) + ('|' if j % size == size - 1 and j < grid.n - 1
+                                                     else '')
+                      for j, c in enumerate(grid.cols)))
+        if i % size == size - 1 and i < grid.n - 1:
             print(line)
     return
 
 
 def eliminate(values):
-    solved_values = [box for box in values.keys() if len(values[box]) == 1]
-    for box in solved_values:
-        digit = values[box]
-        for peer in peers[box]:
-            # values[peer] = values[peer].replace(digit, '')
-            values = assign_value(values, peer, values[peer].replace(digit, ''))
+    solved_values = [i for i, box in enumerate(BOX_NAMES) if len(values[box]) == 1]
+    for i in solved_values:
+        digit = values[BOX_NAMES[i]]
+        for peer in TOPOLOGY.peer_names[i]:
+            if digit in values[peer]:
+                values = assign_value(values, peer, values[peer].replace(digit, ''))
     return values
 
 
 def only_choice(values):
-    for unit in unitlist:
+    for unit in TOPOLOGY.unit_names:
         for digit in '123456789':
             dplace = [box for box in unit if digit in values[box]]
             if len(dplace) == 1:
-                # values[dplace[0]] = digit
                 values = assign_value(values, dplace[0], digit)
     return values
 
 
-def reduce_puzzle(values):
-    stalled = False
-    while not stalled:
-        solved_values_before = len(
-            [box for box in values.keys() if len(values[box]) == 1])
-        values = eliminate(values)
-        values = only_choice(values)
-        values = naked_twins(values)
-        solved_values_after = len(
-            [box for box in values.keys() if len(values[box]) == 1])
-        stalled = solved_values_before == solved_values_after
-        if len([box for box in values.keys() if len(values[box]) == 0]):
+class StrategyClock(object):
+    """
+    Accumulates the time spent in each strategy into stats['seconds'], for
+    reduce_puzzle when it is given stats.
+    """
+
+    def __init__(self, stats):
+        self.seconds = stats.setdefault('seconds', {})
+        self.strategy = None
+        self.started = 0.
+
+    def start(self, strategy):
+        """Charge the time since the last call to the previous strategy and start timing strategy."""
+        now = time.perf_counter()
+        if self.strategy is not None:
+            self.seconds[self.strategy] = self.seconds.get(self.strategy, 0.) + now - self.started
+        self.strategy = strategy
+        self.started = now
+
+    def stop(self):
+        self.start(None)
+
+
+def count(stats, key, amount=1):
+    """Add amount to the counter stats[key], if stats is not None."""
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + amount
+
+
+def count_removed(stats, strategy, amount):
+    """Add amount to the digits removed by a strategy, stats['removed'][strategy]."""
+    if stats is not None:
+        removed = stats.setdefault('removed', {})
+        removed[strategy] = removed.get(strategy, 0) + amount
+
+
+def remove_digits(values, box, digits, changed, stats=None, strategy=None):
+    """
+    Remove digits from the possible values of a box.
+    Args:
+        values(dict): The sudoku in dictionary form
+        box(string): The box to update
+        digits(string or set): The digits to remove
+        changed(list): The box is appended to it if its value changed
+        stats(dict): Optional counters; the digits removed are added to
+            stats[strategy] and stats['removed'][strategy]
+        strategy(string): The strategy removing the digits, one of STRATEGIES
+    Returns:
+        The new value of the box.
+    """
+    value = values[box]
+    new_value = ''.join(d for d in value if d not in digits)
+    if new_value != value:
+        assign_value(values, box, new_value)
+        changed.append(box)
+        if stats is not None:
+            count(stats, strategy, len(value) - len(new_value))
+            count_removed(stats, strategy, len(value) - len(new_value))
+    return new_value
+
+
+def keep_digits(values, box, digits, changed, stats=None, strategy=None):
+    """Like remove_digits, but keep only the given digits."""
+    return remove_digits(values, box, set(values[box]) - set(digits), changed, stats, strategy)
+
+
+def reduce_unit(values, unit, changed, stats=None, clock=None):
+    """
+    Apply every strategy to one unit: eliminate, only choice, and naked and
+    hidden pairs and triples.
+    Args:
+        values(dict): The sudoku in dictionary form
+        unit(list): The boxes of the unit
+        changed(list): Every box whose value changed is appended to it
+        stats(dict): Optional counters of the work done by each strategy: the
+            digits removed by 'eliminate', 'naked_twins' (naked pairs and
+            triples) and 'hidden_twins' (hidden pairs and triples), and the
+            boxes placed by 'only_choice'. stats['removed'] has the digits
+            removed by every strategy.
+        clock(StrategyClock): Optional clock timing each strategy; the caller stops it.
+    Returns:
+        False if the unit has no solution, True otherwise.
+    """
+    # eliminate: a solved box removes its digit from the rest of the unit
+    if clock:
+        clock.start('eliminate')
+    solved = ''.join(values[box] for box in unit if len(values[box]) == 1)
+    if len(set(solved)) < len(solved):
+        return False
+    for box in unit:
+        if len(values[box]) > 1 and not remove_digits(values, box, solved, changed,
+                                                      stats, 'eliminate'):
+            return False
+
+    # only choice: a digit with a single place in the unit goes there
+    if clock:
+        clock.start('only_choice')
+    places = {}
+    for digit in '123456789':
+        places[digit] = [box for box in unit if digit in values[box]]
+        if not places[digit]:
+            return False
+        if len(places[digit]) == 1 and len(values[places[digit][0]]) > 1:
+            box = places[digit][0]
+            count_removed(stats, 'only_choice', len(values[box]) - 1)
+            keep_digits(values, box, digit, changed)
+            count(stats, 'only_choice')
+            return True
+
+    # naked pairs and triples: n boxes with n digits between them take those
+    # digits from the rest of the unit
+    if clock:
+        clock.start('naked_twins')
+    open_boxes = [box for box in unit if len(values[box]) > 1]
+    for size in (2, 3):
+        candidates = [box for box in open_boxes if len(values[box]) <= size]
+        for group in combinations(candidates, size):
+            digits = set(''.join(values[box] for box in group))
+            if len(digits) < size:
+                return False
+            if len(digits) == size:
+                for box in open_boxes:
+                    if box not in group and not remove_digits(values, box, digits, changed,
+                                                              stats, 'naked_twins'):
+                        return False
+        if changed:
+            return True
+
+    # hidden pairs and triples: n digits with n places between them are the
+    # only digits left in those boxes
+    if clock:
+        clock.start('hidden_twins')
+    open_digits = [digit for digit in places if len(places[digit]) > 1]
+    for size in (2, 3):
+        candidates = [digit for digit in open_digits if len(places[digit]) <= size]
+        for group in combinations(candidates, size):
+            group_boxes = set(box for digit in group for box in places[digit])
+            if len(group_boxes) < size:
+                return False
+            if len(group_boxes) == size:
+                for box in group_boxes:
+                    keep_digits(values, box, group, changed, stats, 'hidden_twins')
+        if changed:
+            return True
+    return True
+
+
+def reduce_puzzle(values, stats=None):
+    """
+    Apply the strategies until they make no more progress. Instead of
+    sweeping the whole board, a queue holds the units to reconsider: every
+    unit at first, then only the units of the boxes that changed.
+    Args:
+        values(dict): The sudoku in dictionary form
+        stats(dict): Optional per-strategy counters, as for reduce_unit; the time spent in
+            each strategy is added to stats['seconds'] too.
+    Returns:
+        The reduced sudoku in dictionary form. False if a contradiction was found.
+    """
+    if any(len(values[box]) == 0 for box in BOX_NAMES):
+        return False
+    unit_names = TOPOLOGY.unit_names
+    units_of = TOPOLOGY.units_of
+    queue = deque(range(len(unit_names)))
+    queued = set(queue)
+    clock = StrategyClock(stats) if stats is not None else None
+    while queue:
+        i = queue.popleft()
+        queued.discard(i)
+        changed = []
+        reduced = reduce_unit(values, unit_names[i], changed, stats, clock)
+        if clock:
+            clock.stop()
+        if not reduced:
             return False
+        for box in changed:
+            for j in units_of[BOX_INDEX[box]]:
+                if j not in queued:
+                    queued.add(j)
+                    queue.append(j)
     return values
 
 
-def search(values):
-    values = reduce_puzzle(values)
+def search(values, stats=None, depth=0):
+    """
+    Depth-first search with constraint propagation at every node.
+    Args:
+        values(dict): The sudoku in dictionary form
+        stats(dict): Optional counters; stats['nodes'] is incremented for every node searched,
+            stats['branches'] for every value tried, stats['backtracks'] for every value that
+            failed, and stats['max_depth'] is the deepest level of guesses. The strategies add
+            their counters too (see reduce_unit), and the digits discarded by the guesses are
+            counted in stats['removed']['search'].
+        depth(int): The number of guesses leading to this node
+    Returns:
+        The solved sudoku in dictionary form. False if no solution exists.
+    """
+    if stats is not None:
+        count(stats, 'nodes')
+        stats['max_depth'] = max(stats.get('max_depth', 0), depth)
+    values = reduce_puzzle(values, stats)
     if values is False:
         return False
     if all(len(values[s]) == 1 for s in values.keys()):
         return values
     n, s = min((len(values[s]), s) for s in values.keys() if len(values[s]) > 1)
     for value in values[s]:
+        if recording is not None:
+            recording.sync(values)
         new_sudoku = values.copy()
-        new_sudoku[s] = value
-        attempt = search(new_sudoku)
+        assign_value(new_sudoku, s, value)
+        count(stats, 'branches')
+        count_removed(stats, 'search', n - 1)
+        attempt = search(new_sudoku, stats, depth + 1)
         if attempt:
             return attempt
+        count(stats, 'backtracks')
+    return False
 
 
-def solve(grid):
+# The solve functions of the engines other than 'dict', by name
+ENGINES = {
+    'bitmask': bitmask.solve,
+    'dlx': dlx.solve,
+}
+
+
+def solve(grid, engine=None, stats=None, history=None, diagonal=None):
     """
     Find the solution to a Sudoku grid.
     Args:
-        grid(string): a string representing a sudoku grid.
+        grid(string): a string representing a sudoku grid, 9x9 or any N*N with N a square
+            (digits from topology.SYMBOLS, e.g. '123456789ABCDEFG' for 16x16).
             Example: '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+        engine(string): 'dict' to search the values dictionary with the strategies in this file
+            (9x9 diagonal grids only), 'bitmask' for the faster engine in bitmask.py, or 'dlx'
+            for the exact-cover engine in dlx.py (see dlx.count_solutions to check that a
+            puzzle has a unique solution). The default is 'dict' for 9x9 diagonal grids and
+            'bitmask' otherwise.
+        stats(dict): Optional counters filled in by the search, e.g. stats['nodes'].
+        history(History): Optional History to record the assignments in. The bitmask and
+            dlx engines only record the solution.
+        diagonal(bool): whether the two main diagonals are units too. The default is True
+            for 9x9 grids and False for the larger ones, which are standard Sudoku.
     Returns:
         The dictionary representation of the final sudoku grid. False if no solution exists.
     """
-    return search(grid_values(grid))
+    global recording
+    grid_topology = grid_layout(grid, diagonal)
+    if engine is None:
+        engine = 'dict' if grid_topology is TOPOLOGY else 'bitmask'
+    if engine != 'dict' and engine not in ENGINES:
+        raise ValueError("Unknown engine: {}".format(engine))
+    if engine == 'dict' and grid_topology is not TOPOLOGY:
+        raise ValueError("The dict engine only solves 9x9 diagonal grids")
+    if history is not None:
+        history.reset(grid_topology.grid_values(grid))
+        assignments.follow(history)
+    if engine != 'dict':
+        values = ENGINES[engine](grid, stats, grid_topology.diagonal)
+        if history is not None and values:
+            history.sync(values)
+        return values
+    recording = history
+    try:
+        return search(grid_values(grid), stats)
+    finally:
+        recording = None
 
 if __name__ == '__main__':
     diag_sudoku_grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
-    display(solve(diag_sudoku_grid))
+    history = History()
+    display(solve(diag_sudoku_grid, history=history))
 
     try:
-        from visualize import visualize_assignments
-        visualize_assignments(assignments)
+        from visualize import visualize_history
+        visualize_history(history)
 
     except SystemExit:
         pass
@@ -0,0 +1,290 @@
+"""
+Tests of the solver extensions in solution.py (the topology tables, the
+queue-driven reduce_puzzle, the assignment history and the strategy
+counters), the bitmask and dlx engines, batch.py and difficulty.py.
+solution_test.py keeps the tests of the project itself.
+"""
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import batch
+import bitmask
+import difficulty
+import dlx
+import solution
+import solution_test
+import topology
+
+DIAGONAL_GRID = solution_test.TestDiagonalSudoku.diagonal_grid
+SOLVED_DIAGONAL = solution_test.TestDiagonalSudoku.solved_diag_sudoku
+
+
+class TestTopology(unittest.TestCase):
+
+    def test_tables(self):
+        standard, diagonal = topology.STANDARD, topology.DIAGONAL
+        self.assertEqual((len(standard.units), len(diagonal.units)), (27, 29))
+        self.assertEqual(set(len(p) for p in standard.peers), {20})
+        center = diagonal.index['E5']
+        self.assertEqual((len(diagonal.peers[center]), len(diagonal.peers[diagonal.index['A1']])),
+                         (32, 26))
+        self.assertEqual(diagonal.box_units[center],
+                         tuple(diagonal.units[u] for u in diagonal.units_of[center]))
+        for i in (0, 10, center, 80):
+            for j in range(81):
+                common = set(diagonal.peers[i]) & set(diagonal.peers[j])
+                self.assertEqual(diagonal.common_peers[i][j], tuple(sorted(common)))
+
+    def test_string_views(self):
+        self.assertEqual(solution.unitlist, solution.row_units + solution.column_units +
+                         solution.square_units + solution.diagonal_units)
+        for box in solution.boxes:
+            self.assertEqual(solution.units[box], [u for u in solution.unitlist if box in u])
+            self.assertEqual(solution.peers[box], set(sum(solution.units[box], [])) - {box})
+        values = solution.grid_values(DIAGONAL_GRID)
+        self.assertEqual(solution.TOPOLOGY.to_values(solution.TOPOLOGY.to_cells(values)), values)
+
+
+class TestReducePuzzle(unittest.TestCase):
+
+    def empty_values(self):
+        return dict((box, '123456789') for box in solution.boxes)
+
+    def test_naked_triple(self):
+        values = self.empty_values()
+        values.update({'A1': '12', 'A2': '23', 'A3': '13'})
+        changed = []
+        self.assertTrue(solution.reduce_unit(values, solution.row_units[0], changed))
+        self.assertEqual(sorted(changed), ['A4', 'A5', 'A6', 'A7', 'A8', 'A9'])
+        self.assertEqual(values['A9'], '456789')
+
+    def test_hidden_pair(self):
+        values = self.empty_values()
+        values.update({'A1': '1234', 'A2': '1256'})
+        for box in solution.row_units[0][2:]:
+            values[box] = '3456789'
+        changed = []
+        self.assertTrue(solution.reduce_unit(values, solution.row_units[0], changed))
+        self.assertEqual(sorted(changed), ['A1', 'A2'])
+        self.assertEqual((values['A1'], values['A2']), ('12', '12'))
+
+    def test_contradiction(self):
+        values = self.empty_values()
+        values.update({'A1': '12', 'A2': '12', 'A3': '12'})
+        self.assertFalse(solution.reduce_puzzle(values))
+
+    def test_reduce_diagonal(self):
+        values = solution.reduce_puzzle(solution.grid_values(DIAGONAL_GRID))
+        self.assertEqual(values, SOLVED_DIAGONAL)
+
+    def test_strategy_counters(self):
+        values = self.empty_values()
+        values.update({'A1': '12', 'A2': '23', 'A3': '13'})
+        stats = {}
+        solution.reduce_unit(values, solution.row_units[0], [], stats)
+        self.assertEqual(stats, {'naked_twins': 18, 'removed': {'naked_twins': 18}})
+
+        stats = {}
+        solution.solve(TestBitmaskEngine.sparse_grid, 'dict', stats)
+        self.assertGreater(stats['backtracks'], 0)
+        self.assertEqual(stats['branches'], stats['nodes'] - 1)
+        self.assertGreater(stats['max_depth'], 0)
+        self.assertEqual(set(stats['removed']), set(solution.STRATEGIES) - {'hidden_twins'})
+        self.assertEqual(stats['removed']['eliminate'], stats['eliminate'])
+        self.assertEqual(set(stats['seconds']), set(solution.STRATEGIES) - {'search'})
+
+
+class TestHistory(unittest.TestCase):
+
+    def test_replay(self):
+        for grid in (DIAGONAL_GRID, TestBitmaskEngine.sparse_grid):
+            history = solution.History()
+            values = solution.solve(grid, history=history)
+            self.assertIsNone(solution.recording)
+            self.assertEqual(history.initial, solution.grid_values(grid))
+            self.assertTrue(all(len(diff) == 3 for diff in history.diffs))
+            final = None
+            for box, final in history.replay():
+                pass
+            self.assertEqual(final, values)
+            solved = [sum(len(v) == 1 for v in state.values()) for state in history.solved_states()]
+            self.assertEqual(len(solved), sum(len(new) == 1 for _, _, new in history.diffs))
+            self.assertEqual(len(solution.assignments), len(solved))
+            self.assertEqual(solution.assignments[-1], values)
+
+    def test_separate_histories(self):
+        first, second = solution.History(), solution.History()
+        solution.solve(DIAGONAL_GRID, history=first)
+        diffs = list(first.diffs)
+        solution.solve(TestBitmaskEngine.sparse_grid, history=second)
+        self.assertEqual(first.diffs, diffs)
+        self.assertEqual(solution.assignments[0], next(second.solved_states()))
+
+    def test_bitmask_records_solution(self):
+        history = solution.History()
+        values = solution.solve(TestBitmaskEngine.sparse_grid, engine='bitmask', history=history)
+        self.assertEqual(list(history.replay())[-1][1], values)
+
+
+class TestBitmaskEngine(unittest.TestCase):
+    sparse_grid = '.....5..1......2......2......643.1.....1..6....9.....8......8.....2....47..56..2.'
+
+    def test_solve(self):
+        self.assertEqual(solution.solve(DIAGONAL_GRID, engine='bitmask'),
+                         SOLVED_DIAGONAL)
+        self.assertEqual(solution.solve(self.sparse_grid, engine='bitmask'), solution.solve(self.sparse_grid))
+        self.assertTrue(solution.solve(self.sparse_grid))
+
+    def test_no_solution(self):
+        conflicting_grid = '22' + '.' * 79
+        self.assertFalse(solution.solve(conflicting_grid, engine='bitmask'))
+        self.assertFalse(solution.solve(conflicting_grid))
+
+    def test_restarts(self):
+        self.assertEqual([bitmask.luby(i) for i in range(1, 16)],
+                         [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8])
+        # one node per run: the budgets must grow for the search to finish
+        layout = topology.DIAGONAL
+        board = bitmask.Board([(1 << 9) - 1] * 81, layout)
+        for i, mask in enumerate(bitmask.grid_masks(self.sparse_grid, layout)):
+            self.assertTrue(mask == (1 << 9) - 1 or board.assign(i, mask))
+        self.assertTrue(board.restart_search(restart_nodes=1))
+        self.assertIsNone(board.budget)
+        self.assertEqual(bitmask.to_values(board.cells, layout), solution.solve(self.sparse_grid))
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            solution.solve(self.sparse_grid, engine='sets')
+        # importable modules are not engines
+        for engine in ('topology', 'os'):
+            with self.assertRaises(ValueError):
+                solution.solve(self.sparse_grid, engine=engine)
+
+
+class TestDancingLinks(unittest.TestCase):
+
+    def test_solve(self):
+        self.assertEqual(solution.solve(DIAGONAL_GRID, engine='dlx'),
+                         SOLVED_DIAGONAL)
+        self.assertEqual(solution.solve(TestBitmaskEngine.sparse_grid, engine='dlx'),
+                         solution.solve(TestBitmaskEngine.sparse_grid))
+        self.assertFalse(solution.solve('22' + '.' * 79, engine='dlx'))
+
+    def test_count_solutions(self):
+        self.assertEqual(dlx.count_solutions(DIAGONAL_GRID), 1)
+        self.assertEqual(dlx.count_solutions(TestBitmaskEngine.sparse_grid), 1)
+        self.assertEqual(dlx.count_solutions('22' + '.' * 79), 0)
+        self.assertEqual(dlx.count_solutions('.' * 81, limit=50), 50)
+
+        # removing a given from a unique puzzle leaves several solutions, all valid
+        grid = '.' + TestBitmaskEngine.sparse_grid[1:].replace('1', '.', 1)
+        solutions = list(dlx.enumerate_solutions(grid))
+        self.assertGreater(len(solutions), 1)
+        self.assertEqual(len(set(tuple(sorted(v.items())) for v in solutions)), len(solutions))
+        for values in solutions:
+            for unit in solution.unitlist:
+                self.assertEqual(sorted(values[box] for box in unit), list('123456789'))
+
+
+class TestLargeGrids(unittest.TestCase):
+    grid_16 = ('6..29.ED....B4....F.7B.49C..26..45..F8..G.16C.9.DE.CG2.67B54.AF3.2....C..F....D...A....'
+               '1.7.5...8.B.76F83...19...386F..B.A9C.G.42F.21C.D78..9..B.9....5.G.......6.D....6.B54.3..'
+               '..4.5......6FE.CDC9...4G2ED...81.B.ED...8.....C39.F16ED..3A9C4.5G2.5.3A9..6.8..E7')
+    grid_25 = ('.1.G.AH.4..8.B.CF5ONJ.D.MM..I.E.BL6291G73.A..5CONFFN....9G21....J....6A..K.8..B.5..O.4H..'
+               'AI.J.P.G.1..K...J.I.POF.C.G.7..EB..8.J..IHL.BEG2718..F.AMN.5..7.1.F4K3ABLE6H..M.5...JDO.M.'
+               '....G7I.JP96LHBE.K3.44A.K3.DPIJ.O....28G7H6..L.EH.BMONC.3...F...I..1.72AC..F1...GM.ID..7.'
+               '..K..3E5...M.7L8...G.14.KH.NOF.A.3.4H.5DM.F...N2..9.6L8B7..12.KE.H...B..OANFCPDM...B6L..A'
+               'O.CHE3..D5.M....G..8L.1.3A...BH..5.DNM..P.I..2..4B.......L.3O.FD..MC...E..C5NMK.F.O.I2P.L'
+               '.18.3.OAK2.JP.NCM5D.G.184...BC..5N...18....2..4.....F..D.M5.1..L.P29..63.4CF..K.O.....9J2'
+               '5NDMI81.7.3H..6P...J36H.47...BFK..O..5.N6..HE...5D.KOFC9.GJ.B...1...8.CKFAO.64...NI.DG..2P')
+
+    def assertSolved(self, grid, values, size):
+        layout = topology.layout(size)
+        for box, c in layout.grid_values(grid).items():
+            if len(c) == 1:
+                self.assertEqual(values[box], c)
+        for unit in layout.unit_names:
+            self.assertEqual(sorted(values[box] for box in unit), sorted(layout.digits))
+
+    def test_solve(self):
+        for grid, size in ((self.grid_16, 4), (self.grid_25, 5)):
+            for engine in ('bitmask', 'dlx'):
+                self.assertSolved(grid, solution.solve(grid, engine, diagonal=False), size)
+        # grids larger than 9x9 are standard Sudoku by default
+        self.assertEqual(solution.solve(self.grid_16),
+                         solution.solve(self.grid_16, engine='bitmask', diagonal=False))
+        self.assertIs(topology.grid_layout(self.grid_16), topology.layout(4))
+        self.assertIs(topology.grid_layout(DIAGONAL_GRID), topology.DIAGONAL)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            solution.solve(self.grid_16, engine='dict', diagonal=False)
+        with self.assertRaises(ValueError):
+            solution.solve(self.grid_16[:-1], diagonal=False)
+
+    def test_display(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            solution.display(solution.solve(self.grid_16, diagonal=False))
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 16 + 3)
+        self.assertEqual(lines[0].count('|'), 3)
+
+
+class TestBatch(unittest.TestCase):
+
+    def test_default_engine(self):
+        stats = {}
+        solution.solve(TestBitmaskEngine.sparse_grid, 'dict', stats)
+        _, _, _, nodes = batch.solve_task((0, TestBitmaskEngine.sparse_grid, None, True))
+        self.assertEqual(nodes, stats['nodes'])
+
+    def test_solve_file(self):
+        puzzles = [DIAGONAL_GRID, '22' + '.' * 79, TestBitmaskEngine.sparse_grid]
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        puzzle_path = os.path.join(directory, 'puzzles.txt')
+        with open(puzzle_path, 'w') as puzzle_file:
+            puzzle_file.write('# diagonal puzzles\n' + '\n\n'.join(puzzles) + '\n')
+
+        for engine, processes in ((None, 1), ('bitmask', 2)):
+            output = os.path.join(directory, str(engine) + '.txt')
+            timings = os.path.join(directory, str(engine) + '.csv')
+            summary = batch.main(puzzle_path, output, engine, processes, timings)
+            with open(output) as output_file:
+                answers = output_file.read().split()
+            self.assertEqual(answers, [batch.grid_string(solution.solve(p)) for p in puzzles])
+            self.assertEqual(answers[1], batch.UNSOLVABLE)
+            self.assertEqual((summary['puzzles'], summary['solved']), (3, 2))
+            self.assertGreater(summary['nodes'], 0)
+            with open(timings) as timing_file:
+                self.assertEqual(len(timing_file.readlines()), 4)
+
+
+class TestDifficulty(unittest.TestCase):
+
+    def test_ranking(self):
+        puzzles = [DIAGONAL_GRID, '22' + '.' * 79, TestBitmaskEngine.sparse_grid]
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        puzzle_path = os.path.join(directory, 'puzzles.txt')
+        with open(puzzle_path, 'w') as puzzle_file:
+            puzzle_file.write('\n'.join(puzzles) + '\n')
+        output = os.path.join(directory, 'ranking.csv')
+        rows = difficulty.main(puzzle_path, output, processes=2, top=2)
+        self.assertEqual([row['puzzle'] for row in rows], [2, 0, 1])
+        self.assertEqual([row['rank'] for row in rows], [1, 2, 3])
+        self.assertEqual([row['solved'] for row in rows], [1, 1, 0])
+        self.assertGreater(rows[0]['backtracks'], 0)
+        self.assertIn(rows[0]['dominant'], solution.STRATEGIES)
+        with open(output) as output_file:
+            lines = output_file.read().splitlines()
+        self.assertEqual(lines[0].split(','), difficulty.COLUMNS)
+        self.assertEqual(len(lines), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+"""
+Precomputed index tables describing the layout of a Sudoku grid.
+
+A layout has N = size * size rows, columns and squares (9x9 for size 3,
+16x16 for size 4, 25x25 for size 5), with rows labeled by letters, columns
+by numbers and digits by the first N of `SYMBOLS`. Boxes are numbered
+0..N*N-1 in row-major order ('A1' is 0, 'A2' is 1, ..., 'I9' is 80 on a
+9x9 grid), and every table is built once as tuples so the strategies can
+index it directly instead of looking up box names in dictionaries:
+
+    units         the boxes of every unit: rows, columns, squares, then the
+                  two diagonals for the diagonal layout
+    units_of      the indices into `units` of the units of every box
+    box_units     the units of every box, as tuples of boxes
+    peers         the boxes sharing a unit with every box
+    common_peers  common_peers[i][j], the boxes that are peers of both i and j
+                  (built on first use)
+
+`STANDARD` and `DIAGONAL` are the two 9x9 layouts, and `layout()` returns
+the (cached) layout of any size. The `*_names` tables and the
+`to_cells`/`to_values` and `*_dict` adapters translate to and from the
+string-keyed dictionaries used by solution.py.
+"""
+
+# Digits of the grids, e.g. '123456789ABCDEFG' for 16x16
+SYMBOLS = '123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+ROW_LABELS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# Layouts built by layout(), keyed by (size, diagonal)
+_LAYOUTS = {}
+
+
+def cross(A, B):
+    "Cross product of elements in A and elements in B."
+    return [s + t for s in A for t in B]
+
+
+class Topology(object):
+    """
+    The units and peers of a Sudoku layout.
+
+    Args:
+        size(int): the side of a square, 3 for the 9x9 grid.
+        diagonal(bool): whether the two main diagonals are units too.
+    """
+
+    def __init__(self, size=3, diagonal=False):
+        n = size * size
+        if n > min(len(SYMBOLS), len(ROW_LABELS)):
+            raise ValueError("Grids larger than 25x25 are not supported")
+        self.size = size
+        self.n = n
+        self.diagonal = diagonal
+        self.digits = SYMBOLS[:n]
+        rows = ROW_LABELS[:n]
+        cols = [str(c) for c in range(1, n + 1)]
+        self.rows = rows
+        self.cols = cols
+        self.boxes = tuple(cross(rows, cols))
+        self.index = dict((box, i) for i, box in enumerate(self.boxes))
+
+        row_units = [cross(r, cols) for r in rows]
+        column_units = [cross(rows, [c]) for c in cols]
+        square_units = [cross(rows[r:r + size], cols[c:c + size])
+                        for r in range(0, n, size) for c in range(0, n, size)]
+        unit_names = row_units + column_units + square_units
+        if diagonal:
+            unit_names += [[rows[i] + cols[i] for i in range(n)],
+                           [rows[n - 1 - i] + cols[i] for i in range(n)]]
+        self.unit_names = tuple(tuple(unit) for unit in unit_names)
+        self.units = tuple(tuple(self.index[box] for box in unit) for unit in unit_names)
+
+        num_boxes = len(self.boxes)
+        units_of = [[] for _ in range(num_boxes)]
+        for u, unit in enumerate(self.units):
+            for i in unit:
+                units_of[i].append(u)
+        self.units_of = tuple(tuple(u) for u in units_of)
+        self.box_units = tuple(tuple(self.units[u] for u in units) for units in self.units_of)
+        self.peers = tuple(
+            tuple(sorted(set(j for u in self.units_of[i] for j in self.units[u]) - {i}))
+            for i in range(num_boxes))
+        self.peer_names = tuple(tuple(self.boxes[j] for j in peers) for peers in self.peers)
+        self._common_peers = None
+
+    @property
+    def common_peers(self):
+        # N^4 pairs: built on first use, since only naked_twins needs them
+        if self._common_peers is None:
+            peer_sets = [frozenset(peers) for peers in self.peers]
+            self._common_peers = tuple(
+                tuple(tuple(sorted(peer_sets[i] & peer_sets[j])) for j in range(len(peer_sets)))
+                for i in range(len(peer_sets)))
+        return self._common_peers
+
+    def grid_values(self, grid):
+        """
+        Convert a grid string into a dictionary with every digit possible in the empty boxes.
+        Args:
+            grid(string): N*N characters, a digit or '.' for each box; other characters are
+                ignored.
+        Returns:
+            The grid in dictionary form.
+        """
+        chars = [c for c in grid if c == '.' or c in SYMBOLS]
+        if len(chars) != len(self.boxes) or any(c not in self.digits for c in chars if c != '.'):
+            raise ValueError("Not a {0}x{0} grid: {1}".format(self.n, grid))
+        return dict((box, self.digits if c == '.' else c) for box, c in zip(self.boxes, chars))
+
+    def to_cells(self, values):
+        """Convert a dictionary keyed by box names into a list indexed by box."""
+        return [values[box] for box in self.boxes]
+
+    def to_values(self, cells):
+        """Convert a list indexed by box into a dictionary keyed by box names."""
+        return dict(zip(self.boxes, cells))
+
+    def unitlist(self):
+        """Return the units as lists of box names, like solution.unitlist."""
+        return [list(unit) for unit in self.unit_names]
+
+    def units_dict(self):
+        """Return {box name: [units of the box as lists of names]}, like solution.units."""
+        return dict((box, [list(self.unit_names[u]) for u in self.units_of[i]])
+                    for i, box in enumerate(self.boxes))
+
+    def peers_dict(self):
+        """Return {box name: set of peer names}, like solution.peers."""
+        return dict((box, set(self.peer_names[i])) for i, box in enumerate(self.boxes))
+
+
+def layout(size=3, diagonal=False):
+    """Return the shared Topology of a size (3 for 9x9 grids) and kind."""
+    key = (size, diagonal)
+    if key not in _LAYOUTS:
+        _LAYOUTS[key] = Topology(size, diagonal)
+    return _LAYOUTS[key]
+
+
+def grid_layout(grid, diagonal=None):
+    """
+    Return the layout of a grid string from its number of boxes.
+    Args:
+        grid(string): a grid of any size, with '.' for the empty boxes.
+        diagonal(bool): whether the diagonals are units too (default: only for 9x9 grids, the
+            diagonal Sudoku of this project).
+    Returns:
+        The Topology of the grid.
+    """
+    count = sum(1 for c in grid if c == '.' or c in SYMBOLS)
+    size = int(round(count ** 0.25))
+    if size < 1 or size ** 4 != count:
+        raise ValueError("A grid must have N*N boxes with N a square, got {}".format(count))
+    if diagonal is None:
+        diagonal = size == 3
+    return layout(size, diagonal)
+
+
+STANDARD = layout(3, diagonal=False)
+DIAGONAL = layout(3, diagonal=True)
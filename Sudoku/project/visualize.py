@@ -15,3 +15,8 @@ def visualize_assignments(assignments):
         last_assignment = assignments[i]
 
     play(filtered_assignments)
+
+
+def visualize_history(history):
+    """ Visualizes a solution.History, replaying its diffs lazily with one frame per solved box"""
+    play(history.solved_states())